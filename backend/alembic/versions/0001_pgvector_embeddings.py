@@ -0,0 +1,69 @@
+"""Store face embeddings as pgvector columns with HNSW indexes
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+EMBEDDING_DIMENSION = 128
+
+# (table, nullable, index name)
+EMBEDDING_TABLES = [
+    ("users", True, "ix_users_embedding_hnsw"),
+    ("photo_faces", False, "ix_photo_faces_embedding_hnsw"),
+]
+
+
+def _embedding_type(table_name: str):
+    inspector = sa.inspect(op.get_bind())
+    if table_name not in inspector.get_table_names():
+        return None
+    for column in inspector.get_columns(table_name):
+        if column["name"] == "embedding":
+            return column["type"]
+    return None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+
+    for table_name, nullable, index_name in EMBEDDING_TABLES:
+        column_type = _embedding_type(table_name)
+        if column_type is None:
+            # Fresh database, start.py creates the table with the vector column
+            continue
+
+        if isinstance(column_type, sa.JSON):
+            # Backfill into a new vector column, dropping malformed embeddings
+            op.execute(f"ALTER TABLE {table_name} ADD COLUMN embedding_vector vector({EMBEDDING_DIMENSION})")
+            op.execute(
+                f"UPDATE {table_name} SET embedding_vector = (embedding::text)::vector({EMBEDDING_DIMENSION}) "
+                f"WHERE embedding IS NOT NULL AND json_array_length(embedding) = {EMBEDDING_DIMENSION}"
+            )
+            if not nullable:
+                op.execute(f"DELETE FROM {table_name} WHERE embedding_vector IS NULL")
+            op.drop_column(table_name, "embedding")
+            op.alter_column(table_name, "embedding_vector", new_column_name="embedding", nullable=nullable)
+
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} "
+            f"USING hnsw (embedding vector_l2_ops) WITH (m = 16, ef_construction = 64)"
+        )
+
+
+def downgrade() -> None:
+    for table_name, nullable, index_name in EMBEDDING_TABLES:
+        if _embedding_type(table_name) is None:
+            continue
+        op.execute(f"DROP INDEX IF EXISTS {index_name}")
+        op.execute(f"ALTER TABLE {table_name} ALTER COLUMN embedding TYPE json USING (embedding::text)::json")
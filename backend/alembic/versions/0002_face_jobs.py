@@ -0,0 +1,63 @@
+"""Add face_jobs queue and unique photo face index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def _table_names():
+    return sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade() -> None:
+    tables = _table_names()
+
+    if "photos" in tables and "face_jobs" not in tables:
+        op.create_table(
+            "face_jobs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("photo_id", sa.Integer(), sa.ForeignKey("photos.id", ondelete="CASCADE"), nullable=False, unique=True),
+            sa.Column("event_id", sa.Integer(), sa.ForeignKey("events.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("status", sa.String(20), nullable=False, server_default="pending"),
+            sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("locked_by", sa.String(255), nullable=True),
+            sa.Column("locked_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("duration_ms", sa.Integer(), nullable=True),
+            sa.Column("faces_detected", sa.Integer(), nullable=True),
+            sa.Column("faces_matched", sa.Integer(), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_face_jobs_id", "face_jobs", ["id"])
+        op.create_index("ix_face_jobs_event_id", "face_jobs", ["event_id"])
+        op.create_index("ix_face_jobs_status_id", "face_jobs", ["status", "id"])
+
+    if "photo_faces" in tables:
+        # Remove duplicates left by concurrent processing before adding the constraint
+        op.execute(
+            "DELETE FROM photo_faces a USING photo_faces b "
+            "WHERE a.photo_id = b.photo_id AND a.face_index = b.face_index AND a.id > b.id"
+        )
+        op.create_unique_constraint("unique_photo_face_index", "photo_faces", ["photo_id", "face_index"])
+
+
+def downgrade() -> None:
+    tables = _table_names()
+    if "photo_faces" in tables:
+        op.drop_constraint("unique_photo_face_index", "photo_faces", type_="unique")
+    if "face_jobs" in tables:
+        op.drop_table("face_jobs")
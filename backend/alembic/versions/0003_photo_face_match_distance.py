@@ -0,0 +1,35 @@
+"""Store the match distance of matched photo faces
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table_name: str):
+    inspector = sa.inspect(op.get_bind())
+    if table_name not in inspector.get_table_names():
+        return None
+    return {column["name"] for column in inspector.get_columns(table_name)}
+
+
+def upgrade() -> None:
+    columns = _columns("photo_faces")
+    if columns is not None and "match_distance" not in columns:
+        op.add_column("photo_faces", sa.Column("match_distance", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    columns = _columns("photo_faces")
+    if columns is not None and "match_distance" in columns:
+        op.drop_column("photo_faces", "match_distance")
@@ -0,0 +1,35 @@
+"""Per-event face pipeline profile
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table_name: str):
+    inspector = sa.inspect(op.get_bind())
+    if table_name not in inspector.get_table_names():
+        return None
+    return {column["name"] for column in inspector.get_columns(table_name)}
+
+
+def upgrade() -> None:
+    columns = _columns("events")
+    if columns is not None and "face_profile" not in columns:
+        op.add_column("events", sa.Column("face_profile", sa.String(50), nullable=True))
+
+
+def downgrade() -> None:
+    columns = _columns("events")
+    if columns is not None and "face_profile" in columns:
+        op.drop_column("events", "face_profile")
@@ -0,0 +1,54 @@
+"""Content-hash face result cache and photo content hashes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table_name: str):
+    inspector = sa.inspect(op.get_bind())
+    if table_name not in inspector.get_table_names():
+        return None
+    return {column["name"] for column in inspector.get_columns(table_name)}
+
+
+def upgrade() -> None:
+    photo_columns = _columns("photos")
+    if photo_columns is not None and "content_hash" not in photo_columns:
+        op.add_column("photos", sa.Column("content_hash", sa.String(64), nullable=True))
+        op.create_index("ix_photos_event_content_hash", "photos", ["event_id", "content_hash"])
+
+    if photo_columns is not None and _columns("face_result_cache") is None:
+        op.create_table(
+            "face_result_cache",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("content_hash", sa.String(64), nullable=False),
+            sa.Column("pipeline_key", sa.String(64), nullable=False),
+            sa.Column("faces", sa.JSON(), nullable=False),
+            sa.Column("face_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("hit_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("last_used_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.UniqueConstraint("content_hash", "pipeline_key", name="unique_face_result_cache_key"),
+        )
+        op.create_index("ix_face_result_cache_id", "face_result_cache", ["id"])
+
+
+def downgrade() -> None:
+    if _columns("face_result_cache") is not None:
+        op.drop_table("face_result_cache")
+    photo_columns = _columns("photos")
+    if photo_columns is not None and "content_hash" in photo_columns:
+        op.drop_index("ix_photos_event_content_hash", table_name="photos")
+        op.drop_column("photos", "content_hash")
@@ -0,0 +1,60 @@
+"""Per-photo face processing state
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table_name: str):
+    inspector = sa.inspect(op.get_bind())
+    if table_name not in inspector.get_table_names():
+        return None
+    return {column["name"] for column in inspector.get_columns(table_name)}
+
+
+def upgrade() -> None:
+    columns = _columns("photos")
+    if columns is None or "face_status" in columns:
+        return
+
+    op.add_column("photos", sa.Column("face_status", sa.String(20), nullable=False, server_default="pending"))
+    op.add_column("photos", sa.Column("face_pipeline_key", sa.String(64), nullable=True))
+    op.add_column("photos", sa.Column("face_count", sa.Integer(), nullable=True))
+    op.add_column("photos", sa.Column("faces_processed_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("photos", sa.Column("face_processing_ms", sa.Integer(), nullable=True))
+    op.create_index("ix_photos_event_face_status", "photos", ["event_id", "face_status"])
+
+    # Photos with stored faces were processed by an earlier pipeline (no fingerprint recorded)
+    if _columns("photo_faces") is not None:
+        op.execute(
+            "UPDATE photos SET face_status = 'done', "
+            "face_count = (SELECT count(*) FROM photo_faces WHERE photo_faces.photo_id = photos.id) "
+            "WHERE EXISTS (SELECT 1 FROM photo_faces WHERE photo_faces.photo_id = photos.id)"
+        )
+    if _columns("face_jobs") is not None:
+        # Finished jobs also cover photos without any face
+        op.execute(
+            "UPDATE photos SET face_status = 'done', face_count = 0 "
+            "WHERE face_status = 'pending' AND EXISTS ("
+            "SELECT 1 FROM face_jobs WHERE face_jobs.photo_id = photos.id AND face_jobs.status = 'done')"
+        )
+
+
+def downgrade() -> None:
+    columns = _columns("photos")
+    if columns is None or "face_status" not in columns:
+        return
+    op.drop_index("ix_photos_event_face_status", table_name="photos")
+    for column in ("face_processing_ms", "faces_processed_at", "face_count", "face_pipeline_key", "face_status"):
+        op.drop_column("photos", column)
@@ -0,0 +1,63 @@
+"""Face clusters for unmatched faces within an event
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table_name: str):
+    inspector = sa.inspect(op.get_bind())
+    if table_name not in inspector.get_table_names():
+        return None
+    return {column["name"] for column in inspector.get_columns(table_name)}
+
+
+def upgrade() -> None:
+    face_columns = _columns("photo_faces")
+    if face_columns is None:
+        # Fresh database, start.py creates the tables
+        return
+
+    if _columns("face_clusters") is None:
+        op.create_table(
+            "face_clusters",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("event_id", sa.Integer(), sa.ForeignKey("events.id"), nullable=False),
+            sa.Column("centroid", Vector(128), nullable=False),
+            sa.Column("face_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("matched_user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_face_clusters_id", "face_clusters", ["id"])
+        op.create_index("ix_face_clusters_event_id", "face_clusters", ["event_id"])
+
+    # Existing faces stay unclustered until the event is clustered
+    # (POST /api/photos/events/{event}/face-clusters)
+    if "cluster_id" not in face_columns:
+        op.add_column(
+            "photo_faces",
+            sa.Column("cluster_id", sa.Integer(), sa.ForeignKey("face_clusters.id", ondelete="SET NULL"), nullable=True)
+        )
+        op.create_index("ix_photo_faces_cluster_id", "photo_faces", ["cluster_id"])
+
+
+def downgrade() -> None:
+    face_columns = _columns("photo_faces")
+    if face_columns is not None and "cluster_id" in face_columns:
+        op.drop_index("ix_photo_faces_cluster_id", table_name="photo_faces")
+        op.drop_column("photo_faces", "cluster_id")
+    if _columns("face_clusters") is not None:
+        op.drop_table("face_clusters")
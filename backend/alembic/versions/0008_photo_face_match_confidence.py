@@ -0,0 +1,36 @@
+"""Store the match margin of photo faces as a confidence
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table_name: str):
+    inspector = sa.inspect(op.get_bind())
+    if table_name not in inspector.get_table_names():
+        return None
+    return {column["name"] for column in inspector.get_columns(table_name)}
+
+
+def upgrade() -> None:
+    columns = _columns("photo_faces")
+    # Existing matches keep a NULL confidence until they are matched again
+    if columns is not None and "match_confidence" not in columns:
+        op.add_column("photo_faces", sa.Column("match_confidence", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    columns = _columns("photo_faces")
+    if columns is not None and "match_confidence" in columns:
+        op.drop_column("photo_faces", "match_confidence")
@@ -0,0 +1,53 @@
+"""Multiple enrollment embeddings (face templates) per user
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table_name: str):
+    inspector = sa.inspect(op.get_bind())
+    if table_name not in inspector.get_table_names():
+        return None
+    return {column["name"] for column in inspector.get_columns(table_name)}
+
+
+def upgrade() -> None:
+    if _columns("users") is None or _columns("user_face_templates") is not None:
+        # Fresh database, start.py creates the tables
+        return
+
+    op.create_table(
+        "user_face_templates",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("embedding", Vector(128), nullable=False),
+        sa.Column("source", sa.String(20), nullable=False),
+        sa.Column("photo_face_id", sa.Integer(), sa.ForeignKey("photo_faces.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_user_face_templates_id", "user_face_templates", ["id"])
+    op.create_index("ix_user_face_templates_user_id", "user_face_templates", ["user_id"])
+
+    # The existing selfie embedding becomes the profile template (and stays the centroid)
+    op.execute(
+        "INSERT INTO user_face_templates (user_id, embedding, source) "
+        "SELECT id, embedding, 'profile' FROM users WHERE embedding IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    if _columns("user_face_templates") is not None:
+        op.drop_table("user_face_templates")
@@ -0,0 +1,30 @@
+"""Index photo faces by matched user for personal galleries
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if "photo_faces" not in inspector.get_table_names():
+        return
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_photo_faces_matched_user_photo "
+        "ON photo_faces (matched_user_id, photo_id)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_photo_faces_matched_user_photo")
@@ -0,0 +1,43 @@
+"""Flag photo faces confirmed by their guest
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table_name: str):
+    inspector = sa.inspect(op.get_bind())
+    if table_name not in inspector.get_table_names():
+        return None
+    return {column["name"] for column in inspector.get_columns(table_name)}
+
+
+def upgrade() -> None:
+    columns = _columns("photo_faces")
+    if columns is not None and "confirmed" not in columns:
+        op.add_column(
+            "photo_faces",
+            sa.Column("confirmed", sa.Boolean(), nullable=False, server_default=sa.false())
+        )
+        # Confirmations so far were pinned with a zero distance
+        op.execute(
+            "UPDATE photo_faces SET confirmed = TRUE "
+            "WHERE matched_user_id IS NOT NULL AND match_distance = 0 AND match_confidence IS NULL"
+        )
+
+
+def downgrade() -> None:
+    columns = _columns("photo_faces")
+    if columns is not None and "confirmed" in columns:
+        op.drop_column("photo_faces", "confirmed")
@@ -0,0 +1,30 @@
+"""Index face templates for nearest-neighbour search
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if "user_face_templates" not in inspector.get_table_names():
+        return
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_user_face_templates_embedding_hnsw ON user_face_templates "
+        "USING hnsw (embedding vector_l2_ops) WITH (m = 16, ef_construction = 64)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_user_face_templates_embedding_hnsw")
@@ -0,0 +1,38 @@
+"""Hash uploaded photo bytes for duplicate checks before storing
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table_name: str):
+    inspector = sa.inspect(op.get_bind())
+    if table_name not in inspector.get_table_names():
+        return None
+    return {column["name"] for column in inspector.get_columns(table_name)}
+
+
+def upgrade() -> None:
+    columns = _columns("photos")
+    # Photos uploaded before have no upload hash and are not found as duplicates
+    if columns is not None and "upload_hash" not in columns:
+        op.add_column("photos", sa.Column("upload_hash", sa.String(64), nullable=True))
+        op.create_index("ix_photos_event_upload_hash", "photos", ["event_id", "upload_hash"])
+
+
+def downgrade() -> None:
+    columns = _columns("photos")
+    if columns is not None and "upload_hash" in columns:
+        op.drop_index("ix_photos_event_upload_hash", table_name="photos")
+        op.drop_column("photos", "upload_hash")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark reduced-resolution JPEG decoding for face detection preprocessing.
+Decodes a fixed image set with full decoding + LANCZOS (baseline) and with
+scaled DCT decoding (draft), then compares decode time and, when
+face_recognition is installed, detection recall of the draft images against
+the baseline detections.
+
+Usage:
+    python benchmarks/decode_benchmark.py IMAGE_DIR [--repeat 3] [--no-detect] [--json results.json]
+"""
+
+import os, sys, json, time, argparse, logging, statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.face_recognition_utils as face_utils
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+MODES = {"baseline": False, "draft": True}
+
+
+def box_iou(a, b) -> float:
+    """Intersection over union of two (top, right, bottom, left) boxes."""
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    intersection = max(0, right - left) * max(0, bottom - top)
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    union = area_a + area_b - intersection
+    return intersection / union if union else 0.0
+
+
+def count_matched_boxes(reference, candidates, min_iou: float = 0.5) -> int:
+    """Greedily pair candidate boxes with reference boxes, one candidate per reference."""
+    remaining = list(candidates)
+    matched = 0
+    for box in reference:
+        best = max(remaining, key=lambda candidate: box_iou(box, candidate), default=None)
+        if best is not None and box_iou(box, best) >= min_iou:
+            remaining.remove(best)
+            matched += 1
+    return matched
+
+
+def decode(image_bytes: bytes, use_draft: bool, repeat: int):
+    """Preprocess one image repeatedly, returning the image and the median time in ms."""
+    face_utils.JPEG_DRAFT_DECODING = use_draft
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        image = face_utils.preprocess_image_for_face_detection(image_bytes)
+        timings.append((time.perf_counter() - start) * 1000)
+    return image, statistics.median(timings)
+
+
+def run_benchmark(image_dir: str, repeat: int, detect: bool):
+    face_recognition = None
+    if detect:
+        try:
+            import face_recognition
+        except ImportError:
+            print("⚠️ face_recognition not installed, measuring decode time only")
+
+    paths = sorted(
+        os.path.join(image_dir, name) for name in os.listdir(image_dir)
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+    )
+    if not paths:
+        raise SystemExit(f"No images found in {image_dir}")
+
+    per_image = []
+    for path in paths:
+        with open(path, "rb") as f:
+            image_bytes = f.read()
+
+        result = {"image": os.path.basename(path), "bytes": len(image_bytes)}
+        boxes = {}
+        for mode, use_draft in MODES.items():
+            image, decode_ms = decode(image_bytes, use_draft, repeat)
+            result[f"{mode}_decode_ms"] = round(decode_ms, 2)
+            if face_recognition is not None:
+                boxes[mode] = face_recognition.face_locations(image, number_of_times_to_upsample=1, model="hog")
+                result[f"{mode}_faces"] = len(boxes[mode])
+
+        if face_recognition is not None:
+            result["matched_faces"] = count_matched_boxes(boxes["baseline"], boxes["draft"])
+        per_image.append(result)
+        print(f"  {result['image']}: {result['baseline_decode_ms']:.1f} ms -> {result['draft_decode_ms']:.1f} ms")
+
+    summary = {
+        "images": len(per_image),
+        "repeat": repeat,
+        "baseline_decode_ms_total": round(sum(r["baseline_decode_ms"] for r in per_image), 2),
+        "draft_decode_ms_total": round(sum(r["draft_decode_ms"] for r in per_image), 2),
+    }
+    summary["speedup"] = round(summary["baseline_decode_ms_total"] / max(summary["draft_decode_ms_total"], 1e-9), 2)
+
+    if face_recognition is not None:
+        baseline_faces = sum(r["baseline_faces"] for r in per_image)
+        summary["baseline_faces"] = baseline_faces
+        summary["draft_faces"] = sum(r["draft_faces"] for r in per_image)
+        # Recall of the draft pipeline measured against what the baseline finds
+        summary["draft_recall"] = round(sum(r["matched_faces"] for r in per_image) / baseline_faces, 4) if baseline_faces else None
+
+    return {"summary": summary, "images": per_image}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reduced-resolution JPEG decoding")
+    parser.add_argument("image_dir", help="Directory with the fixed benchmark image set")
+    parser.add_argument("--repeat", type=int, default=3, help="Decodes per image, the median is reported")
+    parser.add_argument("--no-detect", action="store_true", help="Skip face detection and recall")
+    parser.add_argument("--json", help="Write the full results to this file")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    print(f"📊 Benchmarking decoding of {args.image_dir}")
+    results = run_benchmark(args.image_dir, args.repeat, not args.no_detect)
+
+    print(json.dumps(results["summary"], indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
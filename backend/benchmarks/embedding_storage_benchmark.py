@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark embedding storage formats and quantization.
+Builds a synthetic face table (default 100k faces of 2k people) and compares,
+per format, the bytes per face and the time to load the whole table into a
+float32 matrix: JSON float64 lists, the pgvector text wire format (what psycopg2
+receives for a plain SELECT of a vector column), the pgvector binary format
+(vector_send) and the float32 / float16 / int8 codecs. For the lossy codecs it
+also reports the matching accuracy delta against float32.
+
+Usage:
+    python benchmarks/embedding_storage_benchmark.py [--faces 100000] [--people 2000] [--guests 1000] [--json results.json]
+"""
+
+import os, sys, json, time, struct, argparse, logging
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.embedding_codec import EMBEDDING_DIMENSION, encode_embedding, decode_embeddings, decode_vector_send
+from utils.face_matcher import match_embedding_matrix
+
+LOSSY_CODECS = ("float16", "int8")
+
+
+def synthetic_embeddings(faces: int, people: int, guests: int, seed: int = 0):
+    """
+    Faces and guest selfies with dlib-like geometry: about 1.0 between people and
+    0.4 between two faces of the same person.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 0.065, (people, EMBEDDING_DIMENSION))
+    face_people = rng.integers(0, people, faces)
+    face_matrix = (centers[face_people] + rng.normal(0, 0.025, (faces, EMBEDDING_DIMENSION))).astype(np.float32)
+    guest_matrix = (centers[:guests] + rng.normal(0, 0.025, (guests, EMBEDDING_DIMENSION))).astype(np.float32)
+    return face_matrix, guest_matrix
+
+
+def pgvector_text(embedding) -> str:
+    """Text format Postgres sends for a vector column."""
+    return "[" + ",".join(str(float(value)) for value in embedding) + "]"
+
+
+def vector_send(embedding) -> bytes:
+    """Binary format returned by vector_send(embedding)."""
+    return struct.pack(">HH", EMBEDDING_DIMENSION, 0) + np.asarray(embedding, dtype=">f4").tobytes()
+
+
+def timed(load):
+    start = time.perf_counter()
+    matrix = load()
+    return matrix, (time.perf_counter() - start) * 1000
+
+
+def run_benchmark(faces: int, people: int, guests: int):
+    face_matrix, guest_matrix = synthetic_embeddings(faces, people, guests)
+    print(f"  Encoding {faces} faces...")
+
+    stored = {
+        "json_float64": [json.dumps(face.astype(np.float64).tolist()) for face in face_matrix],
+        "pgvector_text": [pgvector_text(face) for face in face_matrix],
+        "pgvector_binary": [vector_send(face) for face in face_matrix],
+    }
+    for codec in ("float32",) + LOSSY_CODECS:
+        stored[codec] = [encode_embedding(face, codec) for face in face_matrix]
+
+    loaders = {
+        "json_float64": lambda rows: np.asarray([json.loads(row) for row in rows], dtype=np.float32),
+        "pgvector_text": lambda rows: np.stack([np.array(row[1:-1].split(","), dtype=np.float32) for row in rows]),
+        "pgvector_binary": decode_vector_send,
+    }
+    for codec in ("float32",) + LOSSY_CODECS:
+        loaders[codec] = lambda rows, codec=codec: decode_embeddings(rows, codec)
+
+    formats = {}
+    for name, rows in stored.items():
+        matrix, load_ms = timed(lambda: loaders[name](rows))
+        formats[name] = {
+            "bytes_per_face": round(sum(len(row) for row in rows) / len(rows), 1),
+            "load_ms": round(load_ms, 1),
+            "max_abs_error": float(np.abs(matrix - face_matrix).max())
+        }
+        print(f"  {name}: {formats[name]['bytes_per_face']} B/face, {formats[name]['load_ms']} ms")
+
+    # Matching accuracy of quantized faces and guests against float32
+    user_ids = np.arange(guests, dtype=np.int64)
+    reference = match_embedding_matrix(face_matrix, user_ids, guest_matrix, threshold=0.6, top_k=1)
+    accuracy = {}
+    for codec in LOSSY_CODECS:
+        quantized_faces = decode_embeddings(stored[codec], codec)
+        quantized_guests = decode_embeddings([encode_embedding(guest, codec) for guest in guest_matrix], codec)
+        results = match_embedding_matrix(quantized_faces, user_ids, quantized_guests, threshold=0.6, top_k=1)
+
+        changed = sum(
+            1 for before, after in zip(reference, results)
+            if (before[0][0] if before else None) != (after[0][0] if after else None)
+        )
+        distance_errors = [
+            abs(before[0][1] - after[0][1])
+            for before, after in zip(reference, results)
+            if before and after and before[0][0] == after[0][0]
+        ]
+        accuracy[codec] = {
+            "changed_matches": changed,
+            "match_agreement": round(1 - changed / len(reference), 6),
+            "mean_distance_error": float(np.mean(distance_errors)) if distance_errors else 0.0,
+            "max_distance_error": float(np.max(distance_errors)) if distance_errors else 0.0
+        }
+
+    return {
+        "faces": faces,
+        "people": people,
+        "guests": guests,
+        "matched_faces": sum(1 for matches in reference if matches),
+        "formats": formats,
+        "quantization_accuracy": accuracy
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding storage formats")
+    parser.add_argument("--faces", type=int, default=100000, help="Faces in the synthetic table")
+    parser.add_argument("--people", type=int, default=2000, help="Distinct people among the faces")
+    parser.add_argument("--guests", type=int, default=1000, help="Registered guests to match against")
+    parser.add_argument("--json", help="Write the full results to this file")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    print(f"📊 Benchmarking embedding storage with {args.faces} faces")
+    results = run_benchmark(args.faces, args.people, args.guests)
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
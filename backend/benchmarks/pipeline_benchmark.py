@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Benchmark the face pipeline stage by stage.
+Runs preprocessing (decode + resize), detection, encoding and the full
+detect_faces_in_image over a fixed local image set, then matching against
+synthetic guest populations (default 1k, 10k and 100k). Matching uses the
+in-memory engine behind find_matching_users, so the guest load from Postgres
+is not part of the timings.
+
+Per stage it reports latency percentiles, throughput per core (items per CPU
+second) and the process peak RSS after the stage. Results are written as JSON
+together with the commit, configuration and machine, and --compare prints the
+p50 change of every stage against an earlier result file.
+
+Usage:
+    python benchmarks/pipeline_benchmark.py [--images IMAGE_DIR] [--profile balanced] [--repeat 3]
+        [--populations 1000 10000 100000] [--queries 200] [--batch 50]
+        [--json results.json] [--compare baseline.json]
+"""
+
+import os, sys, json, time, argparse, logging, platform, resource, subprocess
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.face_recognition_utils as face_utils
+from utils.face_detection import locate_faces
+from utils.face_matcher import match_embedding_matrix
+from utils.embedding_codec import EMBEDDING_DIMENSION
+from utils.pipeline_profile import get_pipeline_profile, pipeline_fingerprint
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+PERCENTILES = (50, 90, 99)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class StageTimer:
+    """Collects wall and CPU time of repeated calls of one stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall_ms = []
+        self.cpu_seconds = 0.0
+        self.items = 0
+
+    def run(self, func, *args, items: int = 1):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        result = func(*args)
+        self.wall_ms.append((time.perf_counter() - wall_start) * 1000)
+        self.cpu_seconds += time.process_time() - cpu_start
+        self.items += items
+        return result
+
+    def summary(self):
+        if not self.wall_ms:
+            return None
+        timings = np.asarray(self.wall_ms)
+        summary = {"calls": len(timings), "items": self.items, "mean_ms": round(float(timings.mean()), 3)}
+        for percentile in PERCENTILES:
+            summary[f"p{percentile}_ms"] = round(float(np.percentile(timings, percentile)), 3)
+        # CPU time covers every thread, so BLAS or tile threads do not inflate the figure
+        summary["items_per_cpu_second"] = round(self.items / self.cpu_seconds, 2) if self.cpu_seconds else None
+        summary["peak_rss_mb"] = peak_rss_mb()
+        return summary
+
+
+def load_image_set(image_dir: str):
+    paths = sorted(
+        os.path.join(image_dir, name) for name in os.listdir(image_dir)
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+    )
+    if not paths:
+        raise SystemExit(f"No images found in {image_dir}")
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append((os.path.basename(path), f.read()))
+    return images
+
+
+def benchmark_images(image_dir: str, profile, repeat: int):
+    """Preprocess, detect, encode and end-to-end timings over the image set."""
+    try:
+        import face_recognition
+    except ImportError:
+        print("⚠️ face_recognition not installed, measuring preprocessing only")
+        face_recognition = None
+
+    images = load_image_set(image_dir)
+    stages = {name: StageTimer(name) for name in ("preprocess", "detect", "encode", "detect_faces_in_image")}
+    faces_found = 0
+
+    for name, image_bytes in images:
+        for _ in range(repeat):
+            image = stages["preprocess"].run(face_utils.preprocess_image_for_face_detection, image_bytes, profile.max_dimension)
+            if face_recognition is None:
+                continue
+
+            locations = stages["detect"].run(locate_faces, image, profile)
+            if locations:
+                stages["encode"].run(
+                    face_recognition.face_encodings, image, locations, profile.num_jitters, profile.landmark_model,
+                    items=len(locations)
+                )
+            faces = stages["detect_faces_in_image"].run(face_utils.detect_faces_in_image, image_bytes, profile)
+        faces_found += len(faces) if face_recognition is not None else 0
+        print(f"  {name}: preprocess {stages['preprocess'].wall_ms[-1]:.1f} ms"
+              + (f", {len(faces)} faces in {stages['detect_faces_in_image'].wall_ms[-1]:.0f} ms" if face_recognition else ""))
+
+    results = {name: timer.summary() for name, timer in stages.items() if timer.wall_ms}
+    results["image_set"] = {"images": len(images), "bytes": sum(len(b) for _, b in images), "faces": faces_found}
+    return results
+
+
+def synthetic_population(guests: int, queries: int, seed: int = 0):
+    """
+    One centroid per guest with dlib-like geometry (about 1.0 between people,
+    0.4 between two faces of one person). Half the queries are faces of guests,
+    the other half strangers.
+    """
+    rng = np.random.default_rng(seed)
+    guest_matrix = rng.normal(0, 0.065, (guests, EMBEDDING_DIMENSION)).astype(np.float32)
+    known = guest_matrix[rng.integers(0, guests, queries - queries // 2)]
+    known = known + rng.normal(0, 0.025, known.shape).astype(np.float32)
+    strangers = rng.normal(0, 0.065, (queries // 2, EMBEDDING_DIMENSION)).astype(np.float32)
+    user_ids = np.arange(1, guests + 1)
+    return user_ids, guest_matrix, np.vstack([known, strangers])
+
+
+def benchmark_matching(populations, queries: int, batch: int, threshold: float):
+    """Single-face and per-photo batch matching against each population size."""
+    results = {}
+    for guests in populations:
+        user_ids, guest_matrix, query_matrix = synthetic_population(guests, queries)
+        single, batched = StageTimer("match_single"), StageTimer("match_batch")
+
+        for row in query_matrix:
+            single.run(match_embedding_matrix, row[None, :], user_ids, guest_matrix, threshold)
+        for start in range(0, len(query_matrix), batch):
+            chunk = query_matrix[start:start + batch]
+            batched.run(match_embedding_matrix, chunk, user_ids, guest_matrix, threshold, items=len(chunk))
+
+        results[str(guests)] = {"match_single": single.summary(), "match_batch": batched.summary()}
+        print(f"  {guests} guests: single p50 {results[str(guests)]['match_single']['p50_ms']:.2f} ms, "
+              f"batch of {batch} p50 {results[str(guests)]['match_batch']['p50_ms']:.2f} ms")
+    return results
+
+
+def environment(profile):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "profile": profile.to_dict(),
+        "pipeline_key": pipeline_fingerprint(profile)
+    }
+
+
+def flatten_stages(results):
+    """Stage name -> summary for every timed stage, matching stages keyed by population."""
+    stages = {name: summary for name, summary in results.get("images", {}).items() if name != "image_set"}
+    for guests, population in results.get("matching", {}).items():
+        for name, summary in population.items():
+            stages[f"{name}@{guests}"] = summary
+    return stages
+
+
+def compare(results, baseline_path: str):
+    """p50 change of every stage present in both runs, positive is slower."""
+    with open(baseline_path) as f:
+        baseline = flatten_stages(json.load(f))
+    changes = {}
+    for name, summary in flatten_stages(results).items():
+        if summary and baseline.get(name):
+            before, after = baseline[name]["p50_ms"], summary["p50_ms"]
+            changes[name] = {"baseline_p50_ms": before, "p50_ms": after, "change": round((after - before) / before, 4) if before else None}
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the face pipeline stage by stage")
+    parser.add_argument("--images", help="Directory with the fixed benchmark image set")
+    parser.add_argument("--profile", help="Pipeline profile, defaults to the active one")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per image")
+    parser.add_argument("--populations", type=int, nargs="*", default=[1000, 10000, 100000], help="Synthetic guest counts")
+    parser.add_argument("--queries", type=int, default=200, help="Face embeddings matched per population")
+    parser.add_argument("--batch", type=int, default=50, help="Faces per batch, about one large group photo")
+    parser.add_argument("--json", help="Write the full results to this file")
+    parser.add_argument("--compare", help="Earlier result file to compare p50 latencies with")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    profile = get_pipeline_profile(args.profile)
+    results = {"environment": environment(profile)}
+
+    if args.images:
+        print(f"📊 Benchmarking the image pipeline on {args.images} ({profile.name} profile)")
+        results["images"] = benchmark_images(args.images, profile, args.repeat)
+    if args.populations:
+        print(f"📊 Benchmarking matching against {', '.join(map(str, args.populations))} guests")
+        results["matching"] = benchmark_matching(args.populations, args.queries, args.batch, profile.tolerance)
+
+    if args.compare:
+        results["comparison"] = compare(results, args.compare)
+        print(json.dumps(results["comparison"], indent=2))
+    else:
+        print(json.dumps(flatten_stages(results), indent=2))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark the selfie pre-filter against the full face pipeline.
+Every image is screened by the gate and analysed by analyze_selfie with the
+gate disabled; the pipeline verdict is the ground truth. Reports gate
+precision (rejections the pipeline also rejects), the rejection rate, average
+gate and pipeline time, and the CPU time the gate saves on the set.
+
+With --degrade, darkened, overexposed, blurred and downscaled copies of every
+image are added, approximating the bad uploads seen in production.
+
+Usage:
+    python benchmarks/selfie_gate_benchmark.py IMAGE_DIR [--degrade] [--json results.json]
+"""
+
+import io, os, sys, json, time, argparse, logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageEnhance, ImageFilter
+
+import utils.face_recognition_utils as face_utils
+from utils.selfie_gate import screen_selfie
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+DEGRADATIONS = {
+    "dark": lambda image: ImageEnhance.Brightness(image).enhance(0.1),
+    "overexposed": lambda image: ImageEnhance.Brightness(image).enhance(6.0),
+    "blurred": lambda image: image.filter(ImageFilter.GaussianBlur(radius=max(image.size) / 80)),
+    "tiny": lambda image: image.resize((max(1, image.width // 12), max(1, image.height // 12))),
+}
+
+
+def load_images(image_dir: str, degrade: bool):
+    """(name, encoded bytes) of every image, plus degraded copies when requested."""
+    paths = sorted(
+        os.path.join(image_dir, name) for name in os.listdir(image_dir)
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+    )
+    if not paths:
+        raise SystemExit(f"No images found in {image_dir}")
+
+    for path in paths:
+        with open(path, "rb") as f:
+            image_bytes = f.read()
+        name = os.path.basename(path)
+        yield name, image_bytes
+
+        if degrade:
+            image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+            for label, transform in DEGRADATIONS.items():
+                buffer = io.BytesIO()
+                transform(image).save(buffer, format="JPEG", quality=90)
+                yield f"{name}:{label}", buffer.getvalue()
+
+
+def run_benchmark(image_dir: str, degrade: bool):
+    face_utils.SELFIE_GATE = False  # the pipeline verdict must not depend on the gate
+
+    per_image = []
+    for name, image_bytes in load_images(image_dir, degrade):
+        screening = screen_selfie(image_bytes)
+
+        start = time.perf_counter()
+        try:
+            analysis = face_utils.analyze_selfie(image_bytes)
+            pipeline_valid, pipeline_reason = analysis["is_valid"], analysis["reason"]
+        except face_utils.FaceRecognitionError as e:
+            pipeline_valid, pipeline_reason = False, f"error: {e}"
+        pipeline_ms = (time.perf_counter() - start) * 1000
+
+        result = {
+            "image": name,
+            "gate_passed": screening["passed"],
+            "gate_reason": screening["reason"],
+            "gate_ms": round(screening["elapsed_ms"], 2),
+            "pipeline_valid": pipeline_valid,
+            "pipeline_reason": pipeline_reason,
+            "pipeline_ms": round(pipeline_ms, 2),
+            "metrics": screening["metrics"]
+        }
+        per_image.append(result)
+        verdict = "pass" if screening["passed"] else f"reject ({screening['reason']})"
+        print(f"  {name}: gate {verdict} in {result['gate_ms']:.1f} ms, pipeline {'valid' if pipeline_valid else pipeline_reason} in {result['pipeline_ms']:.0f} ms")
+
+    rejected = [r for r in per_image if not r["gate_passed"]]
+    # A rejection is correct when the full pipeline would not have accepted the selfie either
+    correct = [r for r in rejected if not r["pipeline_valid"]]
+    invalid = [r for r in per_image if not r["pipeline_valid"]]
+    gate_ms = sum(r["gate_ms"] for r in per_image)
+    pipeline_ms = sum(r["pipeline_ms"] for r in per_image)
+
+    summary = {
+        "images": len(per_image),
+        "pipeline_invalid": len(invalid),
+        "gate_rejected": len(rejected),
+        "rejected_by_reason": {
+            reason: sum(1 for r in rejected if r["gate_reason"] == reason)
+            for reason in sorted({r["gate_reason"] for r in rejected})
+        },
+        "precision": round(len(correct) / len(rejected), 4) if rejected else None,
+        # Share of the pipeline's rejections the gate catches early
+        "recall": round(len(correct) / len(invalid), 4) if invalid else None,
+        "false_rejections": [r["image"] for r in rejected if r["pipeline_valid"]],
+        "average_gate_ms": round(gate_ms / len(per_image), 2),
+        "average_pipeline_ms": round(pipeline_ms / len(per_image), 2),
+        "pipeline_ms_total": round(pipeline_ms, 1),
+        # Rejected images skip the pipeline, every image pays for the gate
+        "saved_ms_total": round(sum(r["pipeline_ms"] for r in rejected) - gate_ms, 1),
+    }
+    summary["saved_fraction"] = round(summary["saved_ms_total"] / pipeline_ms, 4) if pipeline_ms else None
+    return {"summary": summary, "images": per_image}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the selfie pre-filter against the full face pipeline")
+    parser.add_argument("image_dir", help="Directory with selfie uploads")
+    parser.add_argument("--degrade", action="store_true", help="Add dark, overexposed, blurred and tiny copies of every image")
+    parser.add_argument("--json", help="Write the full results to this file")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    print(f"📊 Benchmarking the selfie gate on {args.image_dir}")
+    results = run_benchmark(args.image_dir, args.degrade)
+
+    print(json.dumps(results["summary"], indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
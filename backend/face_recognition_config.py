@@ -28,11 +28,62 @@ MAX_ASPECT_RATIO = 1.4      # Maximum width/height ratio for valid face
 # Detection Parameters (Balanced for stability)
 FACE_DETECTION_UPSAMPLES = 1    # Number of times to upsample for detection (stable)
 MAX_IMAGE_DIMENSION = 1000  # Reduced from 1800 to 1000
+JPEG_DRAFT_DECODING = True  # Decode JPEGs at reduced scale (1/2, 1/4, 1/8) close to MAX_IMAGE_DIMENSION
+
+# Two-resolution pipeline: locate faces on the MAX_IMAGE_DIMENSION image, encode them from
+# the original (capped at ENCODING_MAX_DIMENSION) for better embeddings of small faces
+TWO_RESOLUTION_ENCODING = False
+ENCODING_MAX_DIMENSION = 2000   # Event uploads are stored at up to 1920px, so this is their native size
+
+# Adaptive Detection Scheduling
+ADAPTIVE_UPSAMPLING = True      # Cheap first pass without upsampling settles portraits and selfies
+SMALL_IMAGE_DIMENSION = 600     # Images smaller than this get one extra upsample
+PORTRAIT_MAX_FACES = 3          # A first pass with at most this many faces...
+PORTRAIT_MIN_FACE_SIZE = 100    # ...all at least this large (px) is accepted without upsampling
+
+# Tiled Detection (panoramas and crowded group shots)
+TILED_DETECTION = True
+CROWD_FACE_COUNT = 12           # Faces found at normal effort that mark a photo as a crowd
+PANORAMA_ASPECT_RATIO = 2.0     # Images at least this elongated are always tiled
+DETECTION_TILE_SIZE = 800       # Tile edge in pixels
+DETECTION_TILE_OVERLAP = 160    # Must exceed the largest face in a crowd so no face is cut in every tile
+DETECTION_TILE_THREADS = 4
+DETECTION_NMS_OVERLAP = 0.5     # Intersection / smaller box above which tile detections are merged
+
+# Event Embedding Index (process-local cache of guest embedding matrices)
+EMBEDDING_INDEX_MAX_MB = 256    # Memory cap before least recently used events are evicted
+EMBEDDING_INDEX_TTL_SECONDS = 60    # Max age of a cached event, bounds staleness across worker processes
+
+# pgvector Matching (nearest-neighbour query in Postgres instead of in-memory matrices)
+# Used for the full-database search and for events with at least this many guests
+PGVECTOR_MATCHING_MIN_GUESTS = 2000
 
 # Matching Algorithm
+LOW_CONFIDENCE_MATCH_DISTANCE = 0.5    # Matches farther than this are re-checked when a guest joins
 USE_MULTIPLE_METRICS = True     # Use both Euclidean and cosine distance
 REQUIRE_BUILTIN_MATCH = True    # Require face_recognition.compare_faces to agree
 
+# Selfie Pre-filter (cheap checks before the face pipeline, see utils/selfie_gate.py)
+SELFIE_GATE = True
+SELFIE_MIN_DIMENSION = 160      # Shorter side in pixels
+SELFIE_MIN_BRIGHTNESS = 35      # Mean grey level (0-255)
+SELFIE_MAX_BRIGHTNESS = 235
+SELFIE_MIN_SHARPNESS = 15.0     # Variance of the Laplacian on the 320px thumbnail
+# Require a Haar cascade face candidate (OpenCV 4.x). Off until its false rejections of
+# valid selfies are measured with benchmarks/selfie_gate_benchmark.py
+SELFIE_GATE_CASCADE = False
+
+# Face Result Cache (see utils/face_cache.py)
+FACE_CACHE_EMBEDDING_CODEC = "float32"   # float32, float16 or int8 (see utils/embedding_codec.py)
+
+# Face Templates (several enrollment embeddings per user, see utils/face_templates.py)
+# Guests are matched against their centroid and each template, the closest one counts
+MAX_FACE_TEMPLATES = 5          # Templates kept per user, the profile selfie plus the newest extra ones
+
+# Face Clustering (same-person clusters of the faces within an event, see utils/face_clustering.py)
+FACE_CLUSTERING = True
+CLUSTER_DISTANCE_THRESHOLD = 0.45   # Max face-to-centroid distance, kept below the match tolerance so different people do not chain together
+
 # Logging Level
 FACE_RECOGNITION_LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR
 
@@ -41,27 +92,50 @@ ENABLE_IMAGE_PREPROCESSING = True    # Enable image preprocessing for better det
 ENABLE_FACE_QUALITY_CHECK = True     # Enable face quality validation
 
 # Accuracy Profiles
+# Each profile is a full face pipeline configuration (see utils/pipeline_profile.py):
+# detection image size, upsampling, detector, landmark model ("small" 5-point or
+# "large" 68-point), encoding jitters and matching tolerance.
+# Events can pick a profile, e.g. "fast" for huge festivals and "high_accuracy" for small private events.
 ACCURACY_PROFILES = {
     "high_accuracy": {
         "tolerance": 0.3,
         "min_face_size": 100,
         "min_face_ratio": 0.02,
         "upsamples": 2,
-        "model": "cnn"  # Requires GPU
+        "model": "cnn",  # Requires GPU
+        "max_dimension": 1600,
+        "landmark_model": "large",
+        "num_jitters": 5
     },
     "balanced": {
         "tolerance": 0.6,  # Increased for better matching
         "min_face_size": 30,
         "min_face_ratio": 0.003,
-        "upsamples": 2,
-        "model": "hog"
+        "upsamples": 1,  # Crowds get tiled detection instead of a second level everywhere
+        "model": "hog",
+        "max_dimension": MAX_IMAGE_DIMENSION,
+        "landmark_model": "small",
+        "num_jitters": 1
     },
     "high_recall": {
         "tolerance": 0.5,
         "min_face_size": 25,
         "min_face_ratio": 0.002,
         "upsamples": 2,
-        "model": "hog"
+        "model": "hog",
+        "max_dimension": 1400,
+        "landmark_model": "large",
+        "num_jitters": 1
+    },
+    "fast": {
+        "tolerance": 0.6,
+        "min_face_size": 40,
+        "min_face_ratio": 0.005,
+        "upsamples": 1,
+        "model": "hog",
+        "max_dimension": 800,
+        "landmark_model": "small",
+        "num_jitters": 1
     }
 }
 
@@ -71,7 +145,8 @@ CURRENT_PROFILE = "balanced"
 def apply_profile(profile_name: str):
     """Apply a predefined accuracy profile."""
     global FACE_RECOGNITION_TOLERANCE, MIN_FACE_SIZE, MIN_FACE_RATIO
-    global FACE_DETECTION_UPSAMPLES, FACE_DETECTION_MODEL
+    global FACE_DETECTION_UPSAMPLES, FACE_DETECTION_MODEL, MAX_IMAGE_DIMENSION
+    global CURRENT_PROFILE
     
     if profile_name not in ACCURACY_PROFILES:
         raise ValueError(f"Unknown profile: {profile_name}")
@@ -83,6 +158,8 @@ def apply_profile(profile_name: str):
     MIN_FACE_RATIO = profile["min_face_ratio"]
     FACE_DETECTION_UPSAMPLES = profile["upsamples"]
     FACE_DETECTION_MODEL = profile["model"]
+    MAX_IMAGE_DIMENSION = profile["max_dimension"]
+    CURRENT_PROFILE = profile_name  # Read at call time by utils/pipeline_profile.py
     
     print(f"Applied face recognition profile: {profile_name}")
     print(f"  Tolerance: {FACE_RECOGNITION_TOLERANCE}")
@@ -1,12 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
+import logging
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Library modules never configure logging, the app does (LOG_LEVEL=DEBUG for per-image pipeline details)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+
 app = FastAPI(
     title="SnapCircle API",
     description="Event Photo Sharing Application API",
@@ -16,9 +20,9 @@ app = FastAPI(
 # CORS middleware - Production ready
 frontend_url = os.getenv("FRONTEND_URL", "http://localhost:3000")
 if not frontend_url:
-    import logging; logging.error("FRONTEND_URL not set in environment!")
+    logging.error("FRONTEND_URL not set in environment!")
 else:
-    import logging; logging.info(f"Allowing CORS from: {frontend_url}")
+    logging.info(f"Allowing CORS from: {frontend_url}")
     
 allowed_origins = [
     "http://localhost:3000",  # Local development
@@ -53,6 +57,18 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    # Face pipeline stage timings in the Prometheus text format
+    from utils.face_metrics import render_metrics
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.on_event("shutdown")
+async def shutdown_face_workers():
+    from utils.face_workers import face_worker_pool
+    face_worker_pool.shutdown()
+
 # Import and include routers
 from routers import auth, events, photos
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
@@ -4,5 +4,9 @@ from .event import Event
 from .event_registration import EventRegistration
 from .photo import Photo
 from .photo_face import PhotoFace
+from .face_job import FaceJob
+from .face_result_cache import FaceResultCache
+from .face_cluster import FaceCluster
+from .user_face_template import UserFaceTemplate
 
-__all__ = ["User", "Event", "EventRegistration", "Photo", "PhotoFace"]
+__all__ = ["User", "Event", "EventRegistration", "Photo", "PhotoFace", "FaceJob", "FaceResultCache", "FaceCluster", "UserFaceTemplate"]
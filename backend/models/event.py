@@ -23,6 +23,7 @@ class Event(Base):
     event_date = Column(Date, nullable=False)
     description = Column(Text, nullable=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    face_profile = Column(String(50), nullable=True)  # Face pipeline profile name, None uses the active profile
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -30,6 +31,7 @@ class Event(Base):
     owner = relationship("User", back_populates="owned_events")
     registrations = relationship("EventRegistration", back_populates="event", cascade="all, delete-orphan")
     photos = relationship("Photo", back_populates="event", cascade="all, delete-orphan")
+    face_clusters = relationship("FaceCluster", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Event(id={self.id}, name='{self.event_name}', date='{self.event_date}')>"
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from pgvector.sqlalchemy import Vector
+from database.connection import Base
+
+
+class FaceCluster(Base):
+    __tablename__ = "face_clusters"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(Integer, ForeignKey("events.id"), nullable=False, index=True)
+    centroid = Column(Vector(128), nullable=False)  # Mean embedding of the cluster's faces
+    face_count = Column(Integer, nullable=False, default=0)
+    matched_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Guest the cluster was labelled with
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    faces = relationship("PhotoFace", back_populates="cluster")
+
+    def __repr__(self):
+        return f"<FaceCluster(id={self.id}, event_id={self.event_id}, faces={self.face_count}, matched_user_id={self.matched_user_id})>"
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from database.connection import Base
+
+
+class FaceJob(Base):
+    __tablename__ = "face_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    photo_id = Column(Integer, ForeignKey("photos.id", ondelete="CASCADE"), unique=True, nullable=False)  # One job per photo
+    event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), index=True, nullable=False)
+    status = Column(String(20), default="pending", nullable=False)  # pending, running, done, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    locked_by = Column(String(255), nullable=True)  # Worker id holding the job
+    locked_at = Column(DateTime(timezone=True), nullable=True)  # Lease start, stale leases are reclaimed
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    duration_ms = Column(Integer, nullable=True)
+    faces_detected = Column(Integer, nullable=True)
+    faces_matched = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Relationships
+    photo = relationship("Photo", back_populates="face_job")
+
+    # Workers scan for claimable jobs by status in id order
+    __table_args__ = (Index("ix_face_jobs_status_id", "status", "id"),)
+
+    def __repr__(self):
+        return f"<FaceJob(id={self.id}, photo_id={self.photo_id}, status='{self.status}', attempts={self.attempts})>"
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, UniqueConstraint
+from sqlalchemy.sql import func
+from database.connection import Base
+
+
+class FaceResultCache(Base):
+    __tablename__ = "face_result_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), nullable=False)  # SHA-256 of the stored image bytes
+    pipeline_key = Column(String(64), nullable=False)  # Fingerprint of the detection settings that produced the faces
+    faces = Column(JSON, nullable=False)  # Detected faces: boxes, metrics and embeddings
+    face_count = Column(Integer, nullable=False, default=0)
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # One result per image and pipeline configuration
+    __table_args__ = (UniqueConstraint("content_hash", "pipeline_key", name="unique_face_result_cache_key"),)
+
+    def __repr__(self):
+        return f"<FaceResultCache(id={self.id}, hash='{self.content_hash[:12]}', faces={self.face_count})>"
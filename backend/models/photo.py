@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database.connection import Base
@@ -16,11 +16,29 @@ class Photo(Base):
     original_filename = Column(String(255), nullable=True)
     file_size = Column(Integer, nullable=True)  # Size in bytes
     mime_type = Column(String(100), nullable=True)
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of the stored image bytes
+    upload_hash = Column(String(64), nullable=True)  # SHA-256 of the uploaded bytes, before resizing
+
+    # Face processing state
+    face_status = Column(String(20), nullable=False, default="pending", server_default="pending")  # pending, done, failed
+    face_pipeline_key = Column(String(64), nullable=True)  # Pipeline fingerprint the faces were produced with
+    face_count = Column(Integer, nullable=True)  # Faces detected, 0 is a valid result
+    faces_processed_at = Column(DateTime(timezone=True), nullable=True)
+    face_processing_ms = Column(Integer, nullable=True)
     
     # Relationships
     event = relationship("Event", back_populates="photos")
     uploader = relationship("User", back_populates="uploaded_photos")
     faces = relationship("PhotoFace", back_populates="photo", cascade="all, delete-orphan")
+    face_job = relationship("FaceJob", back_populates="photo", uselist=False, cascade="all, delete-orphan")
+
+    # Duplicate uploads are looked up by hash within the event,
+    # unprocessed photos by status within the event
+    __table_args__ = (
+        Index("ix_photos_event_content_hash", "event_id", "content_hash"),
+        Index("ix_photos_event_upload_hash", "event_id", "upload_hash"),
+        Index("ix_photos_event_face_status", "event_id", "face_status"),
+    )
     
     def __repr__(self):
         return f"<Photo(id={self.id}, event_id={self.event_id}, path='{self.image_path}')>"
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, String
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Float, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from sqlalchemy.dialects.postgresql import JSON
+from pgvector.sqlalchemy import Vector
 from database.connection import Base
 
 
@@ -11,14 +11,33 @@ class PhotoFace(Base):
     id = Column(Integer, primary_key=True, index=True)
     photo_id = Column(Integer, ForeignKey("photos.id"), nullable=False)
     face_index = Column(Integer, nullable=False)  # Index of face in the photo (0, 1, 2, etc.)
-    embedding = Column(JSON, nullable=False)  # Face embedding as JSON array
+    embedding = Column(Vector(128), nullable=False)  # Face embedding as pgvector vector(128)
     bounding_box = Column(String(50), nullable=True)  # Face bounding box coordinates as string "(x1,y1),(x2,y2)"
     matched_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Matched user if found
+    match_distance = Column(Float, nullable=True)  # Embedding distance to the matched user (lower is more confident)
+    match_confidence = Column(Float, nullable=True)  # Margin to the face's next best candidate (higher is more confident)
+    confirmed = Column(Boolean, nullable=False, default=False, server_default="false")  # Confirmed by the matched guest, never re-matched
+    cluster_id = Column(Integer, ForeignKey("face_clusters.id", ondelete="SET NULL"), nullable=True, index=True)  # Same-person cluster within the event
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     photo = relationship("Photo", back_populates="faces")
     matched_user = relationship("User", foreign_keys=[matched_user_id])
+    cluster = relationship("FaceCluster", back_populates="faces")
+
+    # HNSW index for nearest-neighbour face search (<-> operator);
+    # a face index is stored once per photo so concurrent workers cannot duplicate rows;
+    # personal galleries look up a user's faces by matched_user_id
+    __table_args__ = (
+        UniqueConstraint('photo_id', 'face_index', name='unique_photo_face_index'),
+        Index("ix_photo_faces_matched_user_photo", "matched_user_id", "photo_id"),
+        Index(
+            "ix_photo_faces_embedding_hnsw", "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_l2_ops"}
+        ),
+    )
     
     def __repr__(self):
         return f"<PhotoFace(id={self.id}, photo_id={self.photo_id}, face_index={self.face_index}, matched_user_id={self.matched_user_id})>"
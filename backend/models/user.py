@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from sqlalchemy.dialects.postgresql import JSON
+from pgvector.sqlalchemy import Vector
 from database.connection import Base
 
 class User(Base):
@@ -12,7 +12,7 @@ class User(Base):
     email = Column(String(255), unique=True, index=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
     selfie_image_path = Column(String(1000), nullable=True)  # Local path or S3 URL for user selfie
-    embedding = Column(JSON, nullable=True)  # Face embedding as JSON array
+    embedding = Column(Vector(128), nullable=True)  # Face embedding as pgvector vector(128), the centroid of the face templates
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -20,6 +20,17 @@ class User(Base):
     owned_events = relationship("Event", back_populates="owner", cascade="all, delete-orphan")
     event_registrations = relationship("EventRegistration", back_populates="user", cascade="all, delete-orphan")
     uploaded_photos = relationship("Photo", back_populates="uploader", cascade="all, delete-orphan")
+    face_templates = relationship("UserFaceTemplate", back_populates="user", cascade="all, delete-orphan", order_by="UserFaceTemplate.id")
+
+    # HNSW index for nearest-neighbour face matching (<-> operator)
+    __table_args__ = (
+        Index(
+            "ix_users_embedding_hnsw", "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_l2_ops"}
+        ),
+    )
     
     def __repr__(self):
         return f"<User(id={self.id}, name='{self.name}', email='{self.email}')>"
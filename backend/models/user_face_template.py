@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from pgvector.sqlalchemy import Vector
+from database.connection import Base
+
+
+class UserFaceTemplate(Base):
+    __tablename__ = "user_face_templates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    embedding = Column(Vector(128), nullable=False)  # Enrollment embedding
+    source = Column(String(20), nullable=False)  # profile, selfie (extra selfie) or photo (confirmed photo match)
+    photo_face_id = Column(Integer, ForeignKey("photo_faces.id", ondelete="SET NULL"), nullable=True)  # Confirmed face for photo templates
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    user = relationship("User", back_populates="face_templates")
+
+    # HNSW index for the full-database face search, which matches templates like centroids
+    __table_args__ = (
+        Index(
+            "ix_user_face_templates_embedding_hnsw", "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_l2_ops"}
+        ),
+    )
+
+    def __repr__(self):
+        return f"<UserFaceTemplate(id={self.id}, user_id={self.user_id}, source='{self.source}')>"
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Prune the face result cache for SnapCircle.
+Deletes cached detection results of pipeline settings that are no longer
+configured and results unused for longer than --max-age-days. Face workers
+run the same pruning periodically (FACE_CACHE_PRUNE_INTERVAL).
+
+Usage:
+    python prune_face_cache.py [--max-age-days 90] [--dry-run]
+"""
+
+import sys, argparse, logging
+
+
+def main():
+    from utils.face_cache import FACE_CACHE_MAX_AGE_DAYS
+
+    parser = argparse.ArgumentParser(description="Prune the face result cache")
+    parser.add_argument("--max-age-days", type=int, default=FACE_CACHE_MAX_AGE_DAYS,
+                        help="Delete entries unused for longer, 0 keeps them")
+    parser.add_argument("--dry-run", action="store_true", help="Count the entries without deleting them")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    from database.connection import SessionLocal
+    from utils.face_cache import prune_face_cache
+
+    db = SessionLocal()
+    try:
+        result = prune_face_cache(db, args.max_age_days, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    print(
+        f"{'🔍 Dry run' if args.dry_run else '🧹 Pruned'}: "
+        f"{result['stale_pipeline']} stale pipeline entries, {result['expired']} expired entries"
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Re-match stored face embeddings for SnapCircle.
+Re-scores PhotoFace embeddings against the current guest embeddings and
+tolerance after a tolerance or profile change, without re-detecting any photo.
+
+Usage:
+    python rematch.py (--event ID_OR_CODE [--event ...] | --all) [--threshold 0.6] [--dry-run] [--diff-limit 100] [--json diff.json]
+"""
+
+import sys, json, argparse, logging
+
+
+def resolve_event_ids(db, identifiers):
+    from models.event import Event
+
+    event_ids = []
+    for identifier in identifiers:
+        if identifier.isdigit():
+            event = db.query(Event).filter(Event.id == int(identifier)).first()
+        else:
+            event = db.query(Event).filter(Event.event_code == identifier.upper()).first()
+        if not event:
+            raise SystemExit(f"❌ Event not found: {identifier}")
+        event_ids.append(event.id)
+    return event_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-match stored face embeddings against current guests")
+    scope = parser.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--event", action="append", help="Event ID or code, repeatable")
+    scope.add_argument("--all", action="store_true", help="Re-match every event with photos")
+    parser.add_argument("--threshold", type=float, help="Match tolerance (defaults to each event's profile)")
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes without writing them")
+    parser.add_argument("--diff-limit", type=int, default=100, help="Maximum number of changed faces listed")
+    parser.add_argument("--json", help="Write the full result to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    from database.connection import SessionLocal
+    from utils.face_rematch import rematch_faces
+
+    db = SessionLocal()
+    try:
+        event_ids = None if args.all else resolve_event_ids(db, args.event)
+        result = rematch_faces(db, event_ids, args.threshold, args.dry_run, args.diff_limit)
+    finally:
+        db.close()
+
+    print(f"{'🔍 Dry run' if args.dry_run else '✅ Re-matched'}: {result['events']} events, {result['faces']} faces")
+    print(f"  added {result['added']}, removed {result['removed']}, reassigned {result['reassigned']}, unchanged {result['unchanged']}")
+    for change in result["changes"]:
+        print(
+            f"  face {change['face_id']} (photo {change['photo_id']}): "
+            f"{change['previous_user_id']} -> {change['new_user_id']}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"✅ Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional
@@ -11,6 +12,7 @@ from models.event_registration import EventRegistration
 from models.photo import Photo
 from schemas import (
     EventCreate,
+    EventFaceProfileUpdate,
     EventResponse,
     EventWithDetails,
     EventRegistrationCreate,
@@ -22,7 +24,12 @@ from schemas import (
 from utils.auth import get_current_user, get_password_hash
 from utils.qr_generator import generate_event_qr_code
 from utils.file_handler import save_uploaded_file, delete_file
-from utils.face_recognition_utils import generate_face_embedding, validate_face_image, FaceRecognitionError
+from utils.face_recognition_utils import analyze_selfie, FaceRecognitionError
+from utils.selfie_gate import rejection_message
+from utils.embedding_index import embedding_index
+from utils.face_processing import match_guest_in_event_photos
+from utils.pipeline_profile import get_pipeline_profile
+from utils.face_templates import set_profile_template
 
 router = APIRouter()
 
@@ -35,6 +42,15 @@ async def create_event(
     """Create a new event."""
     from models.event import generate_event_code
 
+    if event_data.face_profile:
+        try:
+            get_pipeline_profile(event_data.face_profile)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+
     # Generate unique event code
     event_code = generate_event_code()
     print(f"🎲 Generated event code: {event_code}")
@@ -55,7 +71,8 @@ async def create_event(
         event_name=event_data.event_name,
         event_date=event_data.event_date,
         description=event_data.description,
-        owner_id=current_user.id
+        owner_id=current_user.id,
+        face_profile=event_data.face_profile
     )
 
     db.add(db_event)
@@ -303,6 +320,12 @@ async def join_event(
     db.commit()
     db.refresh(registration)
 
+    # Guest set changed, drop the cached face index for this event
+    embedding_index.invalidate(event.id)
+
+    # Find the new guest in photos that were processed before they joined
+    await run_in_threadpool(match_guest_in_event_photos, db, current_user.id, current_user.embedding, [event.id])
+
     return registration
 
 @router.delete("/{event_code}/leave", response_model=MessageResponse)
@@ -342,6 +365,9 @@ async def leave_event(
     db.delete(registration)
     db.commit()
 
+    # Guest set changed, drop the cached face index for this event
+    embedding_index.invalidate(event.id)
+
     return {"message": "Successfully left the event"}
 
 @router.get("/{event_code}/guests", response_model=List[UserResponse])
@@ -397,9 +423,44 @@ async def delete_event(
 
     db.delete(event)
     db.commit()
+    embedding_index.invalidate(event.id)
 
     return {"message": "Event deleted successfully"}
 
+@router.put("/{event_code}/face-profile", response_model=MessageResponse)
+async def update_event_face_profile(
+    event_code: str,
+    profile_data: EventFaceProfileUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Choose the face pipeline profile for photos processed from now on (only accessible by event owner)."""
+    event = db.query(Event).filter(Event.event_code == event_code.upper()).first()
+    if not event:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
+
+    if event.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only event owner can change the face profile"
+        )
+
+    try:
+        profile = get_pipeline_profile(profile_data.face_profile)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    event.face_profile = profile_data.face_profile
+    db.commit()
+
+    return {"message": f"Event face profile set to {profile.name}"}
+
 @router.get("/{event_code}/qr-code")
 async def get_event_qr_code(
     event_code: str,
@@ -536,6 +597,12 @@ async def join_event_by_code(
     db.commit()
     db.refresh(registration)
 
+    # Guest set changed, drop the cached face index for this event
+    embedding_index.invalidate(event.id)
+
+    # Find the new guest in photos that were processed before they joined
+    await run_in_threadpool(match_guest_in_event_photos, db, current_user.id, current_user.embedding, [event.id])
+
     return registration
 
 
@@ -582,40 +649,23 @@ async def register_and_join_event_with_selfie(
         from utils.aws_config import aws_config
         from routers.photos import get_secure_photo_url
 
-        image_path_for_processing = file_path
-
-        # For S3 storage, we need to use the secure URL for face processing
-        if aws_config.use_s3_storage and file_path.startswith('http'):
-            # Use the S3 URL directly - our face recognition utils can handle it
-            image_path_for_processing = get_secure_photo_url(file_path)
-        else:
-            # For local storage, construct the full path
-            upload_dir = os.getenv("UPLOAD_DIR", "../uploads")
-            image_path_for_processing = os.path.join(upload_dir, file_path)
-
-        # Validate that the image contains a suitable face for recognition
-        print(f"🔍 Validating face in selfie: {image_path_for_processing}")
-        if not validate_face_image(image_path_for_processing):
-            print(f"❌ Face validation failed for {image_path_for_processing}")
-            delete_file(file_path)
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Selfie must contain at least one clearly visible face. Please upload a clear photo of your face."
-            )
-        print(f"✅ Face validation passed for {image_path_for_processing}")
-
-        # Generate face embedding
-        print(f"🤖 Generating face embedding for {image_path_for_processing}")
+        # Analyze the bytes we just stored, no S3 download or disk read needed
+        image_for_processing = metadata.get("content")
+
+        if image_for_processing is None:
+            # Image was stored unprocessed, read it back (works with both S3 and local)
+            if aws_config.use_s3_storage and file_path.startswith('http'):
+                # Use the S3 URL directly - our face recognition utils can handle it
+                image_for_processing = get_secure_photo_url(file_path)
+            else:
+                # For local storage, construct the full path
+                upload_dir = os.getenv("UPLOAD_DIR", "../uploads")
+                image_for_processing = os.path.join(upload_dir, file_path)
+
+        # Validate the selfie and generate its face embedding in a single detection pass
+        print(f"🔍 Analyzing selfie: {file_path}")
         try:
-            face_embedding = generate_face_embedding(image_path_for_processing)
-            if face_embedding is None:
-                print(f"❌ No face embedding generated for {image_path_for_processing}")
-                delete_file(file_path)
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Could not detect a face in the uploaded selfie. Please try a clearer photo."
-                )
-            print(f"✅ Face embedding generated successfully, shape: {face_embedding.shape}")
+            analysis = await run_in_threadpool(analyze_selfie, image_for_processing)
         except FaceRecognitionError as e:
             print(f"❌ Face recognition error: {str(e)}")
             delete_file(file_path)
@@ -624,13 +674,24 @@ async def register_and_join_event_with_selfie(
                 detail=f"Face recognition failed: {str(e)}"
             )
         except Exception as e:
-            print(f"❌ Unexpected error during face embedding: {str(e)}")
+            print(f"❌ Unexpected error during face analysis: {str(e)}")
             delete_file(file_path)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="An unexpected error occurred during face processing. Please try again."
             )
 
+        if not analysis["is_valid"]:
+            print(f"❌ Face validation failed for {file_path}: {analysis['reason']}")
+            delete_file(file_path)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=rejection_message(analysis["reason"]) or "Selfie must contain at least one clearly visible face. Please upload a clear photo of your face."
+            )
+
+        face_embedding = analysis["embedding"]
+        print(f"✅ Selfie accepted, embedding shape: {face_embedding.shape}")
+
         # Create new user with face embedding
         print(f"👤 Creating new user: {name} ({email})")
         hashed_password = get_password_hash(password)
@@ -638,9 +699,9 @@ async def register_and_join_event_with_selfie(
             name=name,
             email=email,
             password_hash=hashed_password,
-            selfie_image_path=file_path,
-            embedding=face_embedding.tolist()
+            selfie_image_path=file_path
         )
+        set_profile_template(new_user, face_embedding)
         print(f"✅ User object created successfully")
 
         # Save user to database
@@ -663,6 +724,12 @@ async def register_and_join_event_with_selfie(
         db.refresh(registration)
         print(f"✅ Registration completed with ID: {registration.id}")
 
+        # Guest set changed, drop the cached face index for this event
+        embedding_index.invalidate(event.id)
+
+        # Find the new guest in photos that were processed before they registered
+        await run_in_threadpool(match_guest_in_event_photos, db, new_user.id, face_embedding, [event.id])
+
         return registration
 
     except HTTPException:
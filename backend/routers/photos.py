@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import os
+import time
+import contextvars
 
 from database.connection import get_db
 from models.user import User
@@ -15,19 +18,46 @@ from schemas import (
     PhotoFaceResponse,
     PhotoWithFaces,
     FaceProcessingRequest,
-    FaceProcessingResponse
+    FaceProcessingResponse,
+    FaceJobProgressResponse,
+    FaceRematchResponse,
+    PersonalGalleryResponse,
+    FaceSearchResponse
 )
 from utils.auth import get_current_user
-from utils.file_handler import save_uploaded_file, delete_file, get_file_url
+from utils.file_handler import save_uploaded_file, delete_file, get_file_url, validate_image_file
 from utils.s3_storage import s3_storage
 from utils.aws_config import aws_config
 from utils.face_recognition_utils import (
-    generate_face_embedding,
-    validate_face_image,
+    analyze_selfie,
     FaceRecognitionError,
-    detect_faces_in_image,
-    find_matching_users_for_event
+    detect_faces_in_image
 )
+from utils.embedding_index import embedding_index
+from utils.face_processing import (
+    resolve_image_source,
+    store_pending_faces,
+    match_guest_in_event_photos,
+    unprocessed_photos_condition,
+    mark_photo_processed,
+    mark_photo_failed,
+    clear_reprocessed_faces,
+    FACE_PROCESSING_CHUNK_SIZE
+)
+from utils.face_jobs import schedule_face_processing, enqueue_face_jobs, get_event_job_progress
+from utils.pipeline_profile import get_pipeline_profile, profile_for_event, pipeline_fingerprint
+from utils.face_cache import detect_faces_cached, face_cache_stats, compute_content_hash
+from utils.face_clustering import cluster_unclustered_faces, remove_photo_faces_from_clusters
+from utils.face_rematch import rematch_faces
+from utils.face_templates import (
+    set_profile_template,
+    add_face_template,
+    confirm_face_rejection,
+    CONFIRM_OTHER_GUEST
+)
+from utils.face_search import search_event_photos_by_face
+from utils.selfie_gate import rejection_message, selfie_gate_stats
+from utils.match_trace import match_trace
 
 router = APIRouter()
 
@@ -75,54 +105,60 @@ async def upload_profile_photo(
             max_height=800  # Resize to max 800px height
         )
 
-        # Get the image path/URL for face recognition (works with both S3 and local)
-        image_path_for_processing = file_path
+        # Analyze the bytes we just stored, no S3 download or disk read needed
+        image_for_processing = metadata.get("content")
 
-        # For S3 storage, we need to use the secure URL for face processing
-        if aws_config.use_s3_storage and file_path.startswith('http'):
-            # Use the S3 URL directly - our face recognition utils can handle it
-            image_path_for_processing = get_secure_photo_url(file_path)
-        else:
-            # For local storage, construct the full path
-            upload_dir = os.getenv("UPLOAD_DIR", "../uploads")
-            image_path_for_processing = os.path.join(upload_dir, file_path)
+        if image_for_processing is None:
+            # Image was stored unprocessed, read it back (works with both S3 and local)
+            if aws_config.use_s3_storage and file_path.startswith('http'):
+                # Use the S3 URL directly - our face recognition utils can handle it
+                image_for_processing = get_secure_photo_url(file_path)
+            else:
+                # For local storage, construct the full path
+                upload_dir = os.getenv("UPLOAD_DIR", "../uploads")
+                image_for_processing = os.path.join(upload_dir, file_path)
 
-        # Validate that the image contains exactly one face
-        if not validate_face_image(image_path_for_processing):
+        # Validate the selfie and generate its face embedding in a single detection pass
+        try:
+            analysis = await run_in_threadpool(analyze_selfie, image_for_processing)
+        except FaceRecognitionError as e:
             # Clean up the uploaded file
             delete_file(file_path)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Profile photo must contain exactly one clearly visible face. Please upload a clear selfie."
+                detail=f"Face recognition failed: {str(e)}"
             )
 
-        # Generate face embedding
-        try:
-            face_embedding = generate_face_embedding(image_path_for_processing)
-            if face_embedding is None:
-                # Clean up the uploaded file
-                delete_file(file_path)
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Could not detect a face in the uploaded image. Please upload a clear selfie."
-                )
-        except FaceRecognitionError as e:
+        if not analysis["is_valid"]:
             # Clean up the uploaded file
             delete_file(file_path)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Face recognition failed: {str(e)}"
+                detail=rejection_message(analysis["reason"]) or "Profile photo must contain exactly one clearly visible face. Please upload a clear selfie."
             )
 
+        face_embedding = analysis["embedding"]
+
         # Delete old profile photo if exists
         if current_user.selfie_image_path:
             delete_file(current_user.selfie_image_path)
 
-        # Update user's profile photo path and face embedding
+        # Update user's profile photo path and face templates (User.embedding is their centroid)
         current_user.selfie_image_path = file_path
-        current_user.embedding = face_embedding.tolist()  # Convert numpy array to list for PostgreSQL
+        set_profile_template(current_user, face_embedding)
         db.commit()
 
+        # The user's embedding changed, drop cached face indexes of their events
+        embedding_index.invalidate_user(db, current_user.id)
+
+        # Re-scan the stored faces of the user's events with the new selfie
+        registered_event_ids = [
+            event_id for (event_id,) in db.query(EventRegistration.event_id).filter(
+                EventRegistration.user_id == current_user.id
+            ).all()
+        ]
+        await run_in_threadpool(match_guest_in_event_photos, db, current_user.id, face_embedding, registered_event_ids)
+
         return {"message": "Profile photo uploaded and face registered successfully"}
 
     except HTTPException:
@@ -154,6 +190,108 @@ async def delete_profile_photo(
     
     return {"message": "Profile photo deleted successfully"}
 
+@router.post("/profile/templates", response_model=MessageResponse)
+async def add_profile_selfie(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Add an extra selfie (e.g. in different lighting) as a face template."""
+    validate_image_file(file)
+    image_bytes = await file.read()
+
+    try:
+        analysis = await run_in_threadpool(analyze_selfie, image_bytes)
+    except FaceRecognitionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Face recognition failed: {str(e)}"
+        )
+
+    if not analysis["is_valid"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=rejection_message(analysis["reason"]) or "Selfie must contain exactly one clearly visible face."
+        )
+
+    add_face_template(current_user, analysis["embedding"], "selfie")
+    db.commit()
+
+    # The user's centroid and templates changed, refresh their matches
+    embedding_index.invalidate_user(db, current_user.id)
+    registered_event_ids = [
+        event_id for (event_id,) in db.query(EventRegistration.event_id).filter(
+            EventRegistration.user_id == current_user.id
+        ).all()
+    ]
+    await run_in_threadpool(match_guest_in_event_photos, db, current_user.id, analysis["embedding"], registered_event_ids)
+
+    return {"message": f"Selfie added, {len(current_user.face_templates)} face templates registered"}
+
+
+@router.post("/faces/{face_id}/confirm", response_model=MessageResponse)
+async def confirm_photo_face(
+    face_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Confirm that a face in an event photo is the current user, and learn it as a face template."""
+    face = db.query(PhotoFace).filter(PhotoFace.id == face_id).first()
+    if not face:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Face not found"
+        )
+
+    event_id = db.query(Photo.event_id).filter(Photo.id == face.photo_id).scalar()
+    is_registered = db.query(EventRegistration).filter(
+        EventRegistration.event_id == event_id,
+        EventRegistration.user_id == current_user.id
+    ).first() is not None
+
+    if not is_registered:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. You must be a registered guest of this event."
+        )
+
+    rejection = confirm_face_rejection(db, current_user.id, face, profile_for_event(db, event_id).tolerance)
+    if rejection == CONFIRM_OTHER_GUEST:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This face is already matched to another guest."
+        )
+    if rejection:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This face does not match your registered face."
+        )
+
+    # A user appears at most once per photo
+    db.query(PhotoFace).filter(
+        PhotoFace.photo_id == face.photo_id,
+        PhotoFace.matched_user_id == current_user.id,
+        PhotoFace.id != face.id
+    ).update(
+        {"matched_user_id": None, "match_distance": None, "match_confidence": None, "confirmed": False},
+        synchronize_session=False
+    )
+
+    # Confirmed faces are skipped by re-matching, no other guest can claim the face
+    face.matched_user_id = current_user.id
+    face.match_distance = 0.0
+    face.match_confidence = None
+    face.confirmed = True
+    if not any(template.photo_face_id == face.id for template in current_user.face_templates):
+        add_face_template(current_user, face.embedding, "photo", photo_face_id=face.id)
+    db.commit()
+
+    embedding_index.invalidate_user(db, current_user.id)
+    await run_in_threadpool(match_guest_in_event_photos, db, current_user.id, current_user.embedding, [event_id])
+
+    return {"message": "Face confirmed"}
+
+
 @router.post("/events/{event_identifier}", response_model=List[PhotoResponse])
 async def upload_event_photos(
     event_identifier: str,
@@ -207,6 +345,19 @@ async def upload_event_photos(
             print(f"   Content type: {file.content_type}")
             print(f"   File size: {getattr(file, 'size', 'unknown')} bytes")
 
+            # The same image uploaded to this event before is not stored twice,
+            # checked on the uploaded bytes before anything is written
+            upload_hash = compute_content_hash(await file.read())
+            await file.seek(0)
+            duplicate = db.query(Photo).filter(
+                Photo.event_id == event.id,
+                Photo.upload_hash == upload_hash
+            ).first()
+            if duplicate:
+                print(f"♻️ Duplicate of photo {duplicate.id}, not stored again")
+                uploaded_photos.append(duplicate)
+                continue
+
             # Save the uploaded file
             file_path, metadata = await save_uploaded_file(
                 file,
@@ -224,7 +375,9 @@ async def upload_event_photos(
                 uploaded_by=current_user.id,
                 original_filename=metadata["original_filename"],
                 file_size=metadata["file_size"],
-                mime_type=metadata["mime_type"]
+                mime_type=metadata["mime_type"],
+                content_hash=metadata["content_hash"],
+                upload_hash=upload_hash
             )
             
             db.add(photo)
@@ -232,6 +385,9 @@ async def upload_event_photos(
             db.refresh(photo)
             
             uploaded_photos.append(photo)
+
+            # Queue face detection in the background, the response does not wait for it
+            schedule_face_processing(db, photo, image_bytes=metadata.get("content"))
             
         except Exception as e:
             print(f"❌ Failed to process file {file.filename}: {str(e)}")
@@ -338,7 +494,8 @@ async def delete_photo(
     # Delete file from storage
     delete_file(photo.image_path)
     
-    # Delete photo record
+    # Delete photo record, its faces leave their clusters in the same transaction
+    remove_photo_faces_from_clusters(db, photo.event_id, photo.id)
     db.delete(photo)
     db.commit()
     
@@ -351,103 +508,477 @@ async def process_faces_in_photos(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Process photos to detect faces and match them with registered users."""
+    """
+    Process photos to detect faces and match them with registered users.
+    Photos already processed with their event's pipeline are skipped and work is
+    committed in chunks, so re-running a batch after a failure resumes where it stopped.
+    """
+    # A profile given in the request overrides the events' own profiles
+    requested_profile = None
+    if request.face_profile:
+        try:
+            requested_profile = get_pipeline_profile(request.face_profile)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+
     try:
         processed_photos = 0
         total_faces_detected = 0
         total_faces_matched = 0
 
-        upload_dir = os.getenv("UPLOAD_DIR", "../uploads")
+        # Check access for all events of the batch at once (owner or registered guest)
+        photo_ids = list(set(request.photo_ids))
+        event_ids = {
+            event_id for (event_id,) in
+            db.query(Photo.event_id).filter(Photo.id.in_(photo_ids)).distinct()
+        }
+        registered_event_ids = {
+            event_id for (event_id,) in
+            db.query(EventRegistration.event_id).filter(
+                EventRegistration.user_id == current_user.id,
+                EventRegistration.event_id.in_(event_ids)
+            )
+        }
+        accessible_event_ids = [
+            event.id for event in db.query(Event.id, Event.owner_id).filter(Event.id.in_(event_ids))
+            if event.owner_id == current_user.id or event.id in registered_event_ids
+        ]
+
+        event_profiles = {
+            event_id: requested_profile or profile_for_event(db, event_id)
+            for event_id in accessible_event_ids
+        }
+        pipeline_keys = {event_id: pipeline_fingerprint(profile) for event_id, profile in event_profiles.items()}
 
-        for photo_id in request.photo_ids:
-            # Get photo
-            photo = db.query(Photo).filter(Photo.id == photo_id).first()
-            if not photo:
-                continue
+        # One set-based query for the photos that still need work
+        query = db.query(Photo).filter(
+            Photo.id.in_(photo_ids),
+            Photo.event_id.in_(accessible_event_ids)
+        )
+        if not request.force:
+            query = query.filter(unprocessed_photos_condition(pipeline_keys))
+        photos = query.order_by(Photo.id).all()
+        skipped_photos = len(photo_ids) - len(photos)
+
+        # Match diagnostics are only collected when the caller asks for them
+        with match_trace(request.trace) as trace:
+            for chunk_start in range(0, len(photos), FACE_PROCESSING_CHUNK_SIZE):
+                pending_faces = {}  # event_id -> [(photo_id, face_data)]
+
+                for photo in photos[chunk_start:chunk_start + FACE_PROCESSING_CHUNK_SIZE]:
+                    profile = event_profiles[photo.event_id]
+                    start_time = time.monotonic()
+
+                    # Read and detect off the event loop so other requests keep being served,
+                    # identical images processed before come from the face result cache
+                    try:
+                        image_path_for_processing = resolve_image_source(photo.image_path)
+                        if image_path_for_processing is None:
+                            raise FaceRecognitionError(f"Image for photo {photo.id} not found")
+
+                        faces_data = await run_in_threadpool(
+                            detect_faces_cached, db, image_path_for_processing, profile, photo
+                        )
+
+                    except FaceRecognitionError as e:
+                        # Log error but continue processing other photos
+                        print(f"Face detection failed for photo {photo.id}: {e}")
+                        mark_photo_failed(db, photo.id)
+                        continue
+
+                    # Faces stored by an interrupted run are skipped by the insert's ON CONFLICT
+                    clear_reprocessed_faces(db, photo)
+                    for face_data in faces_data:
+                        pending_faces.setdefault(photo.event_id, []).append((photo.id, face_data))
+
+                    mark_photo_processed(
+                        photo, pipeline_keys[photo.event_id], len(faces_data),
+                        int((time.monotonic() - start_time) * 1000)
+                    )
+                    processed_photos += 1
 
-            # Check if user has access to this photo
-            event = db.query(Event).filter(Event.id == photo.event_id).first()
-            if not event:
-                continue
+                # Match all new faces of the chunk in one pass per event (only against the
+                # event's guests) and commit, off the event loop; the copied context carries the match trace
+                faces_added, faces_matched = await run_in_threadpool(
+                    contextvars.copy_context().run, store_pending_faces, db, pending_faces, event_profiles
+                )
+                total_faces_detected += faces_added
+                total_faces_matched += faces_matched
 
-            # Check if user is owner or registered for the event
-            is_owner = event.owner_id == current_user.id
-            is_registered = db.query(EventRegistration).filter(
-                EventRegistration.event_id == event.id,
-                EventRegistration.user_id == current_user.id
-            ).first() is not None
+        return FaceProcessingResponse(
+            processed_photos=processed_photos,
+            skipped_photos=skipped_photos,
+            total_faces_detected=total_faces_detected,
+            total_faces_matched=total_faces_matched,
+            message=f"Processed {processed_photos} photos ({skipped_photos} skipped), detected {total_faces_detected} faces, matched {total_faces_matched} faces to users",
+            match_trace=trace.to_dict() if trace is not None else None
+        )
 
-            if not (is_owner or is_registered):
-                continue
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to process faces: {str(e)}"
+        )
 
-            # Get the image path/URL for face processing (works with both S3 and local)
-            image_path_for_processing = photo.image_path
 
-            # For S3 storage, we need to use the secure URL for face processing
-            if aws_config.use_s3_storage and photo.image_path.startswith('http'):
-                # Use the S3 URL directly - our face recognition utils can handle it
-                image_path_for_processing = get_secure_photo_url(photo.image_path)
-            else:
-                # For local storage, construct the full path
-                image_path_for_processing = os.path.join(upload_dir, photo.image_path)
-                if not os.path.exists(image_path_for_processing):
-                    continue
-
-            # Detect faces in the photo
-            try:
-                faces_data = detect_faces_in_image(image_path_for_processing)
-
-                for face_data in faces_data:
-                    # Check if this face already exists
-                    existing_face = db.query(PhotoFace).filter(
-                        PhotoFace.photo_id == photo.id,
-                        PhotoFace.face_index == face_data["face_index"]
-                    ).first()
-
-                    if existing_face:
-                        continue  # Skip if already processed
-
-                    # Find matching users (optimized to only check users registered for this event)
-                    matches = find_matching_users_for_event(face_data["embedding"], event.id, db)
-                    matched_user_id = matches[0][0] if matches else None
-
-                    # Create PhotoFace record
-                    photo_face = PhotoFace(
-                        photo_id=photo.id,
-                        face_index=face_data["face_index"],
-                        embedding=face_data["embedding"].tolist(),
-                        bounding_box=face_data["bounding_box"],
-                        matched_user_id=matched_user_id
-                    )
+@router.post("/events/{event_identifier}/face-jobs", response_model=MessageResponse)
+async def enqueue_event_face_jobs(
+    event_identifier: str,
+    requeue: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Queue every photo of an event for the face workers (only accessible by event owner)."""
+    if event_identifier.isdigit():
+        event = db.query(Event).filter(Event.id == int(event_identifier)).first()
+    else:
+        event = db.query(Event).filter(Event.event_code == event_identifier.upper()).first()
 
-                    db.add(photo_face)
-                    total_faces_detected += 1
+    if not event:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
 
-                    if matched_user_id:
-                        total_faces_matched += 1
+    if event.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only event owner can queue face processing"
+        )
 
-                processed_photos += 1
+    photos = db.query(Photo).filter(Photo.event_id == event.id).all()
+    queued = enqueue_face_jobs(db, photos, requeue=requeue)
+    db.commit()
 
-            except FaceRecognitionError as e:
-                # Log error but continue processing other photos
-                print(f"Face detection failed for photo {photo_id}: {e}")
-                continue
+    return {"message": f"Queued {queued} photos for face processing"}
 
-        db.commit()
 
-        return FaceProcessingResponse(
-            processed_photos=processed_photos,
-            total_faces_detected=total_faces_detected,
-            total_faces_matched=total_faces_matched,
-            message=f"Processed {processed_photos} photos, detected {total_faces_detected} faces, matched {total_faces_matched} faces to users"
+@router.post("/events/{event_identifier}/rematch", response_model=FaceRematchResponse)
+async def rematch_event_photo_faces(
+    event_identifier: str,
+    dry_run: bool = True,
+    threshold: Optional[float] = None,
+    diff_limit: int = 100,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Re-match the event's stored faces against its current guests and tolerance
+    without re-detecting any photo (only accessible by event owner).
+    Defaults to a dry run that only reports the changes.
+    """
+    if event_identifier.isdigit():
+        event = db.query(Event).filter(Event.id == int(event_identifier)).first()
+    else:
+        event = db.query(Event).filter(Event.event_code == event_identifier.upper()).first()
+
+    if not event:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
         )
 
-    except Exception as e:
+    if event.owner_id != current_user.id:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to process faces: {str(e)}"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only event owner can re-match faces"
+        )
+
+    result = await run_in_threadpool(rematch_faces, db, [event.id], threshold, dry_run, diff_limit)
+    verb = "Would change" if dry_run else "Changed"
+    print(f"🔁 Re-match of event {event.id} (dry run: {dry_run}): {result['added']} added, {result['removed']} removed, {result['reassigned']} reassigned")
+
+    return FaceRematchResponse(
+        **{key: value for key, value in result.items() if key != "per_event"},
+        message=f"{verb} {result['added'] + result['removed'] + result['reassigned']} of {result['faces']} face matches"
+    )
+
+
+@router.post("/events/{event_identifier}/face-clusters", response_model=MessageResponse)
+async def cluster_event_faces(
+    event_identifier: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Cluster the event's faces that have no cluster yet (only accessible by event owner)."""
+    if event_identifier.isdigit():
+        event = db.query(Event).filter(Event.id == int(event_identifier)).first()
+    else:
+        event = db.query(Event).filter(Event.event_code == event_identifier.upper()).first()
+
+    if not event:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
+
+    if event.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only event owner can cluster faces"
+        )
+
+    faces_clustered, clusters_created = await run_in_threadpool(cluster_unclustered_faces, db, event.id)
+    db.commit()
+
+    return {"message": f"Clustered {faces_clustered} faces, created {clusters_created} clusters"}
+
+
+@router.get("/events/{event_identifier}/face-jobs", response_model=FaceJobProgressResponse)
+async def get_event_face_job_progress(
+    event_identifier: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get face processing job progress for an event."""
+    if event_identifier.isdigit():
+        event = db.query(Event).filter(Event.id == int(event_identifier)).first()
+    else:
+        event = db.query(Event).filter(Event.event_code == event_identifier.upper()).first()
+
+    if not event:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
+
+    is_owner = event.owner_id == current_user.id
+    is_registered = db.query(EventRegistration).filter(
+        EventRegistration.event_id == event.id,
+        EventRegistration.user_id == current_user.id
+    ).first() is not None
+
+    if not (is_owner or is_registered):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. You must be the event owner or a registered guest."
+        )
+
+    return get_event_job_progress(db, event.id)
+
+
+def get_user_gallery(db: Session, event_id: int, user_id: int, cursor: Optional[int], limit: int) -> dict:
+    """
+    Get one page of the event photos a user was matched in, newest first.
+    Served by the (matched_user_id, photo_id) index; pages are keyed on the photo
+    id, so deep pages cost the same as the first one.
+
+    Args:
+        db: Database session
+        event_id: Event ID
+        user_id: Matched user ID
+        cursor: next_cursor of the previous page, None for the first page
+        limit: Photos per page
+
+    Returns:
+        PersonalGalleryResponse dictionary
+    """
+    query = db.query(
+        Photo,
+        PhotoFace.id.label("face_id"),
+        PhotoFace.bounding_box,
+        PhotoFace.match_distance,
+        PhotoFace.match_confidence
+    ).join(PhotoFace, PhotoFace.photo_id == Photo.id).filter(
+        PhotoFace.matched_user_id == user_id,
+        Photo.event_id == event_id
+    )
+    if cursor is not None:
+        query = query.filter(Photo.id < cursor)
+
+    # One row per photo even if older data matched the user to several of its faces
+    rows = query.distinct(Photo.id).order_by(
+        Photo.id.desc(), PhotoFace.match_distance.asc().nulls_last()
+    ).limit(limit + 1).all()
+
+    photos = [
+        {
+            "id": photo.id,
+            "event_id": photo.event_id,
+            "image_path": get_secure_photo_url(photo.image_path),  # Use secure URL
+            "uploaded_by": photo.uploaded_by,
+            "uploaded_at": photo.uploaded_at,
+            "original_filename": photo.original_filename,
+            "file_size": photo.file_size,
+            "mime_type": photo.mime_type,
+            "face_id": face_id,
+            "bounding_box": bounding_box,
+            "match_distance": match_distance,
+            "match_confidence": match_confidence
+        }
+        for photo, face_id, bounding_box, match_distance, match_confidence in rows[:limit]
+    ]
+
+    return {
+        "event_id": event_id,
+        "user_id": user_id,
+        "photos": photos,
+        "next_cursor": photos[-1]["id"] if len(rows) > limit else None
+    }
+
+
+@router.get("/events/{event_identifier}/mine", response_model=PersonalGalleryResponse)
+async def get_my_event_photos(
+    event_identifier: str,
+    cursor: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the event photos the current user appears in (owner or registered guest)."""
+    if event_identifier.isdigit():
+        event = db.query(Event).filter(Event.id == int(event_identifier)).first()
+    else:
+        event = db.query(Event).filter(Event.event_code == event_identifier.upper()).first()
+
+    if not event:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
+
+    is_owner = event.owner_id == current_user.id
+    is_registered = db.query(EventRegistration).filter(
+        EventRegistration.event_id == event.id,
+        EventRegistration.user_id == current_user.id
+    ).first() is not None
+
+    if not (is_owner or is_registered):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. You must be the event owner or a registered guest."
+        )
+
+    return get_user_gallery(db, event.id, current_user.id, cursor, limit)
+
+
+@router.get("/events/{event_identifier}/users/{user_id}", response_model=PersonalGalleryResponse)
+async def get_user_event_photos(
+    event_identifier: str,
+    user_id: int,
+    cursor: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the event photos any user appears in (only accessible by event owner)."""
+    if event_identifier.isdigit():
+        event = db.query(Event).filter(Event.id == int(event_identifier)).first()
+    else:
+        event = db.query(Event).filter(Event.event_code == event_identifier.upper()).first()
+
+    if not event:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
+
+    if event.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only event owner can view other users' photos"
         )
 
+    return get_user_gallery(db, event.id, user_id, cursor, limit)
+
+
+@router.post("/events/{event_identifier}/search-by-face", response_model=FaceSearchResponse)
+async def search_event_photos_by_face_image(
+    event_identifier: str,
+    file: UploadFile = File(...),
+    face_index: int = Form(0),
+    max_distance: Optional[float] = Form(None),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Find the event photos of a person, registered or not, from a query image.
+    Photos are ranked by the distance of their closest stored face; face_index picks
+    the face of the query image when it has several (0 is the most confident one).
+    """
+    if event_identifier.isdigit():
+        event = db.query(Event).filter(Event.id == int(event_identifier)).first()
+    else:
+        event = db.query(Event).filter(Event.event_code == event_identifier.upper()).first()
+
+    if not event:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
+
+    is_owner = event.owner_id == current_user.id
+    is_registered = db.query(EventRegistration).filter(
+        EventRegistration.event_id == event.id,
+        EventRegistration.user_id == current_user.id
+    ).first() is not None
+
+    if not (is_owner or is_registered):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. You must be the event owner or a registered guest."
+        )
+
+    validate_image_file(file)
+    image_bytes = await file.read()
+
+    # Embed the query with the event's profile so it is comparable to the stored faces
+    profile = profile_for_event(db, event.id)
+    try:
+        query_faces = await run_in_threadpool(detect_faces_in_image, image_bytes, profile)
+    except FaceRecognitionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Face recognition failed: {str(e)}"
+        )
+
+    if not 0 <= face_index < len(query_faces):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Query image has {len(query_faces)} faces, face_index {face_index} is not one of them"
+        )
+
+    # Exact scan over every face of the event, kept off the event loop
+    rows = await run_in_threadpool(
+        search_event_photos_by_face,
+        db,
+        event.id,
+        query_faces[face_index]["embedding"],
+        max_distance if max_distance is not None else profile.tolerance,
+        offset,
+        limit + 1
+    )
+
+    photos = [
+        {
+            "id": photo.id,
+            "event_id": photo.event_id,
+            "image_path": get_secure_photo_url(photo.image_path),  # Use secure URL
+            "uploaded_by": photo.uploaded_by,
+            "uploaded_at": photo.uploaded_at,
+            "original_filename": photo.original_filename,
+            "file_size": photo.file_size,
+            "mime_type": photo.mime_type,
+            "face_id": face_id,
+            "bounding_box": bounding_box,
+            "distance": distance
+        }
+        for photo, face_id, bounding_box, distance in rows[:limit]
+    ]
+
+    return {
+        "event_id": event.id,
+        "faces_in_query": len(query_faces),
+        "photos": photos,
+        "next_offset": offset + limit if len(rows) > limit else None
+    }
+
 
 @router.get("/events/{event_identifier}/with-faces", response_model=List[PhotoWithFaces])
 async def get_event_photos_with_faces(
@@ -506,6 +1037,7 @@ async def get_event_photos_with_faces(
                     "face_index": face.face_index,
                     "bounding_box": face.bounding_box,
                     "matched_user_id": face.matched_user_id,
+                    "match_confidence": face.match_confidence,
                     "created_at": face.created_at
                 }
                 for face in faces
@@ -548,3 +1080,28 @@ async def get_photo_url(
     url = get_secure_photo_url(photo.image_path)
     return {"url": url}
 
+
+@router.get("/face-index/stats")
+async def get_face_index_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Get hit/miss counters of the in-memory guest embedding index."""
+    return embedding_index.stats()
+
+
+@router.get("/face-cache/stats")
+async def get_face_cache_stats(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get hit/miss counters of the content-hash face result cache."""
+    return face_cache_stats(db)
+
+
+@router.get("/selfie-gate/stats")
+async def get_selfie_gate_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Get rejection counters and estimated saved time of the selfie pre-filter."""
+    return selfie_gate_stats()
+
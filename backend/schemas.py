@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, date
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 # User schemas
 class UserBase(BaseModel):
@@ -30,7 +30,10 @@ class EventBase(BaseModel):
     description: Optional[str] = None
 
 class EventCreate(EventBase):
-    pass
+    face_profile: Optional[str] = None  # Face pipeline profile, e.g. "fast" or "high_accuracy"
+
+class EventFaceProfileUpdate(BaseModel):
+    face_profile: Optional[str] = None  # None switches back to the active profile
 
 class EventResponse(EventBase):
     id: int
@@ -82,6 +85,29 @@ class PhotoResponse(PhotoBase):
     class Config:
         from_attributes = True
 
+class MatchedPhotoResponse(PhotoResponse):
+    face_id: int
+    bounding_box: Optional[str] = None
+    match_distance: Optional[float] = None
+    match_confidence: Optional[float] = None
+
+class PersonalGalleryResponse(BaseModel):
+    event_id: int
+    user_id: int
+    photos: List[MatchedPhotoResponse]
+    next_cursor: Optional[int] = None  # Pass as cursor to get the next page, None on the last page
+
+class FaceSearchResult(PhotoResponse):
+    face_id: int
+    bounding_box: Optional[str] = None
+    distance: float
+
+class FaceSearchResponse(BaseModel):
+    event_id: int
+    faces_in_query: int
+    photos: List[FaceSearchResult]
+    next_offset: Optional[int] = None  # Pass as offset to get the next page, None on the last page
+
 # Photo Face schemas
 class PhotoFaceResponse(BaseModel):
     id: int
@@ -89,6 +115,7 @@ class PhotoFaceResponse(BaseModel):
     face_index: int
     bounding_box: Optional[str] = None
     matched_user_id: Optional[int] = None
+    match_confidence: Optional[float] = None
     created_at: datetime
 
     class Config:
@@ -99,12 +126,49 @@ class PhotoWithFaces(PhotoResponse):
 
 class FaceProcessingRequest(BaseModel):
     photo_ids: List[int]
+    face_profile: Optional[str] = None  # Overrides the events' face profiles for this call
+    force: bool = False  # Reprocess photos that are already done
+    trace: bool = False  # Return match diagnostics (candidates, distances, assignments)
 
 class FaceProcessingResponse(BaseModel):
     processed_photos: int
+    skipped_photos: int = 0
     total_faces_detected: int
     total_faces_matched: int
     message: str
+    match_trace: Optional[Dict[str, Any]] = None
+
+class FaceJobProgressResponse(BaseModel):
+    event_id: int
+    total_jobs: int
+    pending: int
+    running: int
+    done: int
+    failed: int
+    percent_complete: float
+    avg_duration_ms: Optional[float] = None
+    faces_detected: int
+    faces_matched: int
+
+class FaceMatchChange(BaseModel):
+    face_id: int
+    photo_id: int
+    previous_user_id: Optional[int] = None
+    new_user_id: Optional[int] = None
+    previous_distance: Optional[float] = None
+    new_distance: Optional[float] = None
+
+class FaceRematchResponse(BaseModel):
+    dry_run: bool
+    events: int
+    faces: int
+    added: int
+    removed: int
+    reassigned: int
+    unchanged: int
+    updated: int
+    changes: List[FaceMatchChange] = []
+    message: str
 
 # Authentication schemas
 class Token(BaseModel):
@@ -46,10 +46,17 @@ def create_tables():
         from models.event import Event
         from models.photo import Photo
         from models.photo_face import PhotoFace
+        from models.face_job import FaceJob
+        from models.face_result_cache import FaceResultCache
+        from models.face_cluster import FaceCluster
+        from models.user_face_template import UserFaceTemplate
         # Import any other models here
         
-        # Create all tables
+        # Create all tables (embedding columns need the pgvector extension)
         from database.connection import engine, Base
+        from sqlalchemy import text
+        with engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
         Base.metadata.create_all(bind=engine)
         print("✅ Database tables created successfully")
     except Exception as e:
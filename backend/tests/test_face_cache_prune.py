@@ -0,0 +1,57 @@
+"""Pruning of the face result cache (prune_face_cache)."""
+
+from datetime import datetime, timedelta, timezone
+
+from utils.face_cache import prune_face_cache
+
+
+def add_entry(db, content_hash, pipeline_key, last_used_days_ago):
+    from models.face_result_cache import FaceResultCache
+
+    entry = FaceResultCache(
+        content_hash=content_hash,
+        pipeline_key=pipeline_key,
+        faces=[],
+        face_count=0,
+        hit_count=0,
+        last_used_at=datetime.now(timezone.utc) - timedelta(days=last_used_days_ago)
+    )
+    db.add(entry)
+    db.flush()
+    return entry
+
+
+def remaining_hashes(db):
+    from models.face_result_cache import FaceResultCache
+
+    return sorted(content_hash for (content_hash,) in db.query(FaceResultCache.content_hash))
+
+
+def test_prunes_stale_pipelines_and_expired_entries(db):
+    add_entry(db, "fresh", "current", 1)
+    add_entry(db, "expired", "current", 120)
+    add_entry(db, "stale", "old", 1)
+    add_entry(db, "stale-expired", "old", 120)
+
+    result = prune_face_cache(db, max_age_days=90, keep_pipeline_keys={"current"})
+
+    assert result == {"stale_pipeline": 2, "expired": 1}
+    assert remaining_hashes(db) == ["fresh"]
+
+
+def test_dry_run_counts_without_deleting(db):
+    add_entry(db, "fresh", "current", 1)
+    add_entry(db, "expired", "current", 120)
+    add_entry(db, "stale-expired", "old", 120)
+
+    result = prune_face_cache(db, max_age_days=90, keep_pipeline_keys={"current"}, dry_run=True)
+
+    assert result == {"stale_pipeline": 1, "expired": 1}
+    assert remaining_hashes(db) == ["expired", "fresh", "stale-expired"]
+
+
+def test_zero_max_age_keeps_old_entries_of_current_pipelines(db):
+    add_entry(db, "expired", "current", 400)
+
+    assert prune_face_cache(db, max_age_days=0, keep_pipeline_keys={"current"}) == {"stale_pipeline": 0, "expired": 0}
+    assert remaining_hashes(db) == ["expired"]
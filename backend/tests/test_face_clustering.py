@@ -0,0 +1,89 @@
+"""Cluster-based reverse matching (match_user_to_event_clusters)."""
+
+import numpy as np
+
+from utils.face_clustering import match_user_to_event_clusters, remove_photo_faces_from_clusters
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_faces_of_a_matching_cluster_keep_their_own_tolerance(db, make_user, make_event, make_photo):
+    from models.face_cluster import FaceCluster
+
+    rng = np.random.default_rng(3)
+    guest_embedding = unit(rng.normal(size=128))
+    direction = unit(rng.normal(size=128))
+    guest = make_user(guest_embedding)
+    event = make_event(guests=[guest])
+
+    # The centroid is within tolerance, the second face of the cluster is not
+    cluster = FaceCluster(event_id=event.id, centroid=list(map(float, guest_embedding + 0.35 * direction)), face_count=2)
+    db.add(cluster)
+    db.flush()
+    _, (close_face,) = make_photo(event, [guest_embedding + 0.3 * direction], cluster=cluster)
+    _, (far_face,) = make_photo(event, [guest_embedding + 0.7 * direction], cluster=cluster)
+
+    updated = match_user_to_event_clusters(db, guest.id, guest_embedding, event.id, threshold=0.6)
+    db.flush()
+    db.refresh(close_face)
+    db.refresh(far_face)
+
+    assert updated == 1
+    assert close_face.matched_user_id == guest.id
+    assert far_face.matched_user_id is None
+
+
+def test_face_at_the_edge_of_a_far_cluster_is_matched(db, make_user, make_event, make_photo):
+    from models.face_cluster import FaceCluster
+    from utils.face_clustering import CLUSTER_DISTANCE_THRESHOLD
+
+    rng = np.random.default_rng(7)
+    guest_embedding = unit(rng.normal(size=128))
+    direction = unit(rng.normal(size=128))
+    guest = make_user(guest_embedding)
+    event = make_event(guests=[guest])
+
+    # The centroid is beyond tolerance, one of its faces is within it
+    centroid = guest_embedding + (0.6 + CLUSTER_DISTANCE_THRESHOLD - 0.1) * direction
+    cluster = FaceCluster(event_id=event.id, centroid=list(map(float, centroid)), face_count=2)
+    db.add(cluster)
+    db.flush()
+    _, (edge_face,) = make_photo(event, [guest_embedding + 0.55 * direction], cluster=cluster)
+    make_photo(event, [guest_embedding + 1.35 * direction], cluster=cluster)
+
+    updated = match_user_to_event_clusters(db, guest.id, guest_embedding, event.id, threshold=0.6)
+    db.flush()
+    db.refresh(edge_face)
+    db.refresh(cluster)
+
+    assert updated == 1
+    assert edge_face.matched_user_id == guest.id
+    assert cluster.matched_user_id is None
+
+
+def test_removed_faces_leave_their_cluster(db, make_event, make_photo):
+    from models.face_cluster import FaceCluster
+    from models.photo_face import PhotoFace
+
+    rng = np.random.default_rng(4)
+    first, second = unit(rng.normal(size=128)), unit(rng.normal(size=128))
+    event = make_event()
+    cluster = FaceCluster(event_id=event.id, centroid=list(map(float, (first + second) / 2)), face_count=2)
+    db.add(cluster)
+    db.flush()
+    first_photo, _ = make_photo(event, [first], cluster=cluster)
+    second_photo, _ = make_photo(event, [second], cluster=cluster)
+
+    assert remove_photo_faces_from_clusters(db, event.id, first_photo.id) == 0
+    db.query(PhotoFace).filter(PhotoFace.photo_id == first_photo.id).delete(synchronize_session=False)
+    db.flush()
+    db.refresh(cluster)
+    assert cluster.face_count == 1
+    assert np.allclose(np.asarray(cluster.centroid), second, atol=1e-5)
+
+    assert remove_photo_faces_from_clusters(db, event.id, second_photo.id) == 1
+    db.flush()
+    assert db.query(FaceCluster).filter(FaceCluster.id == cluster.id).count() == 0
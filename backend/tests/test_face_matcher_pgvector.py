@@ -0,0 +1,71 @@
+"""pgvector matching of large events (find_nearest_users_batch)."""
+
+import numpy as np
+
+from utils.face_matcher import find_nearest_users_batch, HNSW_EF_SEARCH
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_event_guest_outside_global_neighbours_is_found(db, make_user, make_event):
+    rng = np.random.default_rng(0)
+    query = unit(rng.normal(size=128))
+
+    # More strangers than the index collects, all closer to the query than the guest
+    for _ in range(HNSW_EF_SEARCH * 3):
+        make_user(query + rng.normal(0, 0.01, 128))
+
+    direction = unit(rng.normal(size=128))
+    guest = make_user(query + 0.45 * direction)
+    far_guest = make_user(query + 2.0 * direction)
+    event = make_event(guests=[guest, far_guest])
+
+    matches = find_nearest_users_batch(query[None, :], db, threshold=0.6, event_id=event.id, top_k=10)
+
+    assert [user_id for user_id, _ in matches[0]] == [guest.id]
+    assert abs(matches[0][0][1] - 0.45) < 1e-3
+
+
+def test_batch_returns_one_list_per_face_in_order(db, make_user, make_event):
+    rng = np.random.default_rng(1)
+    embeddings = [unit(rng.normal(size=128)) for _ in range(3)]
+    guests = [make_user(embedding) for embedding in embeddings]
+    event = make_event(guests=guests)
+
+    stranger = unit(rng.normal(size=128))
+    faces = np.vstack([embeddings[2], stranger, embeddings[0]])
+    matches = find_nearest_users_batch(faces, db, threshold=0.6, event_id=event.id, top_k=5)
+
+    assert [[user_id for user_id, _ in face] for face in matches] == [[guests[2].id], [], [guests[0].id]]
+
+
+def test_full_database_search_covers_top_k_beyond_default_ef_search(db, make_user):
+    rng = np.random.default_rng(2)
+    query = unit(rng.normal(size=128))
+    users = [make_user(query + rng.normal(0, 0.01, 128)) for _ in range(60)]
+
+    matches = find_nearest_users_batch(query[None, :], db, threshold=0.6, top_k=60)
+
+    assert sorted(user_id for user_id, _ in matches[0]) == sorted(user.id for user in users)
+
+
+def test_templates_count_like_the_in_memory_engine(db, make_user, make_event):
+    from models.user_face_template import UserFaceTemplate
+
+    rng = np.random.default_rng(3)
+    query = unit(rng.normal(size=128))
+    direction = unit(rng.normal(size=128))
+
+    # The centroid is beyond tolerance, an extra selfie is close to the face
+    guest = make_user(query + 0.9 * direction)
+    db.add(UserFaceTemplate(user_id=guest.id, embedding=list(map(float, query + 0.2 * direction)), source="selfie"))
+    db.flush()
+    event = make_event(guests=[guest])
+
+    for event_id in (event.id, None):
+        matches = find_nearest_users_batch(query[None, :], db, threshold=0.6, event_id=event_id, top_k=5)
+        assert [user_id for user_id, _ in matches[0]] == [guest.id]
+        assert abs(matches[0][0][1] - 0.2) < 1e-3
@@ -0,0 +1,42 @@
+"""Confirmed faces under re-matching (assign_unique_matches, rematch_event_faces)."""
+
+import numpy as np
+
+from utils.face_matcher import assign_unique_matches, match_user_to_event_faces
+from utils.face_rematch import rematch_event_faces
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_confirmed_faces_are_left_out_and_reserve_their_guest():
+    matches_per_face = [[(2, 0.2), (1, 0.5)], [(1, 0.3)], [(3, 0.1)]]
+
+    assignments = assign_unique_matches(matches_per_face, [7, 7, 8], 0.6, confirmed_users=[1, None, None])
+
+    assert assignments[0] is None
+    assert assignments[1] is None
+    assert assignments[2][0] == 3
+
+
+def test_rematch_keeps_confirmed_faces(db, make_user, make_event, make_photo):
+    rng = np.random.default_rng(8)
+    caller_embedding, other_embedding = unit(rng.normal(size=128)), unit(rng.normal(size=128))
+    caller, other = make_user(caller_embedding), make_user(other_embedding)
+    event = make_event(guests=[caller, other])
+
+    # Confirmed by the caller although the face looks like the other guest
+    _, (face,) = make_photo(event, [other_embedding])
+    face.matched_user_id, face.match_distance, face.confirmed = caller.id, 0.0, True
+    db.flush()
+
+    result = rematch_event_faces(db, event.id, threshold=0.6)
+    match_user_to_event_faces(db, other.id, other_embedding, event.id, threshold=0.6)
+    db.flush()
+    db.refresh(face)
+
+    assert result["reassigned"] == 0
+    assert face.matched_user_id == caller.id
+    assert face.confirmed
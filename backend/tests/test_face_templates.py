@@ -0,0 +1,43 @@
+"""Face confirmation checks (confirm_face_rejection)."""
+
+import numpy as np
+
+from utils.face_templates import confirm_face_rejection, CONFIRM_OTHER_GUEST, CONFIRM_TOO_FAR
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_face_matched_to_another_guest_cannot_be_confirmed(db, make_user, make_event, make_photo):
+    rng = np.random.default_rng(5)
+    embedding = unit(rng.normal(size=128))
+    owner, caller = make_user(embedding), make_user(embedding)
+    event = make_event(guests=[owner, caller])
+    _, (face,) = make_photo(event, [embedding])
+    face.matched_user_id = owner.id
+    db.flush()
+
+    assert confirm_face_rejection(db, caller.id, face, threshold=0.6) == CONFIRM_OTHER_GUEST
+    assert confirm_face_rejection(db, owner.id, face, threshold=0.6) is None
+
+
+def test_face_beyond_tolerance_cannot_be_confirmed(db, make_user, make_event, make_photo):
+    rng = np.random.default_rng(6)
+    embedding = unit(rng.normal(size=128))
+    direction = unit(rng.normal(size=128))
+    caller = make_user(embedding)
+    event = make_event(guests=[caller])
+    _, (close_face, far_face) = make_photo(event, [embedding + 0.4 * direction, embedding + 0.8 * direction])
+
+    assert confirm_face_rejection(db, caller.id, close_face, threshold=0.6) is None
+    assert confirm_face_rejection(db, caller.id, far_face, threshold=0.6) == CONFIRM_TOO_FAR
+
+
+def test_user_without_face_cannot_confirm(db, make_user, make_event, make_photo):
+    caller = make_user()
+    event = make_event(guests=[caller])
+    _, (face,) = make_photo(event, [unit(np.ones(128))])
+
+    assert confirm_face_rejection(db, caller.id, face, threshold=0.6) == CONFIRM_TOO_FAR
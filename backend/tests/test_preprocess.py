@@ -0,0 +1,60 @@
+"""Image preprocessing caps every input at the profile's max_dimension."""
+
+import io
+
+import numpy as np
+from PIL import Image
+
+from utils.face_recognition_utils import preprocess_image_for_face_detection
+
+
+def test_decoded_array_is_downscaled():
+    image = np.zeros((3000, 2000, 3), dtype=np.uint8)
+
+    result = preprocess_image_for_face_detection(image, 1000)
+
+    assert result.shape == (1000, 666, 3)
+    assert result.dtype == np.uint8
+
+
+def test_decoded_array_and_bytes_give_the_same_size():
+    image = np.random.default_rng(0).integers(0, 255, (1800, 1200, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format="PNG")
+
+    from_array = preprocess_image_for_face_detection(image, 600)
+    from_bytes = preprocess_image_for_face_detection(buffer.getvalue(), 600)
+
+    assert from_array.shape == from_bytes.shape
+
+
+def test_small_array_is_unchanged():
+    image = np.zeros((400, 300), dtype=np.uint8)
+
+    assert preprocess_image_for_face_detection(image, 1000).shape == (400, 300, 3)
+
+
+def test_tiled_detection_reads_the_image_once(tmp_path, monkeypatch):
+    import utils.face_recognition_utils as face_utils
+    from utils.pipeline_profile import get_pipeline_profile
+
+    path = tmp_path / "crowd.png"
+    Image.fromarray(np.zeros((1200, 3000, 3), dtype=np.uint8)).save(path)
+
+    reads, opened, tiling_shapes = [], [], []
+    read_image_bytes, open_image_source = face_utils.read_image_bytes, face_utils.open_image_source
+    monkeypatch.setattr(face_utils, "read_image_bytes", lambda source: reads.append(source) or read_image_bytes(source))
+    monkeypatch.setattr(face_utils, "open_image_source", lambda source: opened.append(source) or open_image_source(source))
+    monkeypatch.setattr(face_utils, "face_recognition", object())
+    monkeypatch.setattr(face_utils, "TWO_RESOLUTION_ENCODING", False)
+
+    def locate_faces(image, profile, load_tiling_image):
+        tiling_shapes.append(load_tiling_image().shape)
+        return []
+
+    monkeypatch.setattr(face_utils, "locate_faces", locate_faces)
+
+    assert face_utils._detect_faces_in_image(str(path), get_pipeline_profile()) == []
+    assert reads == [str(path)]
+    assert len(opened) == 2 and all(isinstance(source, bytes) for source in opened)
+    assert max(tiling_shapes[0]) == min(3000, face_utils.ENCODING_MAX_DIMENSION)
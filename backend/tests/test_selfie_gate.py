@@ -0,0 +1,47 @@
+"""Selfie pre-filter checks (screen_selfie)."""
+
+import io
+
+import numpy as np
+from PIL import Image
+
+import utils.selfie_gate as selfie_gate
+from utils.selfie_gate import screen_selfie
+
+
+def encode(pixels, format="PNG"):
+    buffer = io.BytesIO()
+    Image.fromarray(np.asarray(pixels, dtype=np.uint8)).save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def textured(size=(480, 640), low=40, high=220, seed=0):
+    return np.random.default_rng(seed).integers(low, high, size, dtype=np.uint8)
+
+
+def test_sharp_well_lit_image_passes():
+    result = screen_selfie(encode(textured()))
+
+    assert result["passed"]
+    assert result["reason"] is None
+
+
+def test_cascade_is_off_by_default():
+    result = screen_selfie(encode(textured()))
+
+    assert selfie_gate.SELFIE_GATE_CASCADE is False
+    assert "cascade_faces" not in result["metrics"]
+
+
+def test_hopeless_images_are_rejected_with_a_reason():
+    assert screen_selfie(encode(textured((100, 120))))["reason"] == "too_small"
+    assert screen_selfie(encode(textured(low=0, high=20)))["reason"] == "too_dark"
+    assert screen_selfie(encode(textured(low=245, high=256)))["reason"] == "too_bright"
+    assert screen_selfie(encode(np.full((480, 640), 128)))["reason"] == "too_blurry"
+
+
+def test_unreadable_image_is_left_to_the_pipeline():
+    result = screen_selfie(b"not an image")
+
+    assert result["passed"]
+    assert result["reason"] is None
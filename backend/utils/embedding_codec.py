@@ -0,0 +1,110 @@
+"""
+Compact binary embedding encodings for SnapCircle.
+Stored embeddings live in pgvector columns, which Postgres keeps as binary
+float32 but psycopg2 transfers as text and pgvector parses one row at a time.
+Bulk loads therefore select vector_send(embedding), the binary wire format, and
+decode a whole event with one np.frombuffer. Embeddings stored outside pgvector
+(e.g. the face result cache) use the float32, float16 or int8-with-scale codecs.
+"""
+
+from typing import Sequence, Union
+import numpy as np
+from sqlalchemy import func
+
+EMBEDDING_DIMENSION = 128
+
+CODECS = ("float32", "float16", "int8")
+
+# pgvector binary format: uint16 dimension, uint16 unused, big-endian float32 values
+_VECTOR_SEND_DTYPE = np.dtype([
+    ("dim", ">u2"),
+    ("unused", ">u2"),
+    ("values", ">f4", (EMBEDDING_DIMENSION,))
+])
+
+# int8 codec: little-endian float32 scale followed by the quantized values
+_INT8_DTYPE = np.dtype([("scale", "<f4"), ("values", "i1", (EMBEDDING_DIMENSION,))])
+
+Buffer = Union[bytes, memoryview]
+
+
+def vector_bytes(column):
+    """SQL expression selecting a pgvector column in its binary wire format."""
+    return func.vector_send(column)
+
+
+def decode_vector_send(buffers: Sequence[Buffer]) -> np.ndarray:
+    """
+    Decode vector_send values of many rows into one float32 matrix.
+    The rows are joined once and viewed with np.frombuffer; the only copy is the
+    byte swap into a native, contiguous matrix.
+
+    Args:
+        buffers: vector_send results (bytes or memoryview per row)
+
+    Returns:
+        Matrix of shape (rows, EMBEDDING_DIMENSION)
+
+    Raises:
+        ValueError: If a value is not a vector of EMBEDDING_DIMENSION
+    """
+    if len(buffers) == 0:
+        return np.empty((0, EMBEDDING_DIMENSION), dtype=np.float32)
+
+    data = b"".join(buffers)
+    if len(data) != len(buffers) * _VECTOR_SEND_DTYPE.itemsize:
+        raise ValueError(f"Expected vectors of dimension {EMBEDDING_DIMENSION}")
+    records = np.frombuffer(data, dtype=_VECTOR_SEND_DTYPE)
+    if (records["dim"] != EMBEDDING_DIMENSION).any():
+        raise ValueError(f"Expected vectors of dimension {EMBEDDING_DIMENSION}")
+    return np.ascontiguousarray(records["values"], dtype=np.float32)
+
+
+def encode_embedding(embedding: Sequence, codec: str = "float32") -> bytes:
+    """
+    Encode one embedding.
+
+    Args:
+        embedding: 128-d embedding
+        codec: "float32" (512 bytes), "float16" (256 bytes) or "int8" (132 bytes, symmetric per-vector scale)
+
+    Returns:
+        Encoded bytes
+    """
+    values = np.asarray(embedding, dtype=np.float32).reshape(EMBEDDING_DIMENSION)
+    if codec == "float32":
+        return values.astype("<f4").tobytes()
+    if codec == "float16":
+        return values.astype("<f2").tobytes()
+    if codec == "int8":
+        record = np.zeros(1, dtype=_INT8_DTYPE)
+        scale = float(np.abs(values).max()) / 127.0 or 1.0
+        record["scale"] = scale
+        record["values"] = np.clip(np.rint(values / scale), -127, 127)
+        return record.tobytes()
+    raise ValueError(f"Unknown embedding codec: {codec}")
+
+
+def decode_embeddings(buffers: Sequence[Buffer], codec: str = "float32") -> np.ndarray:
+    """
+    Decode many encoded embeddings into one float32 matrix with a single np.frombuffer.
+
+    Args:
+        buffers: Values produced by encode_embedding with the same codec
+        codec: Codec the values were encoded with
+
+    Returns:
+        Matrix of shape (rows, EMBEDDING_DIMENSION)
+    """
+    if len(buffers) == 0:
+        return np.empty((0, EMBEDDING_DIMENSION), dtype=np.float32)
+
+    data = b"".join(buffers)
+    if codec == "float32":
+        return np.frombuffer(data, dtype="<f4").reshape(-1, EMBEDDING_DIMENSION)
+    if codec == "float16":
+        return np.frombuffer(data, dtype="<f2").reshape(-1, EMBEDDING_DIMENSION).astype(np.float32)
+    if codec == "int8":
+        records = np.frombuffer(data, dtype=_INT8_DTYPE)
+        return records["values"].astype(np.float32) * records["scale"][:, None]
+    raise ValueError(f"Unknown embedding codec: {codec}")
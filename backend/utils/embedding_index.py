@@ -0,0 +1,156 @@
+"""
+Process-local guest embedding index for SnapCircle.
+Caches each event's guest embedding matrix so repeated matching within a
+processing batch does not re-query and re-parse every guest embedding.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple, Any
+import logging
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .face_matcher import load_guest_embeddings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from face_recognition_config import EMBEDDING_INDEX_MAX_MB, EMBEDDING_INDEX_TTL_SECONDS
+except ImportError:
+    EMBEDDING_INDEX_MAX_MB = 256
+    EMBEDDING_INDEX_TTL_SECONDS = 60
+
+
+class EventEmbeddingIndex:
+    """LRU cache of (user_ids, embedding_matrix) per event, bounded by memory."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._loaded_at: Dict[int, float] = {}
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+        self._generations: Dict[int, int] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _entry_size(entry: Tuple[np.ndarray, np.ndarray]) -> int:
+        user_ids, matrix = entry
+        return user_ids.nbytes + matrix.nbytes
+
+    def _generation(self, event_id: int) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(event_id, 0)
+
+    def get(self, db: Session, event_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the guest index for an event, loading it from the database on a miss.
+
+        Args:
+            db: Database session used on a cache miss
+            event_id: Event ID
+
+        Returns:
+            Tuple of (user_ids, embedding_matrix); both arrays are read-only
+        """
+        with self._lock:
+            entry = self._entries.get(event_id)
+            if entry is not None and time.monotonic() - self._loaded_at[event_id] > self.ttl_seconds:
+                # Other processes (API vs. face workers) cannot invalidate this copy, bound its age
+                self._current_bytes -= self._entry_size(self._entries.pop(event_id))
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(event_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            generation = self._generation(event_id)
+
+        user_ids, matrix = load_guest_embeddings(db, event_id)
+        user_ids.setflags(write=False)
+        matrix.setflags(write=False)
+        entry = (user_ids, matrix)
+
+        with self._lock:
+            if self._generation(event_id) != generation:
+                # Invalidated while loading, serve this result but do not cache it
+                return entry
+            previous = self._entries.pop(event_id, None)
+            if previous is not None:
+                self._current_bytes -= self._entry_size(previous)
+            self._entries[event_id] = entry
+            self._loaded_at[event_id] = time.monotonic()
+            self._current_bytes += self._entry_size(entry)
+            self._evict()
+
+        logger.debug(f"Loaded embedding index for event {event_id}: {len(user_ids)} guests")
+        return entry
+
+    def contains(self, event_id: int) -> bool:
+        """Check whether an event is cached, without touching counters or LRU order."""
+        with self._lock:
+            return event_id in self._entries
+
+    def _evict(self):
+        """Evict least recently used events until the index fits its memory cap."""
+        while self._current_bytes > self.max_bytes and len(self._entries) > 1:
+            evicted_event_id, evicted = self._entries.popitem(last=False)
+            self._loaded_at.pop(evicted_event_id, None)
+            self._current_bytes -= self._entry_size(evicted)
+            self.evictions += 1
+
+    def invalidate(self, event_id: int):
+        """Drop the cached index for an event (call after its guest set changes)."""
+        with self._lock:
+            self._generations[event_id] = self._generations.get(event_id, 0) + 1
+            self._loaded_at.pop(event_id, None)
+            entry = self._entries.pop(event_id, None)
+            if entry is not None:
+                self._current_bytes -= self._entry_size(entry)
+                self.invalidations += 1
+
+    def invalidate_user(self, db: Session, user_id: int):
+        """Drop the cached index of every event the user is registered for."""
+        from models.event_registration import EventRegistration
+
+        event_ids = db.query(EventRegistration.event_id).filter(
+            EventRegistration.user_id == user_id
+        ).all()
+        for (event_id,) in event_ids:
+            self.invalidate(event_id)
+
+    def clear(self):
+        """Drop every cached index."""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._loaded_at.clear()
+            self._current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters and current memory usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "events": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+# Global instance
+embedding_index = EventEmbeddingIndex(
+    max_bytes=EMBEDDING_INDEX_MAX_MB * 1024 * 1024,
+    ttl_seconds=EMBEDDING_INDEX_TTL_SECONDS
+)
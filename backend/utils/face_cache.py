@@ -0,0 +1,257 @@
+"""
+Content-hash face result cache for SnapCircle.
+Detection results (boxes, metrics and embeddings) are stored per SHA-256 of the
+image bytes and pipeline fingerprint, so re-uploads, retries and the same shot
+posted to several events are never analysed twice. Matches are not cached,
+they depend on the event's guest list and are always recomputed.
+Entries unused for FACE_CACHE_MAX_AGE_DAYS and entries of pipeline settings
+that are no longer configured are pruned by the workers (see prune_face_cache).
+"""
+
+import os
+import base64
+import hashlib
+import threading
+from datetime import timedelta
+from typing import List, Dict, Any, Optional, Set
+import logging
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from .face_recognition_utils import detect_faces_in_image, read_image_bytes, ImageSource
+from .pipeline_profile import PipelineProfile, pipeline_fingerprint, available_profiles, get_pipeline_profile
+from .embedding_codec import encode_embedding, decode_embeddings
+
+try:
+    from face_recognition_config import FACE_CACHE_EMBEDDING_CODEC
+except ImportError:
+    FACE_CACHE_EMBEDDING_CODEC = "float32"
+
+logger = logging.getLogger(__name__)
+
+FACE_CACHE_MAX_AGE_DAYS = int(os.getenv("FACE_CACHE_MAX_AGE_DAYS", "90"))  # Entries unused for longer are pruned
+FACE_CACHE_PRUNE_BATCH_SIZE = 5000  # Rows deleted per transaction
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0}
+
+
+def _count(counter: str):
+    with _stats_lock:
+        _stats[counter] += 1
+
+
+def compute_content_hash(image_bytes: bytes) -> str:
+    """SHA-256 hex digest of encoded image bytes."""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def _serialize_faces(faces_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Embeddings are stored base64 encoded (683 characters as float32) instead of float lists (~2.5 KB)
+    return [
+        {
+            "face_index": face["face_index"],
+            "embedding": base64.b64encode(encode_embedding(face["embedding"], FACE_CACHE_EMBEDDING_CODEC)).decode("ascii"),
+            "embedding_codec": FACE_CACHE_EMBEDDING_CODEC,
+            "bounding_box": face["bounding_box"],
+            "confidence": float(face["confidence"]),
+            "face_size": [int(size) for size in face["face_size"]],
+            "face_ratio": float(face["face_ratio"])
+        }
+        for face in faces_data
+    ]
+
+
+def _decode_cached_embedding(face: Dict[str, Any]) -> np.ndarray:
+    if "embedding_codec" not in face:
+        # Entries written before embeddings were encoded
+        return np.asarray(face["embedding"], dtype=np.float64)
+    encoded = base64.b64decode(face["embedding"])
+    return decode_embeddings([encoded], face["embedding_codec"])[0].astype(np.float64)
+
+
+def _deserialize_faces(faces: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            **{key: value for key, value in face.items() if key != "embedding_codec"},
+            "embedding": _decode_cached_embedding(face),
+            "face_size": tuple(face["face_size"])
+        }
+        for face in faces
+    ]
+
+
+def get_cached_faces(db: Session, content_hash: str, profile: PipelineProfile) -> Optional[List[Dict[str, Any]]]:
+    """
+    Look up stored detection results for an image.
+
+    Args:
+        db: Database session
+        content_hash: SHA-256 of the image bytes
+        profile: Pipeline profile the results must have been produced with
+
+    Returns:
+        Face data as returned by detect_faces_in_image, None on a cache miss
+    """
+    from models.face_result_cache import FaceResultCache
+
+    pipeline_key = pipeline_fingerprint(profile)
+    entry = db.query(FaceResultCache.id, FaceResultCache.faces).filter(
+        FaceResultCache.content_hash == content_hash,
+        FaceResultCache.pipeline_key == pipeline_key
+    ).first()
+
+    if entry is None:
+        _count("misses")
+        return None
+
+    db.query(FaceResultCache).filter(FaceResultCache.id == entry.id).update({
+        "hit_count": FaceResultCache.hit_count + 1,
+        "last_used_at": func.now()
+    }, synchronize_session=False)
+    _count("hits")
+    return _deserialize_faces(entry.faces)
+
+
+def store_cached_faces(db: Session, content_hash: str, profile: PipelineProfile, faces_data: List[Dict[str, Any]]):
+    """
+    Store detection results for an image, keeping the first result if two workers race.
+    The caller is responsible for committing the session.
+    """
+    from models.face_result_cache import FaceResultCache
+
+    db.execute(
+        insert(FaceResultCache).values(
+            content_hash=content_hash,
+            pipeline_key=pipeline_fingerprint(profile),
+            faces=_serialize_faces(faces_data),
+            face_count=len(faces_data),
+            hit_count=0
+        ).on_conflict_do_nothing(constraint="unique_face_result_cache_key")
+    )
+    _count("stores")
+
+
+def detect_faces_cached(
+    db: Session,
+    image_source: ImageSource,
+    profile: PipelineProfile,
+    photo=None
+) -> List[Dict[str, Any]]:
+    """
+    detect_faces_in_image behind the content-hash cache.
+    A photo without a content hash gets the computed one. The caller commits.
+
+    Args:
+        db: Database session
+        image_source: Image path/URL, encoded bytes or buffer (decoded arrays bypass the cache)
+        profile: Pipeline profile
+        photo: Optional Photo the image belongs to
+
+    Returns:
+        Face data as returned by detect_faces_in_image
+
+    Raises:
+        FaceRecognitionError: If the image cannot be read or analysed
+    """
+    if isinstance(image_source, np.ndarray):
+        return detect_faces_in_image(image_source, profile)
+
+    image_bytes = read_image_bytes(image_source)
+    content_hash = photo.content_hash if photo is not None and photo.content_hash else compute_content_hash(image_bytes)
+    if photo is not None and not photo.content_hash:
+        photo.content_hash = content_hash
+
+    faces_data = get_cached_faces(db, content_hash, profile)
+    if faces_data is not None:
+        return faces_data
+
+    faces_data = detect_faces_in_image(image_bytes, profile)
+    store_cached_faces(db, content_hash, profile, faces_data)
+    return faces_data
+
+
+def face_cache_stats(db: Session) -> Dict[str, Any]:
+    """
+    Hit/miss counters of this process plus totals of the shared cache table.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Dictionary with process counters, hit rate and table totals
+    """
+    from models.face_result_cache import FaceResultCache
+
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+
+    entries, total_hits = db.query(
+        func.count(FaceResultCache.id),
+        func.coalesce(func.sum(FaceResultCache.hit_count), 0)
+    ).one()
+    stats["entries"] = entries
+    stats["total_hits"] = int(total_hits)
+    return stats
+
+
+def current_pipeline_keys() -> Set[str]:
+    """Fingerprints of every configured profile, the only keys a cache lookup can still ask for."""
+    return {pipeline_fingerprint(get_pipeline_profile(name)) for name in available_profiles()}
+
+
+def prune_face_cache(
+    db: Session,
+    max_age_days: int = FACE_CACHE_MAX_AGE_DAYS,
+    keep_pipeline_keys: Optional[Set[str]] = None,
+    dry_run: bool = False
+) -> Dict[str, int]:
+    """
+    Delete cache entries that can no longer be hit or have not been hit for a long time:
+    entries of pipeline settings that are no longer configured, then entries not
+    used for max_age_days. Deletes run in batches, each committed on its own.
+
+    Args:
+        db: Database session
+        max_age_days: Entries whose last use is older are deleted (0 or less keeps all)
+        keep_pipeline_keys: Valid pipeline keys (defaults to current_pipeline_keys())
+        dry_run: Only count what would be deleted
+
+    Returns:
+        Dictionary with the number of "stale_pipeline" and "expired" entries
+    """
+    from models.face_result_cache import FaceResultCache
+
+    if keep_pipeline_keys is None:
+        keep_pipeline_keys = current_pipeline_keys()
+
+    stale = FaceResultCache.pipeline_key.notin_(keep_pipeline_keys)
+    conditions = {"stale_pipeline": stale}
+    if max_age_days > 0:
+        last_used = func.coalesce(FaceResultCache.last_used_at, FaceResultCache.created_at)
+        # Stale entries are deleted first, expired ones are counted among the rest
+        conditions["expired"] = ~stale & (last_used < func.now() - timedelta(days=max_age_days))
+
+    result = {"stale_pipeline": 0, "expired": 0}
+    for reason, condition in conditions.items():
+        if dry_run:
+            result[reason] = db.query(func.count(FaceResultCache.id)).filter(condition).scalar()
+            continue
+
+        while True:
+            batch = db.query(FaceResultCache.id).filter(condition).limit(FACE_CACHE_PRUNE_BATCH_SIZE).subquery()
+            deleted = db.query(FaceResultCache).filter(
+                FaceResultCache.id.in_(db.query(batch.c.id))
+            ).delete(synchronize_session=False)
+            db.commit()
+            result[reason] += deleted
+            if deleted < FACE_CACHE_PRUNE_BATCH_SIZE:
+                break
+
+    if any(result.values()):
+        logger.info(f"Face cache pruned: {result['stale_pipeline']} stale pipeline, {result['expired']} expired entries")
+    return result
@@ -0,0 +1,319 @@
+"""
+Incremental face clustering for SnapCircle.
+Groups the faces of an event into same-person clusters as they are stored: each
+new face joins the nearest cluster centroid within CLUSTER_DISTANCE_THRESHOLD or
+starts a new cluster, and centroids are kept as running means, so new photos
+never trigger a recompute. Faces of deleted or reprocessed photos are subtracted
+from their clusters again. A guest who joins later is compared against the
+event's few hundred centroids instead of every stored face, and only the faces
+of matching clusters are scanned.
+"""
+
+from typing import List, Tuple, Sequence
+import logging
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, insert
+
+from .embedding_codec import vector_bytes
+from .face_matcher import (
+    stack_embeddings,
+    compute_distance_matrix,
+    match_user_to_event_faces,
+    MATCH_CHUNK_SIZE,
+    EMBEDDING_DIMENSION
+)
+
+try:
+    from face_recognition_config import FACE_CLUSTERING, CLUSTER_DISTANCE_THRESHOLD
+except ImportError:
+    FACE_CLUSTERING = True
+    CLUSTER_DISTANCE_THRESHOLD = 0.45
+
+logger = logging.getLogger(__name__)
+
+# Key space of the Postgres advisory locks that serialize clustering per event
+CLUSTER_LOCK_NAMESPACE = 7315
+
+
+def assign_to_clusters(
+    face_matrix: np.ndarray,
+    centroids: np.ndarray,
+    counts: np.ndarray,
+    threshold: float = CLUSTER_DISTANCE_THRESHOLD
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Online leader clustering of a batch of faces against existing clusters.
+    Distances to the existing centroids are one matrix product; faces that start
+    new clusters are compared against those as the batch goes, so two faces of the
+    same new person in one batch end up together.
+
+    Args:
+        face_matrix: Faces to assign, shape (faces, EMBEDDING_DIMENSION)
+        centroids: Existing cluster centroids, shape (clusters, EMBEDDING_DIMENSION)
+        counts: Faces per existing cluster
+        threshold: Max distance of a face to the centroid it joins
+
+    Returns:
+        Tuple of (assignments, centroids, counts). Assignments index the returned
+        centroids, indexes from len(centroids) on are new clusters.
+    """
+    face_count, existing = len(face_matrix), len(centroids)
+    assignments = np.empty(face_count, dtype=np.int64)
+
+    if existing:
+        distances = compute_distance_matrix(face_matrix, centroids)
+        nearest = distances.argmin(axis=1)
+        nearest_distance = distances[np.arange(face_count), nearest]
+    else:
+        nearest = np.zeros(face_count, dtype=np.int64)
+        nearest_distance = np.full(face_count, np.inf, dtype=np.float32)
+
+    new_sums = np.zeros((face_count, face_matrix.shape[1]), dtype=np.float64)
+    new_counts = np.zeros(face_count, dtype=np.int64)
+    created = 0
+
+    for i, face in enumerate(face_matrix):
+        best, best_distance = nearest[i], nearest_distance[i]
+        if created:
+            new_centroids = new_sums[:created] / new_counts[:created, None]
+            new_distances = np.linalg.norm(new_centroids - face, axis=1)
+            closest_new = int(new_distances.argmin())
+            if new_distances[closest_new] < best_distance:
+                best, best_distance = existing + closest_new, new_distances[closest_new]
+
+        if best_distance > threshold:
+            best = existing + created
+            created += 1
+
+        assignments[i] = best
+        if best >= existing:
+            new_sums[best - existing] += face
+            new_counts[best - existing] += 1
+
+    # Running means of the existing clusters
+    sums = centroids.astype(np.float64) * counts[:, None]
+    added = np.zeros(existing, dtype=np.int64)
+    joined = assignments < existing
+    np.add.at(sums, assignments[joined], face_matrix[joined])
+    np.add.at(added, assignments[joined], 1)
+
+    all_counts = np.concatenate([counts + added, new_counts[:created]])
+    all_sums = np.concatenate([sums, new_sums[:created]])
+    return assignments, (all_sums / np.maximum(all_counts, 1)[:, None]).astype(np.float32), all_counts
+
+
+def load_event_clusters(db: Session, event_id: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Load an event's clusters as id, centroid and face count arrays.
+
+    Args:
+        db: Database session
+        event_id: Event ID
+
+    Returns:
+        Tuple of (cluster_ids, centroid_matrix, face_counts)
+    """
+    from models.face_cluster import FaceCluster
+
+    rows = db.query(FaceCluster.id, vector_bytes(FaceCluster.centroid), FaceCluster.face_count).filter(
+        FaceCluster.event_id == event_id
+    ).order_by(FaceCluster.id).all()
+
+    return (
+        np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+        stack_embeddings([row[1] for row in rows]),
+        np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows))
+    )
+
+
+def cluster_faces(db: Session, event_id: int, face_ids: Sequence[int], embeddings: Sequence) -> int:
+    """
+    Add stored faces of an event to its clusters and update the centroids.
+    Clustering of one event is serialized across workers with a transaction-level
+    advisory lock. The caller is responsible for committing the session.
+
+    Args:
+        db: Database session
+        event_id: Event the faces belong to
+        face_ids: PhotoFace IDs
+        embeddings: Embeddings of the faces, in the same order
+
+    Returns:
+        Number of clusters created
+    """
+    from models.face_cluster import FaceCluster
+    from models.photo_face import PhotoFace
+
+    if len(face_ids) == 0:
+        return 0
+
+    db.execute(select(func.pg_advisory_xact_lock(CLUSTER_LOCK_NAMESPACE, event_id)))
+    cluster_ids, centroids, counts = load_event_clusters(db, event_id)
+    assignments, centroids, counts = assign_to_clusters(stack_embeddings(embeddings), centroids, counts)
+
+    existing = len(cluster_ids)
+    touched = np.unique(assignments[assignments < existing])
+    if len(touched):
+        db.bulk_update_mappings(FaceCluster, [
+            {"id": int(cluster_ids[i]), "centroid": centroids[i], "face_count": int(counts[i])}
+            for i in touched
+        ])
+
+    created = len(centroids) - existing
+    if created:
+        new_ids = db.execute(
+            insert(FaceCluster).returning(FaceCluster.id, sort_by_parameter_order=True),
+            [
+                {"event_id": event_id, "centroid": centroids[i], "face_count": int(counts[i])}
+                for i in range(existing, len(centroids))
+            ]
+        ).scalars().all()
+        cluster_ids = np.concatenate([cluster_ids, np.asarray(new_ids, dtype=np.int64)])
+
+    db.bulk_update_mappings(PhotoFace, [
+        {"id": int(face_id), "cluster_id": int(cluster_ids[assignment])}
+        for face_id, assignment in zip(face_ids, assignments)
+    ])
+    return created
+
+
+def remove_photo_faces_from_clusters(db: Session, event_id: int, photo_id: int) -> int:
+    """
+    Take the faces of a photo out of their clusters before the faces are deleted.
+    Centroids are running means, so the faces' embeddings are subtracted from them;
+    clusters left without faces are deleted. Serialized with cluster_faces through
+    the event's advisory lock. The caller deletes the faces and commits.
+
+    Args:
+        db: Database session
+        event_id: Event the photo belongs to
+        photo_id: Photo whose faces are about to be deleted
+
+    Returns:
+        Number of clusters deleted
+    """
+    from models.face_cluster import FaceCluster
+    from models.photo_face import PhotoFace
+
+    rows = db.query(PhotoFace.cluster_id, vector_bytes(PhotoFace.embedding)).filter(
+        PhotoFace.photo_id == photo_id,
+        PhotoFace.cluster_id.isnot(None)
+    ).all()
+    if not rows:
+        return 0
+
+    db.execute(select(func.pg_advisory_xact_lock(CLUSTER_LOCK_NAMESPACE, event_id)))
+    cluster_ids, positions = np.unique(
+        np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)), return_inverse=True
+    )
+    clusters = {
+        row[0]: (row[1], row[2]) for row in db.query(
+            FaceCluster.id, vector_bytes(FaceCluster.centroid), FaceCluster.face_count
+        ).filter(FaceCluster.id.in_(cluster_ids.tolist())).all()
+    }
+
+    removed_sums = np.zeros((len(cluster_ids), EMBEDDING_DIMENSION), dtype=np.float64)
+    removed_counts = np.zeros(len(cluster_ids), dtype=np.int64)
+    np.add.at(removed_sums, positions, stack_embeddings([row[1] for row in rows]))
+    np.add.at(removed_counts, positions, 1)
+
+    updates, emptied = [], []
+    for i, cluster_id in enumerate(cluster_ids.tolist()):
+        if cluster_id not in clusters:
+            continue
+        centroid, count = clusters[cluster_id]
+        remaining = count - removed_counts[i]
+        if remaining <= 0:
+            emptied.append(cluster_id)
+            continue
+        sums = stack_embeddings([centroid])[0].astype(np.float64) * count - removed_sums[i]
+        updates.append({"id": cluster_id, "centroid": (sums / remaining).astype(np.float32), "face_count": int(remaining)})
+
+    if updates:
+        db.bulk_update_mappings(FaceCluster, updates)
+    if emptied:
+        # The faces' cluster_id is cleared by ON DELETE SET NULL
+        db.query(FaceCluster).filter(FaceCluster.id.in_(emptied)).delete(synchronize_session=False)
+    return len(emptied)
+
+
+def cluster_unclustered_faces(db: Session, event_id: int) -> Tuple[int, int]:
+    """
+    Cluster the faces of an event that have no cluster yet, e.g. faces stored
+    before clustering was enabled. The caller is responsible for committing.
+
+    Args:
+        db: Database session
+        event_id: Event ID
+
+    Returns:
+        Tuple of (faces_clustered, clusters_created)
+    """
+    from models.photo import Photo
+    from models.photo_face import PhotoFace
+
+    rows = db.query(PhotoFace.id, vector_bytes(PhotoFace.embedding)).join(
+        Photo, Photo.id == PhotoFace.photo_id
+    ).filter(
+        Photo.event_id == event_id,
+        PhotoFace.cluster_id.is_(None)
+    ).order_by(PhotoFace.id).all()
+
+    clusters_created = 0
+    for start in range(0, len(rows), MATCH_CHUNK_SIZE):
+        chunk = rows[start:start + MATCH_CHUNK_SIZE]
+        clusters_created += cluster_faces(db, event_id, [row[0] for row in chunk], [row[1] for row in chunk])
+    return len(rows), clusters_created
+
+
+def match_user_to_event_clusters(db: Session, user_id: int, user_embedding: Sequence, event_id: int, threshold: float) -> int:
+    """
+    Reverse matching through cluster centroids: the guest is compared against the
+    event's centroids and labels the clusters within threshold. Only faces of the
+    clusters within threshold + CLUSTER_DISTANCE_THRESHOLD (plus faces not clustered
+    yet and the guest's current matches) are scanned. Each face is still matched on
+    its own distance, the same rule rematch_faces applies.
+    The caller is responsible for committing the session.
+
+    Args:
+        db: Database session
+        user_id: Guest user ID
+        user_embedding: Guest face embedding, or a matrix of the guest's centroid and templates
+        event_id: Event whose faces are scanned
+        threshold: Maximum distance for a match (lower is more strict)
+
+    Returns:
+        Number of faces whose match was updated
+    """
+    from models.face_cluster import FaceCluster
+
+    cluster_ids, centroids, _ = load_event_clusters(db, event_id)
+    matching_clusters: List[int] = []
+    scanned_clusters: List[int] = []
+    if len(cluster_ids):
+        user_matrix = stack_embeddings(np.asarray(user_embedding, dtype=np.float32).reshape(-1, EMBEDDING_DIMENSION))
+        distances = compute_distance_matrix(centroids, user_matrix).min(axis=1)
+        matching_clusters = [int(cluster_id) for cluster_id in cluster_ids[distances <= threshold]]
+        # Faces joined their cluster within CLUSTER_DISTANCE_THRESHOLD of its centroid, so by the
+        # triangle inequality a face within threshold of the guest sits in a cluster within both
+        scanned_clusters = [
+            int(cluster_id) for cluster_id in cluster_ids[distances <= threshold + CLUSTER_DISTANCE_THRESHOLD]
+        ]
+
+    db.query(FaceCluster).filter(
+        FaceCluster.event_id == event_id,
+        FaceCluster.matched_user_id == user_id,
+        FaceCluster.id.notin_(matching_clusters)
+    ).update({"matched_user_id": None}, synchronize_session=False)
+    if matching_clusters:
+        db.query(FaceCluster).filter(
+            FaceCluster.id.in_(matching_clusters),
+            FaceCluster.matched_user_id.is_(None)
+        ).update({"matched_user_id": user_id}, synchronize_session=False)
+
+    logger.debug(
+        f"User {user_id} matches {len(matching_clusters)}/{len(cluster_ids)} clusters of event {event_id}, "
+        f"scanning {len(scanned_clusters)}"
+    )
+    return match_user_to_event_faces(db, user_id, user_embedding, event_id, threshold, cluster_ids=scanned_clusters)
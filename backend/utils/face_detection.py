@@ -0,0 +1,215 @@
+"""
+Face detection scheduling for SnapCircle.
+Chooses how hard to look for faces per image: a cheap first pass settles
+portraits and selfies, normal photos get the configured upsampling, and
+panoramas or crowded group shots are split into overlapping tiles that are
+detected in parallel threads and merged with non-maximum suppression.
+"""
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Optional, Callable
+import logging
+
+import numpy as np
+try:
+    import face_recognition
+except ImportError:
+    face_recognition = None  # detect_faces_in_image refuses to run without it
+
+from .pipeline_profile import PipelineProfile
+
+logger = logging.getLogger(__name__)
+
+try:
+    from face_recognition_config import (
+        ADAPTIVE_UPSAMPLING,
+        SMALL_IMAGE_DIMENSION,
+        PORTRAIT_MAX_FACES,
+        PORTRAIT_MIN_FACE_SIZE,
+        TILED_DETECTION,
+        CROWD_FACE_COUNT,
+        PANORAMA_ASPECT_RATIO,
+        DETECTION_TILE_SIZE,
+        DETECTION_TILE_OVERLAP,
+        DETECTION_TILE_THREADS,
+        DETECTION_NMS_OVERLAP
+    )
+except ImportError:
+    ADAPTIVE_UPSAMPLING = True
+    SMALL_IMAGE_DIMENSION = 600
+    PORTRAIT_MAX_FACES = 3
+    PORTRAIT_MIN_FACE_SIZE = 100
+    TILED_DETECTION = True
+    CROWD_FACE_COUNT = 12
+    PANORAMA_ASPECT_RATIO = 2.0
+    DETECTION_TILE_SIZE = 800
+    DETECTION_TILE_OVERLAP = 160
+    DETECTION_TILE_THREADS = 4
+    DETECTION_NMS_OVERLAP = 0.5
+
+# face_recognition location order
+FaceLocation = Tuple[int, int, int, int]  # (top, right, bottom, left)
+
+
+def run_detector(image: np.ndarray, upsamples: int, model: str = "hog") -> List[FaceLocation]:
+    """Run the face detector once."""
+    return face_recognition.face_locations(
+        image,
+        number_of_times_to_upsample=upsamples,
+        model=model
+    )
+
+
+def upsamples_for_image(image: np.ndarray, profile: PipelineProfile) -> int:
+    """Upsampling for a full pass: small images need one more level to reach the same face sizes."""
+    if ADAPTIVE_UPSAMPLING and max(image.shape[:2]) < SMALL_IMAGE_DIMENSION:
+        return profile.upsamples + 1
+    return profile.upsamples
+
+
+def is_portrait(face_locations: List[FaceLocation]) -> bool:
+    """A few large faces: the first pass already found everyone worth finding."""
+    if not face_locations or len(face_locations) > PORTRAIT_MAX_FACES:
+        return False
+    return all(
+        min(right - left, bottom - top) >= PORTRAIT_MIN_FACE_SIZE
+        for top, right, bottom, left in face_locations
+    )
+
+
+def is_panorama(image: np.ndarray) -> bool:
+    height, width = image.shape[:2]
+    return max(width, height) / max(1, min(width, height)) >= PANORAMA_ASPECT_RATIO
+
+
+def tile_origins(length: int, tile_size: int, overlap: int) -> List[int]:
+    """Start offsets of evenly spread tiles covering [0, length) with at least the given overlap."""
+    if length <= tile_size:
+        return [0]
+    count = math.ceil((length - overlap) / max(1, tile_size - overlap))
+    return [round(i * (length - tile_size) / (count - 1)) for i in range(count)]
+
+
+def suppress_duplicate_faces(face_locations: List[FaceLocation], max_overlap: float = DETECTION_NMS_OVERLAP) -> List[FaceLocation]:
+    """
+    Greedy non-maximum suppression for faces found in overlapping tiles.
+    The detector reports no scores, so larger boxes win: a face cut by a tile edge
+    gives a partial box that is mostly contained in the full box from the next tile,
+    which is why overlap is measured against the smaller box rather than the union.
+
+    Args:
+        face_locations: (top, right, bottom, left) boxes in one coordinate space
+        max_overlap: Intersection / smaller box area above which two boxes are the same face
+
+    Returns:
+        Kept boxes
+    """
+    if len(face_locations) < 2:
+        return list(face_locations)
+
+    boxes = np.asarray(face_locations, dtype=np.float64)
+    top, right, bottom, left = boxes.T
+    areas = (right - left) * (bottom - top)
+    order = np.argsort(-areas)
+
+    keep = []
+    while order.size:
+        current = order[0]
+        keep.append(current)
+        rest = order[1:]
+        overlap_w = np.clip(np.minimum(right[current], right[rest]) - np.maximum(left[current], left[rest]), 0, None)
+        overlap_h = np.clip(np.minimum(bottom[current], bottom[rest]) - np.maximum(top[current], top[rest]), 0, None)
+        overlap = overlap_w * overlap_h / np.maximum(np.minimum(areas[current], areas[rest]), 1)
+        order = rest[overlap <= max_overlap]
+
+    return [tuple(int(v) for v in face_locations[i]) for i in sorted(keep)]
+
+
+def detect_faces_tiled(image: np.ndarray, upsamples: int, model: str = "hog") -> List[FaceLocation]:
+    """
+    Detect faces in overlapping tiles in parallel threads and merge them.
+    DETECTION_TILE_OVERLAP should exceed the largest face expected in a crowd,
+    so every face lies entirely inside at least one tile.
+
+    Args:
+        image: RGB image to tile
+        upsamples: Upsampling applied inside each tile
+        model: Detector model
+
+    Returns:
+        Face locations in image coordinates
+    """
+    height, width = image.shape[:2]
+    tiles = [
+        (y, x)
+        for y in tile_origins(height, DETECTION_TILE_SIZE, DETECTION_TILE_OVERLAP)
+        for x in tile_origins(width, DETECTION_TILE_SIZE, DETECTION_TILE_OVERLAP)
+    ]
+
+    def detect_tile(origin):
+        y, x = origin
+        tile = np.ascontiguousarray(image[y:y + DETECTION_TILE_SIZE, x:x + DETECTION_TILE_SIZE])
+        return [
+            (top + y, right + x, bottom + y, left + x)
+            for top, right, bottom, left in run_detector(tile, upsamples, model)
+        ]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(DETECTION_TILE_THREADS, len(tiles)))) as executor:
+        found = [location for tile_locations in executor.map(detect_tile, tiles) for location in tile_locations]
+
+    merged = suppress_duplicate_faces(found)
+    logger.debug(f"Tiled detection: {len(tiles)} tiles, {len(found)} raw faces, {len(merged)} after NMS")
+    return merged
+
+
+def locate_faces(
+    image: np.ndarray,
+    profile: PipelineProfile,
+    load_tiling_image: Optional[Callable[[], np.ndarray]] = None
+) -> List[FaceLocation]:
+    """
+    Find face locations with per-image effort.
+
+    1. Cheap pass without upsampling (adaptive mode only). A few large faces are
+       accepted as-is, which settles selfies and portraits at a quarter of the cost.
+    2. Panoramas and crowds (CROWD_FACE_COUNT faces in either pass) are detected in
+       tiles, on the higher resolution image from load_tiling_image when there is one.
+       Tiling that image at the base upsampling replaces an extra upsampling level
+       of the whole image.
+    3. Everything else gets one full pass with upsamples_for_image.
+
+    Args:
+        image: Detection image (RGB)
+        profile: Pipeline profile supplying the detector model and base upsampling
+        load_tiling_image: Optional callable returning the same image at a higher resolution
+
+    Returns:
+        Face locations in detection image coordinates
+    """
+    from .face_recognition_utils import scale_face_locations
+
+    def detect_tiled() -> List[FaceLocation]:
+        tiling_image = load_tiling_image() if load_tiling_image else image
+        if tiling_image.shape[0] > image.shape[0]:
+            locations = detect_faces_tiled(tiling_image, profile.upsamples, profile.model)
+            return scale_face_locations(locations, tiling_image.shape, image.shape)
+        return detect_faces_tiled(image, profile.upsamples + 1, profile.model)
+
+    panorama = TILED_DETECTION and is_panorama(image)
+
+    if ADAPTIVE_UPSAMPLING and not panorama:
+        first_pass = run_detector(image, 0, profile.model)
+        if is_portrait(first_pass):
+            return first_pass
+        if TILED_DETECTION and len(first_pass) >= CROWD_FACE_COUNT:
+            return detect_tiled()
+
+    if panorama:
+        return detect_tiled()
+
+    face_locations = run_detector(image, upsamples_for_image(image, profile), profile.model)
+    if TILED_DETECTION and len(face_locations) >= CROWD_FACE_COUNT:
+        # Many faces at this scale means many more too small to see, look closer
+        return suppress_duplicate_faces(face_locations + detect_tiled())
+    return face_locations
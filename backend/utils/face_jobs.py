@@ -0,0 +1,253 @@
+"""
+Postgres-backed face processing job queue for SnapCircle.
+Workers on any node claim jobs with SELECT ... FOR UPDATE SKIP LOCKED, so many
+workers can drain one event in parallel without processing a photo twice.
+Jobs whose worker crashed are reclaimed once their lease expires.
+"""
+
+import os
+import time
+from datetime import timedelta
+from typing import List, Dict, Any, Optional
+import logging
+from sqlalchemy.orm import Session
+from sqlalchemy import func, or_, and_
+from sqlalchemy.dialects.postgresql import insert
+
+from .face_recognition_utils import FaceRecognitionError
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+FACE_PROCESSING_BACKEND = os.getenv("FACE_PROCESSING_BACKEND", "pool").lower()  # "pool" or "queue"
+FACE_JOB_MAX_ATTEMPTS = int(os.getenv("FACE_JOB_MAX_ATTEMPTS", "3"))
+FACE_JOB_LEASE_SECONDS = int(os.getenv("FACE_JOB_LEASE_SECONDS", "300"))  # Running jobs older than this are reclaimed
+
+JOB_STATUSES = ("pending", "running", "done", "failed")
+
+
+def enqueue_face_jobs(db: Session, photos: List, requeue: bool = False) -> int:
+    """
+    Create pending face jobs for photos. Photos that already have a job are
+    left alone unless requeue is set, which resets finished or failed jobs.
+    The caller is responsible for committing the session.
+
+    Args:
+        db: Database session
+        photos: Photo model instances
+        requeue: Reset existing done/failed jobs back to pending
+
+    Returns:
+        Number of jobs created or reset
+    """
+    from models.face_job import FaceJob
+
+    if not photos:
+        return 0
+
+    statement = insert(FaceJob).values([
+        {"photo_id": photo.id, "event_id": photo.event_id, "status": "pending", "attempts": 0}
+        for photo in photos
+    ])
+    if requeue:
+        statement = statement.on_conflict_do_update(
+            index_elements=[FaceJob.photo_id],
+            set_={"status": "pending", "attempts": 0, "error": None, "locked_by": None, "locked_at": None},
+            where=FaceJob.status.in_(["done", "failed"])
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=[FaceJob.photo_id])
+
+    return len(db.execute(statement.returning(FaceJob.id)).all())
+
+
+def schedule_face_processing(db: Session, photo, image_bytes: Optional[bytes] = None) -> bool:
+    """
+    Hand a newly uploaded photo to the configured background backend.
+
+    Args:
+        db: Database session
+        photo: Committed Photo model instance
+        image_bytes: Stored image bytes from the upload. The process pool works on them
+            directly; queue workers run on other nodes and read the photo from storage.
+
+    Returns:
+        True if the photo was queued
+    """
+    from .face_workers import face_worker_pool, FACE_AUTO_PROCESSING
+
+    if not FACE_AUTO_PROCESSING:
+        return False
+
+    if FACE_PROCESSING_BACKEND == "queue":
+        queued = enqueue_face_jobs(db, [photo]) > 0
+        db.commit()
+        return queued
+
+    return face_worker_pool.submit(photo.id, image_bytes)
+
+
+def claim_face_jobs(db: Session, worker_id: str, limit: int = 1) -> List:
+    """
+    Claim pending jobs, or running jobs whose lease expired, for this worker.
+    Rows locked by other workers are skipped instead of waited on.
+
+    Args:
+        db: Database session
+        worker_id: Unique id of the claiming worker
+        limit: Maximum number of jobs to claim
+
+    Returns:
+        Claimed FaceJob instances, already committed as running
+    """
+    from models.face_job import FaceJob
+
+    lease_expired = FaceJob.locked_at < func.now() - timedelta(seconds=FACE_JOB_LEASE_SECONDS)
+    jobs = db.query(FaceJob).filter(
+        or_(
+            FaceJob.status == "pending",
+            and_(FaceJob.status == "running", lease_expired)
+        )
+    ).order_by(FaceJob.id).limit(limit).with_for_update(skip_locked=True).all()
+
+    claimed = []
+    for job in jobs:
+        if job.attempts >= FACE_JOB_MAX_ATTEMPTS:
+            # The previous attempt crashed without reporting back
+            job.status = "failed"
+            job.error = job.error or "Worker lease expired too many times"
+            job.locked_by = None
+            continue
+
+        job.status = "running"
+        job.locked_by = worker_id
+        job.locked_at = func.now()
+        job.started_at = func.now()
+        job.attempts += 1
+        claimed.append(job)
+
+    db.commit()
+    return claimed
+
+
+def run_face_job(db: Session, job, worker_id: str) -> bool:
+    """
+    Process one claimed job: detect and match faces, then record the outcome.
+    Face rows and the job status are committed in the same transaction.
+
+    Args:
+        db: Database session
+        job: FaceJob claimed by this worker
+        worker_id: Id of the worker that claimed the job
+
+    Returns:
+        True if the job completed successfully
+    """
+    from models.face_job import FaceJob
+    from models.photo import Photo
+    from .face_processing import detect_and_store_faces, mark_photo_failed
+
+    job_id, photo_id, attempts = job.id, job.photo_id, job.attempts
+    owned_by_worker = db.query(FaceJob).filter(
+        FaceJob.id == job_id,
+        FaceJob.locked_by == worker_id,
+        FaceJob.status == "running"
+    )
+
+    start_time = time.monotonic()
+    try:
+        photo = db.query(Photo).filter(Photo.id == photo_id).first()
+        if not photo:
+            raise FaceRecognitionError(f"Photo {photo_id} no longer exists")
+
+        faces_added, faces_matched = detect_and_store_faces(db, photo)
+        owned_by_worker.update({
+            "status": "done",
+            "finished_at": func.now(),
+            "duration_ms": int((time.monotonic() - start_time) * 1000),
+            "faces_detected": faces_added,
+            "faces_matched": faces_matched,
+            "error": None,
+            "locked_by": None
+        }, synchronize_session=False)
+        db.commit()
+        return True
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Face job {job_id} for photo {photo_id} failed: {e}")
+        mark_photo_failed(db, photo_id)
+        owned_by_worker.update({
+            "status": "pending" if attempts < FACE_JOB_MAX_ATTEMPTS else "failed",
+            "finished_at": func.now(),
+            "duration_ms": int((time.monotonic() - start_time) * 1000),
+            "error": str(e)[:2000],
+            "locked_by": None,
+            "locked_at": None
+        }, synchronize_session=False)
+        db.commit()
+        return False
+
+
+def release_face_jobs(db: Session, job_ids: List[int], worker_id: str):
+    """Return claimed jobs that were never started to the queue."""
+    from models.face_job import FaceJob
+
+    if not job_ids:
+        return
+    db.query(FaceJob).filter(
+        FaceJob.id.in_(job_ids),
+        FaceJob.locked_by == worker_id,
+        FaceJob.status == "running"
+    ).update({
+        "status": "pending",
+        "attempts": FaceJob.attempts - 1,
+        "locked_by": None,
+        "locked_at": None
+    }, synchronize_session=False)
+    db.commit()
+
+
+def get_event_job_progress(db: Session, event_id: int) -> Dict[str, Any]:
+    """
+    Summarise face job progress for an event.
+
+    Args:
+        db: Database session
+        event_id: Event ID
+
+    Returns:
+        Dictionary with per-status counts, completion percentage and timings
+    """
+    from models.face_job import FaceJob
+
+    rows = db.query(
+        FaceJob.status,
+        func.count(FaceJob.id),
+        func.avg(FaceJob.duration_ms),
+        func.coalesce(func.sum(FaceJob.faces_detected), 0),
+        func.coalesce(func.sum(FaceJob.faces_matched), 0)
+    ).filter(FaceJob.event_id == event_id).group_by(FaceJob.status).all()
+
+    counts = {job_status: 0 for job_status in JOB_STATUSES}
+    avg_duration_ms = None
+    faces_detected = 0
+    faces_matched = 0
+    for job_status, count, avg_duration, detected, matched in rows:
+        counts[job_status] = count
+        faces_detected += int(detected)
+        faces_matched += int(matched)
+        if job_status == "done" and avg_duration is not None:
+            avg_duration_ms = float(avg_duration)
+
+    total = sum(counts.values())
+    finished = counts["done"] + counts["failed"]
+    return {
+        "event_id": event_id,
+        "total_jobs": total,
+        **counts,
+        "percent_complete": round(finished / total * 100, 1) if total else 100.0,
+        "avg_duration_ms": avg_duration_ms,
+        "faces_detected": faces_detected,
+        "faces_matched": faces_matched
+    }
@@ -0,0 +1,553 @@
+"""
+Vectorized face matching engine for SnapCircle.
+Scores many detected faces against a stacked guest embedding matrix in a single
+matrix operation instead of comparing faces to users one at a time.
+"""
+
+import numpy as np
+from typing import List, Tuple, Optional, Sequence
+import logging
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .embedding_codec import EMBEDDING_DIMENSION, vector_bytes, decode_vector_send
+from .face_metrics import stage_timer
+from .match_trace import active_trace
+
+logger = logging.getLogger(__name__)
+
+try:
+    from face_recognition_config import (
+        FACE_RECOGNITION_TOLERANCE,
+        PGVECTOR_MATCHING_MIN_GUESTS,
+        LOW_CONFIDENCE_MATCH_DISTANCE,
+        MAX_FACE_TEMPLATES
+    )
+except ImportError:
+    FACE_RECOGNITION_TOLERANCE = 0.6
+    PGVECTOR_MATCHING_MIN_GUESTS = 2000
+    LOW_CONFIDENCE_MATCH_DISTANCE = 0.5
+    MAX_FACE_TEMPLATES = 5
+
+# Number of face rows scored per matrix product, keeps the distance matrix bounded
+MATCH_CHUNK_SIZE = 4096
+
+
+def stack_embeddings(embeddings: Sequence) -> np.ndarray:
+    """
+    Stack embeddings (numpy arrays, JSON lists or vector_send bytes) into one contiguous float32 matrix.
+
+    Args:
+        embeddings: Sequence of 128-d embeddings, all of the same kind
+
+    Returns:
+        Matrix of shape (len(embeddings), EMBEDDING_DIMENSION)
+    """
+    if len(embeddings) == 0:
+        return np.empty((0, EMBEDDING_DIMENSION), dtype=np.float32)
+    if isinstance(embeddings[0], (bytes, memoryview)):
+        return decode_vector_send(embeddings)
+    return np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32).reshape(-1, EMBEDDING_DIMENSION))
+
+
+def load_guest_embeddings(db: Session, event_id: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load guest embeddings as an id array and a stacked embedding matrix.
+    Every guest has a row for their centroid (User.embedding) and one per face
+    template; rows are grouped by user so distances can be reduced per user
+    (see reduce_to_users). Only ids and binary embeddings are fetched, the whole
+    event is decoded with one np.frombuffer.
+
+    Args:
+        db: Database session
+        event_id: Optional event ID to limit the load to registered users
+
+    Returns:
+        Tuple of (user_ids, embedding_matrix), user_ids repeats per template
+    """
+    from models.user import User
+    from models.user_face_template import UserFaceTemplate
+    from models.event_registration import EventRegistration
+
+    centroid_query = db.query(User.id, vector_bytes(User.embedding)).filter(User.embedding.isnot(None))
+    template_query = db.query(UserFaceTemplate.user_id, vector_bytes(UserFaceTemplate.embedding))
+    if event_id:
+        centroid_query = centroid_query.join(
+            EventRegistration, User.id == EventRegistration.user_id
+        ).filter(EventRegistration.event_id == event_id)
+        template_query = template_query.join(
+            EventRegistration, UserFaceTemplate.user_id == EventRegistration.user_id
+        ).filter(EventRegistration.event_id == event_id)
+
+    rows = centroid_query.all() + template_query.all()
+    user_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    order = np.argsort(user_ids, kind="stable")
+    return user_ids[order], stack_embeddings([row[1] for row in rows])[order]
+
+
+def reduce_to_users(distances: np.ndarray, user_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a faces x rows distance matrix to faces x users by taking the closest
+    row (centroid or template) of each user, one vectorized np.minimum.reduceat.
+
+    Args:
+        distances: Distance matrix of shape (faces, rows)
+        user_ids: User id per row, grouped by user
+
+    Returns:
+        Tuple of (distances per user, unique user ids)
+    """
+    if len(user_ids) == 0:
+        return distances, user_ids
+    starts = np.flatnonzero(np.concatenate(([True], user_ids[1:] != user_ids[:-1])))
+    if len(starts) == len(user_ids):
+        return distances, user_ids
+    return np.minimum.reduceat(distances, starts, axis=1), user_ids[starts]
+
+
+def compute_distance_matrix(face_matrix: np.ndarray, guest_matrix: np.ndarray) -> np.ndarray:
+    """
+    Compute Euclidean distances between every face and every guest.
+
+    Uses ||a - b||^2 = ||a||^2 + ||b||^2 - 2ab so the whole batch is one matrix product.
+
+    Args:
+        face_matrix: Matrix of shape (faces, EMBEDDING_DIMENSION)
+        guest_matrix: Matrix of shape (guests, EMBEDDING_DIMENSION)
+
+    Returns:
+        Distance matrix of shape (faces, guests)
+    """
+    face_matrix = np.asarray(face_matrix, dtype=np.float32)
+    guest_matrix = np.asarray(guest_matrix, dtype=np.float32)
+
+    face_norms = np.einsum("ij,ij->i", face_matrix, face_matrix)[:, None]
+    guest_norms = np.einsum("ij,ij->i", guest_matrix, guest_matrix)[None, :]
+    squared = face_norms + guest_norms - 2.0 * (face_matrix @ guest_matrix.T)
+    np.maximum(squared, 0.0, out=squared)
+    return np.sqrt(squared, out=squared)
+
+
+def select_top_k(distances: np.ndarray, user_ids: np.ndarray, threshold: float, top_k: int = 10) -> List[List[Tuple[int, float]]]:
+    """
+    Select the closest matches within threshold for every face row.
+
+    Candidates are picked with a partial sort (argpartition), only the top_k
+    columns of each row are fully sorted.
+
+    Args:
+        distances: Distance matrix of shape (faces, guests)
+        user_ids: User ids for the distance matrix columns
+        threshold: Maximum distance for a match (lower is more strict)
+        top_k: Maximum number of matches to return per face
+
+    Returns:
+        One list of (user_id, distance) tuples per face, sorted by distance
+    """
+    face_count, guest_count = distances.shape
+    if face_count == 0 or guest_count == 0 or top_k <= 0:
+        return [[] for _ in range(face_count)]
+
+    k = min(top_k, guest_count)
+    if k < guest_count:
+        candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(guest_count), (face_count, guest_count))
+
+    candidate_distances = np.take_along_axis(distances, candidates, axis=1)
+    order = np.argsort(candidate_distances, axis=1)
+    candidates = np.take_along_axis(candidates, order, axis=1)
+    candidate_distances = np.take_along_axis(candidate_distances, order, axis=1)
+    within_threshold = candidate_distances <= threshold
+
+    results = []
+    for row in range(face_count):
+        keep = within_threshold[row]
+        results.append([
+            (int(user_id), float(distance))
+            for user_id, distance in zip(user_ids[candidates[row][keep]], candidate_distances[row][keep])
+        ])
+    return results
+
+
+def match_embedding_matrix(face_matrix: np.ndarray, user_ids: np.ndarray, guest_matrix: np.ndarray, threshold: float = FACE_RECOGNITION_TOLERANCE, top_k: int = 10) -> List[List[Tuple[int, float]]]:
+    """
+    Score a face matrix against an already loaded guest matrix.
+
+    Args:
+        face_matrix: Matrix of shape (faces, EMBEDDING_DIMENSION)
+        user_ids: User ids for the guest matrix rows, grouped by user
+        guest_matrix: Matrix of shape (rows, EMBEDDING_DIMENSION), a user may have several rows
+        threshold: Maximum distance for a match (lower is more strict)
+        top_k: Maximum number of matches to return per face
+
+    Returns:
+        One list of (user_id, distance) tuples per face, sorted by distance
+    """
+    trace = active_trace()
+    results = []
+    for start in range(0, len(face_matrix), MATCH_CHUNK_SIZE):
+        chunk = face_matrix[start:start + MATCH_CHUNK_SIZE]
+        distances, chunk_user_ids = reduce_to_users(compute_distance_matrix(chunk, guest_matrix), user_ids)
+        if trace is not None:
+            trace.add_distances(distances, threshold)
+        results.extend(select_top_k(distances, chunk_user_ids, threshold, top_k))
+    return results
+
+
+# Candidates the HNSW index collects per query, its default of 40 caps top_k and recall
+HNSW_EF_SEARCH = 100
+
+# Query vectors arrive as text literals, they are cast to vector inside Postgres.
+# Like the in-memory engine, a guest's distance is the closest of their centroid
+# and face templates.
+_NEAREST_IN_EVENT_SQL = text("""
+    WITH guests AS MATERIALIZED (
+        SELECT users.id, users.embedding
+        FROM users
+        JOIN event_registrations ON event_registrations.user_id = users.id
+        WHERE event_registrations.event_id = :event_id AND users.embedding IS NOT NULL
+        UNION ALL
+        SELECT user_face_templates.user_id, user_face_templates.embedding
+        FROM user_face_templates
+        JOIN event_registrations ON event_registrations.user_id = user_face_templates.user_id
+        WHERE event_registrations.event_id = :event_id
+    ),
+    queries AS (
+        SELECT query.position, CAST(query.literal AS vector) AS embedding
+        FROM unnest(CAST(:queries AS text[])) WITH ORDINALITY AS query(literal, position)
+    )
+    SELECT queries.position, nearest.id, nearest.distance
+    FROM queries
+    CROSS JOIN LATERAL (
+        SELECT guests.id, min(guests.embedding <-> queries.embedding) AS distance
+        FROM guests
+        GROUP BY guests.id
+        ORDER BY distance
+        LIMIT :top_k
+    ) AS nearest
+    WHERE nearest.distance <= :threshold
+    ORDER BY queries.position, nearest.distance
+""")
+
+# Each index scan returns :candidates rows, enough for top_k users when a user
+# holds up to MAX_FACE_TEMPLATES rows
+_NEAREST_IN_ALL_SQL = text("""
+    WITH queries AS (
+        SELECT query.position, CAST(query.literal AS vector) AS embedding
+        FROM unnest(CAST(:queries AS text[])) WITH ORDINALITY AS query(literal, position)
+    )
+    SELECT queries.position, nearest.id, nearest.distance
+    FROM queries
+    CROSS JOIN LATERAL (
+        SELECT candidates.id, min(candidates.distance) AS distance
+        FROM (
+            (
+                SELECT users.id, users.embedding <-> queries.embedding AS distance
+                FROM users
+                WHERE users.embedding IS NOT NULL
+                ORDER BY users.embedding <-> queries.embedding
+                LIMIT :candidates
+            )
+            UNION ALL
+            (
+                SELECT user_face_templates.user_id, user_face_templates.embedding <-> queries.embedding
+                FROM user_face_templates
+                ORDER BY user_face_templates.embedding <-> queries.embedding
+                LIMIT :candidates
+            )
+        ) AS candidates
+        GROUP BY candidates.id
+        ORDER BY distance
+        LIMIT :top_k
+    ) AS nearest
+    WHERE nearest.distance <= :threshold
+    ORDER BY queries.position, nearest.distance
+""")
+
+
+def vector_literal(embedding) -> str:
+    """pgvector text representation of an embedding, e.g. '[0.1,0.2,...]'."""
+    return "[" + ",".join(repr(float(value)) for value in np.asarray(embedding, dtype=np.float32)) + "]"
+
+
+def find_nearest_users_batch(face_matrix: np.ndarray, db: Session, threshold: float = FACE_RECOGNITION_TOLERANCE, event_id: Optional[int] = None, top_k: int = 10) -> List[List[Tuple[int, float]]]:
+    """
+    Find the nearest users of many faces in Postgres with one query (a LATERAL
+    nearest-neighbour search per query vector).
+
+    Event-scoped searches first narrow the candidates to the event's registered
+    guests and then scan them exactly. The HNSW index cannot be used there: it
+    returns only its ef_search nearest users of the whole table, and Postgres
+    applies the event filter afterwards, so in a large database the guests of one
+    event may not be among them at all. The full-database search uses the indexes
+    of users and user_face_templates with ef_search raised to cover top_k.
+    Either way a user's distance is the closest of their centroid and templates,
+    the same rule as the in-memory engine (see reduce_to_users).
+
+    Args:
+        face_matrix: Matrix of shape (faces, EMBEDDING_DIMENSION)
+        db: Database session
+        threshold: Maximum distance for a match (lower is more strict)
+        event_id: Optional event ID to limit search to registered users only
+        top_k: Maximum number of matches to return per face
+
+    Returns:
+        One list of (user_id, distance) tuples per face, sorted by distance
+    """
+    results = [[] for _ in range(len(face_matrix))]
+    if len(face_matrix) == 0 or top_k <= 0:
+        return results
+
+    params = {
+        "queries": [vector_literal(face) for face in face_matrix],
+        "top_k": top_k,
+        "threshold": threshold
+    }
+    if event_id:
+        rows = db.execute(_NEAREST_IN_EVENT_SQL, {**params, "event_id": event_id})
+    else:
+        candidates = top_k * MAX_FACE_TEMPLATES
+        # Transaction-local, other queries keep the server default
+        db.execute(
+            text("SELECT set_config('hnsw.ef_search', :ef_search, true)"),
+            {"ef_search": str(max(HNSW_EF_SEARCH, candidates))}
+        )
+        rows = db.execute(_NEAREST_IN_ALL_SQL, {**params, "candidates": candidates})
+
+    for position, user_id, distance in rows:
+        results[position - 1].append((int(user_id), float(distance)))
+    return results
+
+
+def find_nearest_users(face_embedding: np.ndarray, db: Session, threshold: float = FACE_RECOGNITION_TOLERANCE, event_id: Optional[int] = None, top_k: int = 10) -> List[Tuple[int, float]]:
+    """
+    Find the nearest users of one face in Postgres, see find_nearest_users_batch.
+
+    Args:
+        face_embedding: Face embedding to match against
+        db: Database session
+        threshold: Maximum distance for a match (lower is more strict)
+        event_id: Optional event ID to limit search to registered users only
+        top_k: Maximum number of matches to return
+
+    Returns:
+        List of (user_id, distance) tuples sorted by distance
+    """
+    return find_nearest_users_batch(stack_embeddings([face_embedding]), db, threshold, event_id, top_k)[0]
+
+
+def should_use_pgvector(db: Session, event_id: Optional[int]) -> bool:
+    """Decide whether matching for an event should run in Postgres instead of in memory."""
+    if not event_id:
+        return True
+
+    from models.event_registration import EventRegistration
+    from .embedding_index import embedding_index
+
+    # Events already held in memory were small enough to load, no need to count guests
+    if embedding_index.contains(event_id):
+        return False
+
+    guest_count = db.query(EventRegistration).filter(EventRegistration.event_id == event_id).count()
+    return guest_count >= PGVECTOR_MATCHING_MIN_GUESTS
+
+
+def match_face_embeddings(face_embeddings: Sequence, db: Session, threshold: float = FACE_RECOGNITION_TOLERANCE, event_id: Optional[int] = None, top_k: int = 10) -> List[List[Tuple[int, float]]]:
+    """
+    Match a batch of face embeddings (e.g. all faces of a batch of photos) in one pass.
+
+    Small and medium events are scored in memory against the cached guest matrix;
+    the full-database search and very large events run one pgvector query per batch.
+
+    Args:
+        face_embeddings: Sequence of 128-d face embeddings
+        db: Database session
+        threshold: Maximum distance for a match (lower is more strict)
+        event_id: Optional event ID to limit search to registered users only
+        top_k: Maximum number of matches to return per face
+
+    Returns:
+        One list of (user_id, distance) tuples per input face, sorted by distance
+    """
+    face_matrix = stack_embeddings(face_embeddings)
+    if len(face_matrix) == 0:
+        return []
+
+    trace = active_trace()
+    with stage_timer("match"):
+        use_pgvector = should_use_pgvector(db, event_id)
+        if trace is not None:
+            trace.start_batch(event_id, threshold, top_k, "pgvector" if use_pgvector else "memory", len(face_matrix))
+
+        if use_pgvector:
+            results = find_nearest_users_batch(face_matrix, db, threshold, event_id, top_k)
+        else:
+            from .embedding_index import embedding_index
+            user_ids, guest_matrix = embedding_index.get(db, event_id)
+            results = match_embedding_matrix(face_matrix, user_ids, guest_matrix, threshold, top_k)
+
+    if trace is not None:
+        trace.record_candidates(results)
+    return results
+
+
+def assign_unique_matches(
+    matches_per_face: Sequence[List[Tuple[int, float]]],
+    groups: Sequence[int],
+    threshold: float,
+    confirmed_users: Optional[Sequence[Optional[int]]] = None
+) -> List[Optional[Tuple[int, float, float]]]:
+    """
+    Resolve per-face candidates so that every user is assigned at most once per
+    group (photo). Greedy on sorted pairs: the candidates of a group are visited
+    from the closest pair on, and a pair is taken while both its face and its
+    user are still free. With at least (faces in the group + 1) candidates per face
+    this equals greedy assignment on the full faces x guests matrix.
+
+    The confidence is the margin between the assigned distance and the face's
+    closest other candidate (the threshold if it has none), 0 if a closer
+    candidate of the face went to another face.
+
+    Faces confirmed by a guest are left out (None) and their guest is not
+    assigned to another face of the group.
+
+    Args:
+        matches_per_face: One list of (user_id, distance) candidates per face, sorted by distance
+        groups: Group key (photo ID) per face
+        threshold: Maximum distance for a match
+        confirmed_users: Confirmed guest per face, None for faces that are not confirmed
+
+    Returns:
+        One (user_id, distance, confidence) tuple per face, None for unmatched and confirmed faces
+    """
+    if confirmed_users is None:
+        confirmed_users = [None] * len(matches_per_face)
+
+    faces_per_group = {}
+    for face, group in enumerate(groups):
+        faces_per_group.setdefault(group, []).append(face)
+
+    assignments: List[Optional[Tuple[int, float, float]]] = [None] * len(matches_per_face)
+    for faces in faces_per_group.values():
+        assigned_users = {confirmed_users[face] for face in faces if confirmed_users[face] is not None}
+        pairs = sorted(
+            (distance, face, user_id)
+            for face in faces if confirmed_users[face] is None
+            for user_id, distance in matches_per_face[face]
+        )
+        for distance, face, user_id in pairs:
+            if assignments[face] is not None or user_id in assigned_users:
+                continue
+            alternative = min(
+                (other for other_user, other in matches_per_face[face] if other_user != user_id),
+                default=threshold
+            )
+            assignments[face] = (user_id, distance, max(0.0, alternative - distance))
+            assigned_users.add(user_id)
+
+    return assignments
+
+
+def match_user_to_event_faces(db: Session, user_id: int, user_embedding: Sequence, event_id: int, threshold: float = FACE_RECOGNITION_TOLERANCE, cluster_ids: Optional[Sequence[int]] = None) -> int:
+    """
+    Reverse matching: compare one guest embedding against the event's stored face
+    embeddings, so a guest who joins late (or updates their selfie) is found in
+    photos that were processed before. Only unmatched faces, low-confidence
+    matches and the guest's own matches are considered; no image is re-detected.
+    The guest is kept on at most one face per photo, the closest one. Confirmed
+    faces are never changed, and a guest who confirmed a face of a photo claims no
+    other face of it.
+    With cluster_ids (see utils/face_clustering.py) only faces of those clusters,
+    unclustered faces and the guest's own matches are scanned. Clusters only narrow
+    the candidates, every claimed face must itself be within threshold.
+    The caller is responsible for committing the session.
+
+    Args:
+        db: Database session
+        user_id: Guest user ID
+        user_embedding: Guest face embedding, or a matrix of the guest's centroid and templates
+        event_id: Event whose stored faces are scanned
+        threshold: Maximum distance for a match (lower is more strict)
+        cluster_ids: Clusters the guest was matched to by centroid
+
+    Returns:
+        Number of faces whose match was updated
+    """
+    from models.photo import Photo
+    from models.photo_face import PhotoFace
+    from sqlalchemy import or_, and_
+
+    query = db.query(
+        PhotoFace.id, vector_bytes(PhotoFace.embedding), PhotoFace.matched_user_id, PhotoFace.match_distance,
+        PhotoFace.photo_id, PhotoFace.confirmed
+    ).join(Photo, Photo.id == PhotoFace.photo_id).filter(
+        Photo.event_id == event_id,
+        or_(
+            PhotoFace.matched_user_id.is_(None),
+            PhotoFace.matched_user_id == user_id,
+            and_(PhotoFace.match_distance > LOW_CONFIDENCE_MATCH_DISTANCE, PhotoFace.confirmed.is_(False))
+        )
+    )
+    if cluster_ids is not None:
+        query = query.filter(or_(
+            PhotoFace.cluster_id.in_(cluster_ids),
+            PhotoFace.cluster_id.is_(None),
+            PhotoFace.matched_user_id == user_id
+        ))
+    rows = query.all()
+
+    if not rows:
+        return 0
+
+    face_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    face_matrix = stack_embeddings([row[1] for row in rows])
+    matched_user_ids = [row[2] for row in rows]
+    current_distances = np.array(
+        [np.inf if row[3] is None else row[3] for row in rows], dtype=np.float32
+    )
+    own_match = np.array([matched == user_id for matched in matched_user_ids], dtype=bool)
+    unmatched = np.array([matched is None for matched in matched_user_ids], dtype=bool)
+
+    # One matrix product for all candidate faces, the closest template counts
+    user_matrix = stack_embeddings(np.asarray(user_embedding, dtype=np.float32).reshape(-1, EMBEDDING_DIMENSION))
+    distances = compute_distance_matrix(face_matrix, user_matrix).min(axis=1)
+    within_threshold = distances <= threshold
+
+    claim = within_threshold & (unmatched | own_match | (distances < current_distances))
+
+    # The guest's confirmed faces are kept and rank first in their photo
+    confirmed = np.array([bool(row[5]) for row in rows], dtype=bool)
+    claim |= confirmed
+    ranking = np.where(confirmed, -1.0, distances)
+
+    # Keep only the closest claimed face of each photo
+    photo_ids = np.fromiter((row[4] for row in rows), dtype=np.int64, count=len(rows))
+    claimed = np.flatnonzero(claim)
+    claimed = claimed[np.lexsort((ranking[claimed], photo_ids[claimed]))]
+    _, first_per_photo = np.unique(photo_ids[claimed], return_index=True)
+    claim = np.zeros(len(rows), dtype=bool)
+    claim[claimed[first_per_photo]] = True
+    release = own_match & ~claim & ~confirmed
+    claim &= ~confirmed
+
+    # Margin to the match the face had before, or to the threshold
+    alternatives = np.where(unmatched | own_match, threshold, current_distances)
+    confidences = np.maximum(alternatives - distances, 0.0)
+
+    updates = [
+        {"id": int(face_id), "matched_user_id": user_id, "match_distance": float(distance), "match_confidence": float(confidence)}
+        for face_id, distance, confidence in zip(face_ids[claim], distances[claim], confidences[claim])
+    ]
+    updates.extend(
+        {"id": int(face_id), "matched_user_id": None, "match_distance": None, "match_confidence": None}
+        for face_id in face_ids[release]
+    )
+    if updates:
+        db.bulk_update_mappings(PhotoFace, updates)
+
+    logger.debug(
+        f"Reverse matching for user {user_id} in event {event_id}: "
+        f"{int(claim.sum())} faces matched, {int(release.sum())} released of {len(rows)} candidates"
+    )
+    return len(updates)
@@ -0,0 +1,125 @@
+"""
+Prometheus metrics for the SnapCircle face pipeline.
+Every stage (download, decode, EXIF rotate, resize, detect, encode, match and
+DB write) is timed into one histogram labelled by stage, pipeline profile and
+outcome. The "photo" stage covers a whole photo, so its _count series counts
+processed photos by outcome. A slow event shows whether it waits on S3 and
+Postgres or burns CPU in dlib.
+
+Face workers run in separate processes. Set PROMETHEUS_MULTIPROC_DIR to an
+empty directory, cleared on every deploy, before the app starts so their
+samples are aggregated into /metrics as well.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Tuple
+
+from prometheus_client import (
+    Counter,
+    Histogram,
+    CollectorRegistry,
+    REGISTRY,
+    CONTENT_TYPE_LATEST,
+    generate_latest
+)
+
+# Stage outcomes: faces and no_face for detection and whole photos, ok for the
+# other stages, error whenever a stage raises
+OUTCOME_OK = "ok"
+OUTCOME_FACES = "faces"
+OUTCOME_NO_FACE = "no_face"
+OUTCOME_ERROR = "error"
+
+# Resizing takes a few ms, detection of a crowd with tiling several seconds
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+FACE_STAGE_SECONDS = Histogram(
+    "snapcircle_face_stage_seconds",
+    "Duration of one face pipeline stage",
+    ["stage", "profile", "outcome"],
+    buckets=STAGE_BUCKETS
+)
+FACES_DETECTED_TOTAL = Counter(
+    "snapcircle_faces_detected_total",
+    "Faces found in processed photos, cached results included",
+    ["profile"]
+)
+FACES_MATCHED_TOTAL = Counter(
+    "snapcircle_faces_matched_total",
+    "Stored faces matched to a guest",
+    ["profile"]
+)
+
+# Profile of the pipeline run in progress, stages deep inside the pipeline
+# (decoding, matching) do not know which profile they run for
+_current_profile: ContextVar[str] = ContextVar("face_pipeline_profile", default="unknown")
+
+
+class StageObservation:
+    """Handle yielded by stage_timer, the stage may set its outcome before it ends."""
+
+    def __init__(self):
+        self.outcome = OUTCOME_OK
+
+
+@contextmanager
+def pipeline_profile(name: str):
+    """Label every stage run inside the block with the given pipeline profile."""
+    token = _current_profile.set(name)
+    try:
+        yield
+    finally:
+        _current_profile.reset(token)
+
+
+def current_profile() -> str:
+    return _current_profile.get()
+
+
+@contextmanager
+def stage_timer(stage: str, profile: Optional[str] = None):
+    """
+    Time a pipeline stage into snapcircle_face_stage_seconds.
+
+    Args:
+        stage: Stage name (download, decode, exif_rotate, resize, detect, encode, match, db_write, photo)
+        profile: Pipeline profile label, defaults to the one set by pipeline_profile
+
+    Yields:
+        StageObservation whose outcome may be changed by the caller
+    """
+    observation = StageObservation()
+    start = time.perf_counter()
+    try:
+        yield observation
+    except BaseException:
+        observation.outcome = OUTCOME_ERROR
+        raise
+    finally:
+        FACE_STAGE_SECONDS.labels(stage, profile or _current_profile.get(), observation.outcome).observe(
+            time.perf_counter() - start
+        )
+
+
+def face_outcome(face_count: int) -> str:
+    return OUTCOME_FACES if face_count else OUTCOME_NO_FACE
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Current metrics in the Prometheus text format, aggregated over all processes
+    in multiprocess mode.
+
+    Returns:
+        Tuple of (body, content type)
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,366 @@
+"""
+Face processing pipeline for stored event photos.
+Shared by the request handlers and the background face workers: resolves the
+image source, detects faces, matches them against event guests and writes
+PhotoFace rows.
+"""
+
+import os
+import time
+from collections import Counter
+from typing import List, Tuple, Optional, Dict, Any
+import logging
+from sqlalchemy.orm import Session
+from sqlalchemy import func, or_, and_
+from sqlalchemy.dialects.postgresql import insert
+
+from .aws_config import aws_config
+from .face_matcher import match_face_embeddings, match_user_to_event_faces, assign_unique_matches
+from .face_recognition_utils import FaceRecognitionError, ImageSource
+from .pipeline_profile import PipelineProfile, profile_for_event, pipeline_fingerprint
+from .face_cache import detect_faces_cached
+from .face_clustering import (
+    FACE_CLUSTERING,
+    cluster_faces,
+    match_user_to_event_clusters,
+    remove_photo_faces_from_clusters
+)
+from .face_templates import user_template_matrix
+from .face_metrics import stage_timer, pipeline_profile, face_outcome, FACES_DETECTED_TOTAL, FACES_MATCHED_TOTAL
+from .match_trace import active_trace
+
+logger = logging.getLogger(__name__)
+
+# Photos processed between commits in batch processing, a crash loses at most one chunk
+FACE_PROCESSING_CHUNK_SIZE = int(os.getenv("FACE_PROCESSING_CHUNK_SIZE", "25"))
+
+
+def resolve_image_source(image_path: str) -> Optional[str]:
+    """
+    Get the path/URL face recognition should read a stored photo from.
+
+    Args:
+        image_path: The image path from database (S3 URL or local relative path)
+
+    Returns:
+        Presigned S3 URL or absolute local path, None if the local file is missing
+    """
+    if aws_config.use_s3_storage and image_path.startswith('http'):
+        from routers.photos import get_secure_photo_url
+        return get_secure_photo_url(image_path)
+
+    upload_dir = os.getenv("UPLOAD_DIR", "../uploads")
+    local_path = os.path.join(upload_dir, image_path)
+    if not os.path.exists(local_path):
+        return None
+    return local_path
+
+
+def add_photo_faces(
+    db: Session,
+    event_id: int,
+    photo_faces: List[Tuple[int, Dict[str, Any]]],
+    threshold: Optional[float] = None
+) -> Tuple[int, int]:
+    """
+    Match detected faces of one event in a single pass and insert PhotoFace rows.
+    Each guest is assigned to at most one face per photo (see assign_unique_matches).
+    Faces that already exist for a photo are skipped (ON CONFLICT DO NOTHING), so
+    concurrent workers processing the same photo never create duplicate rows.
+    Inserted faces join the event's face clusters when FACE_CLUSTERING is on.
+    The caller is responsible for committing the session.
+
+    Args:
+        db: Database session
+        event_id: Event the photos belong to
+        photo_faces: List of (photo_id, face_data) tuples from detect_faces_in_image
+        threshold: Match tolerance (defaults to the event's pipeline profile)
+
+    Returns:
+        Tuple of (faces_added, faces_matched)
+    """
+    from models.photo_face import PhotoFace
+
+    if not photo_faces:
+        return 0, 0
+
+    if threshold is None:
+        threshold = profile_for_event(db, event_id).tolerance
+
+    # One candidate more than the faces of the largest photo keeps the per-photo
+    # assignment exact and leaves a runner-up for the confidence margin
+    photo_ids = [photo_id for photo_id, _ in photo_faces]
+    top_k = max(10, max(Counter(photo_ids).values()) + 1)
+    matches_per_face = match_face_embeddings(
+        [face_data["embedding"] for _, face_data in photo_faces],
+        db,
+        threshold=threshold,
+        event_id=event_id,
+        top_k=top_k
+    )
+    assignments = assign_unique_matches(matches_per_face, photo_ids, threshold)
+    trace = active_trace()
+    if trace is not None:
+        trace.record_assignments([(photo_id, face_data["face_index"]) for photo_id, face_data in photo_faces], assignments)
+
+    rows = []
+    for (photo_id, face_data), assignment in zip(photo_faces, assignments):
+        rows.append({
+            "photo_id": photo_id,
+            "face_index": face_data["face_index"],
+            "embedding": face_data["embedding"].tolist(),
+            "bounding_box": face_data["bounding_box"],
+            "matched_user_id": assignment[0] if assignment else None,
+            "match_distance": assignment[1] if assignment else None,
+            "match_confidence": assignment[2] if assignment else None
+        })
+
+    with stage_timer("db_write"):
+        inserted = db.execute(
+            insert(PhotoFace)
+            .values(rows)
+            .on_conflict_do_nothing(constraint="unique_photo_face_index")
+            .returning(PhotoFace.id, PhotoFace.photo_id, PhotoFace.face_index, PhotoFace.matched_user_id)
+        ).all()
+
+        if FACE_CLUSTERING and inserted:
+            embeddings = {(row["photo_id"], row["face_index"]): row["embedding"] for row in rows}
+            cluster_faces(
+                db, event_id,
+                [face.id for face in inserted],
+                [embeddings[(face.photo_id, face.face_index)] for face in inserted]
+            )
+
+    faces_matched = sum(1 for face in inserted if face.matched_user_id)
+    return len(inserted), faces_matched
+
+
+def store_pending_faces(
+    db: Session,
+    pending_faces: Dict[int, List[Tuple[int, Dict[str, Any]]]],
+    profiles: Dict[int, PipelineProfile]
+) -> Tuple[int, int]:
+    """
+    Match and insert the detected faces of a chunk of photos, one pass per event,
+    and commit. Blocking (matching, INSERT ... RETURNING, clustering under an
+    advisory lock), request handlers run it in the threadpool.
+
+    Args:
+        db: Database session
+        pending_faces: event_id -> [(photo_id, face_data)]
+        profiles: event_id -> pipeline profile supplying the match tolerance
+
+    Returns:
+        Tuple of (faces_added, faces_matched) over all events
+    """
+    total_added = total_matched = 0
+    for event_id, event_faces in pending_faces.items():
+        with pipeline_profile(profiles[event_id].name):
+            faces_added, faces_matched = add_photo_faces(db, event_id, event_faces, profiles[event_id].tolerance)
+        total_added += faces_added
+        total_matched += faces_matched
+    db.commit()
+    return total_added, total_matched
+
+
+def match_guest_in_event_photos(db: Session, user_id: int, user_embedding, event_ids: List[int]) -> int:
+    """
+    Find a guest in the already processed photos of their events and commit the matches.
+    Failures are logged and never propagate, joining an event must not fail because of them.
+
+    Args:
+        db: Database session
+        user_id: Guest user ID
+        user_embedding: Guest face embedding (nothing happens if None)
+        event_ids: Events to scan
+
+    Returns:
+        Number of faces whose match was updated
+    """
+    if user_embedding is None:
+        return 0
+
+    # Match with the guest's templates as well as the given embedding
+    user_embedding = user_template_matrix(db, user_id, user_embedding)
+    updated = 0
+    for event_id in event_ids:
+        try:
+            threshold = profile_for_event(db, event_id).tolerance
+            if FACE_CLUSTERING:
+                updated += match_user_to_event_clusters(db, user_id, user_embedding, event_id, threshold)
+            else:
+                updated += match_user_to_event_faces(db, user_id, user_embedding, event_id, threshold)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Reverse face matching failed for user {user_id} in event {event_id}: {e}")
+    return updated
+
+
+def new_faces_for_photo(db: Session, photo_id: int, faces_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop detected faces whose face_index already has a PhotoFace row for the photo."""
+    from models.photo_face import PhotoFace
+
+    existing_indexes = {
+        face_index for (face_index,) in db.query(PhotoFace.face_index).filter(PhotoFace.photo_id == photo_id).all()
+    }
+    return [face_data for face_data in faces_data if face_data["face_index"] not in existing_indexes]
+
+
+def photo_is_processed(photo, pipeline_key: str) -> bool:
+    """True if the photo's faces are stored for this pipeline (or by a pipeline that predates fingerprints)."""
+    return photo.face_status == "done" and photo.face_pipeline_key in (None, pipeline_key)
+
+
+def unprocessed_photos_condition(pipeline_keys: Dict[int, str]):
+    """
+    SQL condition matching photos that still need processing: not done, or done
+    by a different pipeline than their event's current one.
+
+    Args:
+        pipeline_keys: Pipeline fingerprint per event ID
+
+    Returns:
+        SQLAlchemy boolean clause for Photo queries
+    """
+    from models.photo import Photo
+
+    return or_(
+        Photo.face_status != "done",
+        *[
+            and_(
+                Photo.event_id == event_id,
+                Photo.face_pipeline_key.isnot(None),
+                Photo.face_pipeline_key != pipeline_key
+            )
+            for event_id, pipeline_key in pipeline_keys.items()
+        ]
+    )
+
+
+def mark_photo_processed(photo, pipeline_key: str, face_count: int, duration_ms: int):
+    """Record a completed face pass on the photo, committed together with its faces."""
+    photo.face_status = "done"
+    photo.face_pipeline_key = pipeline_key
+    photo.face_count = face_count
+    photo.faces_processed_at = func.now()
+    photo.face_processing_ms = duration_ms
+
+
+def clear_reprocessed_faces(db: Session, photo) -> None:
+    """Delete the faces of a photo that is processed again, so they reflect the current pipeline."""
+    from models.photo_face import PhotoFace
+
+    if photo.face_status == "done":
+        remove_photo_faces_from_clusters(db, photo.event_id, photo.id)
+        db.query(PhotoFace).filter(PhotoFace.photo_id == photo.id).delete(synchronize_session=False)
+
+
+def mark_photo_failed(db: Session, photo_id: int):
+    """Record a failed face pass, the photo is picked up again by the next run."""
+    from models.photo import Photo
+
+    db.query(Photo).filter(Photo.id == photo_id).update({
+        "face_status": "failed",
+        "faces_processed_at": func.now()
+    }, synchronize_session=False)
+
+
+def detect_and_store_faces(
+    db: Session,
+    photo,
+    image_source: Optional[ImageSource] = None,
+    profile: Optional[PipelineProfile] = None,
+    force: bool = False
+) -> Tuple[int, int]:
+    """
+    Detect, match and insert the faces of one photo using the given session, and
+    record the photo's processing state. Photos already processed with the same
+    pipeline are skipped, identical images are served from the face result cache.
+    The caller is responsible for committing the session.
+
+    Args:
+        db: Database session
+        photo: Photo model instance
+        image_source: Optional path/URL, image bytes or decoded array (resolved from the photo if omitted)
+        profile: Pipeline profile (defaults to the event's profile)
+        force: Process even if the photo is already done
+
+    Returns:
+        Tuple of (faces_added, faces_matched)
+
+    Raises:
+        FaceRecognitionError: If the image cannot be read or analysed
+    """
+    if profile is None:
+        profile = profile_for_event(db, photo.event_id)
+
+    pipeline_key = pipeline_fingerprint(profile)
+    if not force and photo_is_processed(photo, pipeline_key):
+        return 0, 0
+
+    start_time = time.monotonic()
+    with pipeline_profile(profile.name), stage_timer("photo") as stage:
+        if image_source is None:
+            image_source = resolve_image_source(photo.image_path)
+            if image_source is None:
+                raise FaceRecognitionError(f"Image for photo {photo.id} not found")
+
+        faces_data = detect_faces_cached(db, image_source, profile, photo)
+        clear_reprocessed_faces(db, photo)
+        new_faces = new_faces_for_photo(db, photo.id, faces_data)
+        faces_added, faces_matched = add_photo_faces(
+            db, photo.event_id, [(photo.id, face_data) for face_data in new_faces], profile.tolerance
+        )
+        stage.outcome = face_outcome(len(faces_data))
+
+    FACES_DETECTED_TOTAL.labels(profile.name).inc(len(faces_data))
+    FACES_MATCHED_TOTAL.labels(profile.name).inc(faces_matched)
+    mark_photo_processed(photo, pipeline_key, len(faces_data), int((time.monotonic() - start_time) * 1000))
+    return faces_added, faces_matched
+
+
+def process_photo(photo_id: int, image_source: Optional[ImageSource] = None) -> Dict[str, Any]:
+    """
+    Detect, match and store the faces of one photo in its own database session.
+    Used by background workers that run outside of a request.
+
+    Args:
+        photo_id: Photo to process
+        image_source: Optional path/URL, image bytes or decoded array (resolved from the photo if omitted)
+
+    Returns:
+        Dictionary with the processing outcome
+    """
+    from database.connection import SessionLocal
+    from models.photo import Photo
+
+    start_time = time.time()
+    db = SessionLocal()
+    try:
+        photo = db.query(Photo).filter(Photo.id == photo_id).first()
+        if not photo:
+            return {"photo_id": photo_id, "status": "missing"}
+
+        faces_added, faces_matched = detect_and_store_faces(db, photo, image_source)
+        db.commit()
+
+        logger.info(
+            f"Processed photo {photo_id}: {faces_added} faces, {faces_matched} matched "
+            f"in {time.time() - start_time:.2f}s"
+        )
+        return {
+            "photo_id": photo_id,
+            "status": "done",
+            "faces_detected": faces_added,
+            "faces_matched": faces_matched
+        }
+
+    except FaceRecognitionError as e:
+        db.rollback()
+        logger.error(f"Face detection failed for photo {photo_id}: {e}")
+        mark_photo_failed(db, photo_id)
+        db.commit()
+        return {"photo_id": photo_id, "status": "failed", "error": str(e)}
+    finally:
+        db.close()
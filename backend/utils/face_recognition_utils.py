@@ -3,22 +3,29 @@ Face recognition utilities for SnapCircle.
 Handles face detection, embedding generation, and face matching.
 """
 
-import face_recognition
+try:
+    import face_recognition
+except ImportError:
+    # Decoding and preprocessing work without dlib (e.g. the decode benchmark), detection does not
+    face_recognition = None
 import numpy as np
 import cv2
 from PIL import Image
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Union
 import logging
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import requests
 import io
 import os
-import tempfile
-from urllib.parse import urlparse
+import time
+
+from .face_matcher import match_face_embeddings
+from .face_detection import locate_faces
+from .pipeline_profile import PipelineProfile, get_pipeline_profile
+from .selfie_gate import SELFIE_GATE, screen_selfie, record_pipeline_time
+from .face_metrics import stage_timer, pipeline_profile, face_outcome
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Import configuration
@@ -29,7 +36,9 @@ try:
         MAX_FACE_SIZE,
         MIN_FACE_RATIO,
         MAX_FACE_RATIO,
-        MAX_IMAGE_DIMENSION
+        JPEG_DRAFT_DECODING,
+        TWO_RESOLUTION_ENCODING,
+        ENCODING_MAX_DIMENSION
     )
 except ImportError:
     # Fallback configuration if config file not found
@@ -40,7 +49,9 @@ except ImportError:
     MAX_FACE_RATIO = 0.8
     MIN_ASPECT_RATIO = 0.7
     MAX_ASPECT_RATIO = 1.4
-    MAX_IMAGE_DIMENSION = 1200
+    JPEG_DRAFT_DECODING = True
+    TWO_RESOLUTION_ENCODING = False
+    ENCODING_MAX_DIMENSION = 2000
 
 
 class FaceRecognitionError(Exception):
@@ -48,155 +59,252 @@ class FaceRecognitionError(Exception):
     pass
 
 
-def get_image_for_processing(image_path: str) -> str:
+# Anything the face pipeline can read an image from: local path, URL, encoded
+# bytes (or a buffer holding them) or an already decoded RGB array
+ImageSource = Union[str, bytes, io.BytesIO, np.ndarray]
+
+
+def describe_image_source(image_source: ImageSource) -> str:
+    """Short description of an image source for log messages."""
+    if isinstance(image_source, str):
+        return image_source
+    if isinstance(image_source, np.ndarray):
+        return f"<decoded image {image_source.shape[1]}x{image_source.shape[0]}>"
+    if isinstance(image_source, (bytes, bytearray)):
+        return f"<in-memory image, {len(image_source)} bytes>"
+    return "<in-memory image>"
+
+
+def read_image_bytes(image_source: Union[str, bytes, io.BytesIO]) -> bytes:
     """
-    Get a local file path for image processing.
-    Downloads S3 images to temporary files if needed.
+    Get the encoded bytes of an image, downloading S3 images into memory.
 
     Args:
-        image_path: Local file path or S3 URL
+        image_source: Local file path, S3 URL, encoded bytes or a BytesIO buffer
 
     Returns:
-        Local file path that can be used for face recognition
+        Encoded image bytes
+
+    Raises:
+        FaceRecognitionError: If the image cannot be read
     """
+    if isinstance(image_source, (bytes, bytearray)):
+        return bytes(image_source)
+
+    if isinstance(image_source, io.BytesIO):
+        return image_source.getvalue()
+
     # Check if it's a URL (S3)
-    if image_path.startswith('http'):
+    if image_source.startswith('http'):
         try:
-            # Download the image from S3 URL to a temporary file
-            response = requests.get(image_path, timeout=30)
-            response.raise_for_status()
+            with stage_timer("download"):
+                response = requests.get(image_source, timeout=30)
+                response.raise_for_status()
+        except Exception as e:
+            logger.error(f"Failed to download S3 image {image_source}: {e}")
+            raise FaceRecognitionError(f"Cannot access image for processing: {e}")
+        return response.content
 
-            # Create temporary file with appropriate extension
-            parsed_url = urlparse(image_path)
-            file_extension = os.path.splitext(parsed_url.path)[1] or '.jpg'
+    if not os.path.exists(image_source):
+        raise FaceRecognitionError(f"Local image file not found: {image_source}")
 
-            # Create temporary file
-            temp_file = tempfile.NamedTemporaryFile(
-                delete=False,
-                suffix=file_extension,
-                prefix='face_processing_'
-            )
+    with open(image_source, "rb") as f:
+        return f.read()
 
-            # Write image data to temporary file
-            temp_file.write(response.content)
-            temp_file.close()
 
-            logger.info(f"Downloaded S3 image to temporary file: {temp_file.name}")
-            return temp_file.name
+def open_image_source(image_source: ImageSource) -> Image.Image:
+    """
+    Open an encoded image from a path, URL, bytes or buffer without touching disk
+    for anything that is not already a local file. S3 images are downloaded into memory.
 
-        except Exception as e:
-            logger.error(f"Failed to download S3 image {image_path}: {e}")
-            raise FaceRecognitionError(f"Cannot access image for processing: {e}")
+    Args:
+        image_source: Local file path, S3 URL, encoded bytes or a BytesIO buffer
+
+    Returns:
+        PIL image (lazily decoded)
+    """
+    if isinstance(image_source, (bytes, bytearray)):
+        return Image.open(io.BytesIO(image_source))
 
-    # For local files, return as-is
-    if not os.path.exists(image_path):
-        raise FaceRecognitionError(f"Local image file not found: {image_path}")
+    if isinstance(image_source, io.BytesIO):
+        image_source.seek(0)
+        return Image.open(image_source)
 
-    return image_path
+    # Check if it's a URL (S3)
+    if image_source.startswith('http'):
+        return Image.open(io.BytesIO(read_image_bytes(image_source)))
 
+    if not os.path.exists(image_source):
+        raise FaceRecognitionError(f"Local image file not found: {image_source}")
 
-def cleanup_temp_file(file_path: str):
-    """Clean up temporary file if it was created for S3 processing."""
-    if file_path.startswith(tempfile.gettempdir()) and 'face_processing_' in file_path:
-        try:
-            os.unlink(file_path)
-            logger.debug(f"Cleaned up temporary file: {file_path}")
-        except Exception as e:
-            logger.warning(f"Failed to clean up temporary file {file_path}: {e}")
+    return Image.open(image_source)
+
+
+def scaled_image_size(width: int, height: int, max_dimension: int) -> Tuple[int, int]:
+    """Size of an image shrunk so its longer side is max_dimension (unchanged if already smaller)."""
+    if max(width, height) <= max_dimension:
+        return width, height
+    if width > height:
+        return max_dimension, int((height * max_dimension) / width)
+    return int((width * max_dimension) / height), max_dimension
 
 
-def preprocess_image_for_face_detection(image_path: str) -> np.ndarray:
+def preprocess_image_for_face_detection(image_source: ImageSource, max_dimension: Optional[int] = None) -> np.ndarray:
     """
     Preprocess image for better face detection.
 
     Args:
-        image_path: Path to the image file
+        image_source: Image path/URL, encoded bytes or buffer, or a decoded RGB array
+        max_dimension: Longest side of the result (defaults to the active profile's max_dimension)
 
     Returns:
         Preprocessed image as numpy array
     """
-    local_path = None
+    if max_dimension is None:
+        max_dimension = get_pipeline_profile().max_dimension
+
+    if isinstance(image_source, np.ndarray):
+        # Already decoded by the caller, face_recognition wants contiguous uint8 RGB
+        if image_source.ndim == 2:
+            image_source = np.stack([image_source] * 3, axis=-1)
+        return _limit_dimension(np.ascontiguousarray(image_source[..., :3], dtype=np.uint8), max_dimension)
+
     try:
-        # Get local file path (downloads S3 images if needed)
-        local_path = get_image_for_processing(image_path)
+        # Download S3 images first so the decode stage times decoding only
+        if isinstance(image_source, str) and image_source.startswith('http'):
+            image_source = read_image_bytes(image_source)
 
-        # Load image with PIL for better control
-        pil_image = Image.open(local_path)
+        with stage_timer("decode"):
+            # Load image with PIL for better control
+            pil_image = open_image_source(image_source)
 
-        # Auto-rotate image based on EXIF orientation
-        try:
-            exif = pil_image._getexif()
-            if exif is not None:
-                orientation_key = 274  # EXIF orientation tag
-                if orientation_key in exif:
-                    orientation = exif[orientation_key]
-                    # Apply rotation based on EXIF orientation
-                    if orientation == 2:
-                        pil_image = pil_image.transpose(Image.FLIP_LEFT_RIGHT)
-                    elif orientation == 3:
-                        pil_image = pil_image.transpose(Image.ROTATE_180)
-                    elif orientation == 4:
-                        pil_image = pil_image.transpose(Image.FLIP_TOP_BOTTOM)
-                    elif orientation == 5:
-                        pil_image = pil_image.transpose(Image.FLIP_LEFT_RIGHT).transpose(Image.ROTATE_90)
-                    elif orientation == 6:
-                        pil_image = pil_image.transpose(Image.ROTATE_270)
-                    elif orientation == 7:
-                        pil_image = pil_image.transpose(Image.FLIP_LEFT_RIGHT).transpose(Image.ROTATE_270)
-                    elif orientation == 8:
-                        pil_image = pil_image.transpose(Image.ROTATE_90)
-                    logger.info(f"Applied EXIF orientation correction: {orientation}")
-        except Exception as e:
-            logger.warning(f"Error applying EXIF orientation: {e}")
+            # Let libjpeg decode at 1/2, 1/4 or 1/8 scale (DCT scaling) when that still covers
+            # the target size, instead of decoding every pixel and shrinking afterwards
+            drafted = False
+            if JPEG_DRAFT_DECODING and pil_image.format == "JPEG":
+                target_size = scaled_image_size(pil_image.width, pil_image.height, max_dimension)
+                drafted = pil_image.draft("RGB", target_size) is not None
 
-        # Convert to RGB if needed
-        if pil_image.mode != 'RGB':
-            pil_image = pil_image.convert('RGB')
+            # PIL decodes lazily, load here so the later stages time only their own work
+            pil_image.load()
 
-        # Resize if image is too large (for performance and accuracy)
-        width, height = pil_image.size
-        # Reduced MAX_IMAGE_DIMENSION from 1800 to 1000 for better performance
-        max_dimension = 1000  # Reduced from original MAX_IMAGE_DIMENSION
-        if max(width, height) > max_dimension:
-            if width > height:
-                new_width = max_dimension
-                new_height = int((height * max_dimension) / width)
-            else:
-                new_height = max_dimension
-                new_width = int((width * max_dimension) / height)
-            pil_image = pil_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            logger.info(f"Resized image from {width}x{height} to {new_width}x{new_height}")
+        # Auto-rotate image based on EXIF orientation
+        with stage_timer("exif_rotate"):
+            try:
+                exif = pil_image._getexif()
+                if exif is not None:
+                    orientation_key = 274  # EXIF orientation tag
+                    if orientation_key in exif:
+                        orientation = exif[orientation_key]
+                        # Apply rotation based on EXIF orientation
+                        if orientation == 2:
+                            pil_image = pil_image.transpose(Image.FLIP_LEFT_RIGHT)
+                        elif orientation == 3:
+                            pil_image = pil_image.transpose(Image.ROTATE_180)
+                        elif orientation == 4:
+                            pil_image = pil_image.transpose(Image.FLIP_TOP_BOTTOM)
+                        elif orientation == 5:
+                            pil_image = pil_image.transpose(Image.FLIP_LEFT_RIGHT).transpose(Image.ROTATE_90)
+                        elif orientation == 6:
+                            pil_image = pil_image.transpose(Image.ROTATE_270)
+                        elif orientation == 7:
+                            pil_image = pil_image.transpose(Image.FLIP_LEFT_RIGHT).transpose(Image.ROTATE_270)
+                        elif orientation == 8:
+                            pil_image = pil_image.transpose(Image.ROTATE_90)
+                        logger.debug(f"Applied EXIF orientation correction: {orientation}")
+            except Exception as e:
+                logger.warning(f"Error applying EXIF orientation: {e}")
+
+        with stage_timer("resize"):
+            # Convert to RGB if needed
+            if pil_image.mode != 'RGB':
+                pil_image = pil_image.convert('RGB')
+
+            # Resize if image is too large (for performance and accuracy)
+            width, height = pil_image.size
+            if max(width, height) > max_dimension:
+                new_width, new_height = scaled_image_size(width, height, max_dimension)
+                # After scaled decoding less than 2x is left to shrink, bilinear is plenty for that
+                resample = Image.Resampling.BILINEAR if drafted else Image.Resampling.LANCZOS
+                pil_image = pil_image.resize((new_width, new_height), resample)
+                logger.debug(f"Resized image from {width}x{height} to {new_width}x{new_height}")
 
         # Convert to numpy array
         image = np.array(pil_image)
 
         return image
 
+    except FaceRecognitionError:
+        raise
     except Exception as e:
-        logger.error(f"Error preprocessing image {image_path}: {e}")
+        logger.error(f"Error preprocessing image {describe_image_source(image_source)}: {e}")
         # Fallback to original method
         try:
-            if local_path and local_path != image_path:
-                # For S3 images, we need to use the local path for fallback too
-                result = face_recognition.load_image_file(local_path)
-            else:
-                result = face_recognition.load_image_file(image_path)
-            return result
+            if isinstance(image_source, (bytes, bytearray)):
+                image_source = io.BytesIO(image_source)
+            elif isinstance(image_source, io.BytesIO):
+                image_source.seek(0)
+            return _limit_dimension(face_recognition.load_image_file(image_source), max_dimension)
         except Exception as fallback_error:
             logger.error(f"Fallback also failed: {fallback_error}")
             raise FaceRecognitionError(f"Cannot process image: {e}")
-    finally:
-        # Clean up temporary file if it was created
-        if local_path and local_path != image_path:
-            cleanup_temp_file(local_path)
 
 
-def detect_faces_in_image(image_path: str) -> List[Dict[str, Any]]:
+def _limit_dimension(image: np.ndarray, max_dimension: int) -> np.ndarray:
+    """Resize an already decoded image like the decoding path does (LANCZOS, no draft step)."""
+    height, width = image.shape[:2]
+    if max(width, height) <= max_dimension:
+        return image
+    with stage_timer("resize"):
+        new_width, new_height = scaled_image_size(width, height, max_dimension)
+        resized = Image.fromarray(image).resize((new_width, new_height), Image.Resampling.LANCZOS)
+        logger.debug(f"Resized image from {width}x{height} to {new_width}x{new_height}")
+        return np.asarray(resized)
+
+
+def downscale_image(image: np.ndarray, max_dimension: int) -> np.ndarray:
+    """Shrink a decoded RGB image so its longer side is max_dimension (returned as-is if already smaller)."""
+    height, width = image.shape[:2]
+    if max(width, height) <= max_dimension:
+        return image
+    pil_image = Image.fromarray(image).resize(
+        scaled_image_size(width, height, max_dimension),
+        Image.Resampling.BILINEAR,
+        reducing_gap=2.0  # Integer box reduction first, then a short bilinear step
+    )
+    return np.array(pil_image)
+
+
+def scale_face_locations(
+    face_locations: List[Tuple[int, int, int, int]],
+    from_shape: Tuple[int, ...],
+    to_shape: Tuple[int, ...]
+) -> List[Tuple[int, int, int, int]]:
+    """Map (top, right, bottom, left) face locations between two resolutions of the same image."""
+    scale_y = to_shape[0] / from_shape[0]
+    scale_x = to_shape[1] / from_shape[1]
+    return [
+        (
+            max(0, int(round(top * scale_y))),
+            min(to_shape[1], int(round(right * scale_x))),
+            min(to_shape[0], int(round(bottom * scale_y))),
+            max(0, int(round(left * scale_x)))
+        )
+        for top, right, bottom, left in face_locations
+    ]
+
+
+def detect_faces_in_image(image_source: ImageSource, profile: Optional[PipelineProfile] = None) -> List[Dict[str, Any]]:
     """
     Detect faces in an image and return face data.
+    With TWO_RESOLUTION_ENCODING faces are located on the profile's max_dimension
+    downscale but encoded from the image at up to ENCODING_MAX_DIMENSION, which
+    gives small faces in group shots far better embeddings for the same HOG cost.
+    Bounding boxes and face metrics always refer to the detection image.
 
     Args:
-        image_path: Path to the image file or S3 URL
+        image_source: Image path/URL, encoded bytes or buffer, or a decoded RGB array
+        profile: Pipeline profile (defaults to the active profile)
 
     Returns:
         List of dictionaries containing face data:
@@ -209,26 +317,52 @@ def detect_faces_in_image(image_path: str) -> List[Dict[str, Any]]:
             }
         ]
     """
+    if profile is None:
+        profile = get_pipeline_profile()
+
+    with pipeline_profile(profile.name):
+        return _detect_faces_in_image(image_source, profile)
+
+
+def _detect_faces_in_image(image_source: ImageSource, profile: PipelineProfile) -> List[Dict[str, Any]]:
+    if face_recognition is None:
+        raise FaceRecognitionError("face_recognition is not installed")
+
     try:
+        # Read a path or URL once, a tiled second decode must not download or read the file again
+        image_data = read_image_bytes(image_source) if isinstance(image_source, str) else image_source
+
         # Preprocess image for better detection
-        image = preprocess_image_for_face_detection(image_path)
-
-        # Use HOG model for faster detection
-        logger.info(f"Detecting faces in {image_path}")
-        face_locations = face_recognition.face_locations(
-            image,
-            number_of_times_to_upsample=1,
-            model="hog"  # Changed from "cnn" to "hog" for faster processing
-        )
+        if TWO_RESOLUTION_ENCODING:
+            encoding_image = preprocess_image_for_face_detection(image_data, max(ENCODING_MAX_DIMENSION, profile.max_dimension))
+            image = downscale_image(encoding_image, profile.max_dimension)
+            load_tiling_image = lambda: encoding_image
+        else:
+            image = preprocess_image_for_face_detection(image_data, profile.max_dimension)
+            encoding_image = image
+            # Only decoded when the scheduler decides to tile a panorama or crowd
+            load_tiling_image = lambda: preprocess_image_for_face_detection(image_data, ENCODING_MAX_DIMENSION)
+
+        # Upsampling and tiling are chosen per image by the detection scheduler
+        with stage_timer("detect") as stage:
+            face_locations = locate_faces(image, profile, load_tiling_image)
+            stage.outcome = face_outcome(len(face_locations))
 
         if not face_locations:
-            logger.warning(f"No faces detected in {image_path}")
+            logger.debug(f"No faces detected in {describe_image_source(image_source)}")
             return []
 
-        logger.info(f"Detected {len(face_locations)} faces in {image_path}")
-        
-        # Generate face encodings
-        face_encodings = face_recognition.face_encodings(image, face_locations)
+        # Generate face encodings, dlib only crops the face chips so the large image costs no extra per face
+        with stage_timer("encode"):
+            if encoding_image is image:
+                face_encodings = face_recognition.face_encodings(
+                    image, face_locations, num_jitters=profile.num_jitters, model=profile.landmark_model
+                )
+            else:
+                encoding_locations = scale_face_locations(face_locations, image.shape, encoding_image.shape)
+                face_encodings = face_recognition.face_encodings(
+                    encoding_image, encoding_locations, num_jitters=profile.num_jitters, model=profile.landmark_model
+                )
         
         faces_data = []
         for i, (face_location, face_encoding) in enumerate(zip(face_locations, face_encodings)):
@@ -282,51 +416,120 @@ def detect_faces_in_image(image_path: str) -> List[Dict[str, Any]]:
                 "face_ratio": face_ratio
             })
 
-            logger.info(f"Valid face {i}: size={face_width}x{face_height}, ratio={face_ratio:.3f}, confidence={confidence:.2f}")
-        
-        logger.info(f"Detected {len(faces_data)} valid faces in {image_path}")
+        logger.debug(f"Detected {len(faces_data)} faces in {describe_image_source(image_source)}")
         return faces_data
         
     except Exception as e:
-        logger.error(f"Error detecting faces in {image_path}: {e}")
+        logger.error(f"Error detecting faces in {describe_image_source(image_source)}: {e}")
         raise FaceRecognitionError(f"Failed to detect faces: {e}")
 
 
-def generate_face_embedding(image_path: str) -> Optional[np.ndarray]:
+def analyze_selfie(image_source: ImageSource, profile: Optional[PipelineProfile] = None) -> Dict[str, Any]:
+    """
+    Analyze a selfie in a single detection pass: validation verdict, dominant
+    face, its embedding and quality metrics. Encoded images are screened by the
+    selfie pre-filter first, hopeless ones never reach detection.
+
+    Args:
+        image_source: Image path/URL, encoded bytes or buffer, or a decoded RGB array
+        profile: Pipeline profile (defaults to the active profile)
+
+    Returns:
+        Dictionary with the analysis:
+        {
+            "is_valid": bool,
+            "reason": None, "no_face", "no_dominant_face" or a pre-filter reason
+                      (see utils/selfie_gate.py),
+            "face_count": int,
+            "face": dominant face data (see detect_faces_in_image) or None,
+            "embedding": np.array or None,
+            "quality": {"confidence": float, "face_size": (w, h), "face_ratio": float} or None
+        }
+
+    Raises:
+        FaceRecognitionError: If the image cannot be read or analysed
+    """
+    analysis = {
+        "is_valid": False,
+        "reason": None,
+        "face_count": 0,
+        "face": None,
+        "embedding": None,
+        "quality": None
+    }
+
+    if SELFIE_GATE and not isinstance(image_source, np.ndarray):
+        # Read once, the gate and the pipeline share the bytes
+        image_source = read_image_bytes(image_source)
+        screening = screen_selfie(image_source)
+        if not screening["passed"]:
+            analysis["reason"] = screening["reason"]
+            return analysis
+
+    start_time = time.perf_counter()
+    faces_data = detect_faces_in_image(image_source, profile)
+    record_pipeline_time((time.perf_counter() - start_time) * 1000)
+    analysis["face_count"] = len(faces_data)
+
+    if not faces_data:
+        logger.warning(f"No faces detected in selfie: {describe_image_source(image_source)}")
+        analysis["reason"] = "no_face"
+        return analysis
+
+    # Use the largest / highest confidence face as the dominant face
+    faces_data.sort(key=lambda x: x.get('confidence', 0), reverse=True)
+    dominant_face = faces_data[0]
+    analysis["face"] = dominant_face
+    analysis["quality"] = {
+        "confidence": dominant_face["confidence"],
+        "face_size": dominant_face["face_size"],
+        "face_ratio": dominant_face["face_ratio"]
+    }
+
+    # For selfies, we prefer exactly one face, but allow multiple if one is dominant
+    if len(faces_data) > 1 and dominant_face.get('confidence', 0) <= 0.3:  # Reasonable confidence threshold
+        logger.warning(f"Multiple faces detected but no dominant face in selfie: {describe_image_source(image_source)}")
+        analysis["reason"] = "no_dominant_face"
+        return analysis
+
+    analysis["is_valid"] = True
+    analysis["embedding"] = dominant_face["embedding"]
+    logger.info(
+        f"Selfie accepted: {len(faces_data)} face(s), dominant face confidence {dominant_face['confidence']:.2f}"
+    )
+    return analysis
+
+
+def generate_face_embedding(image_source: ImageSource, profile: Optional[PipelineProfile] = None) -> Optional[np.ndarray]:
     """
     Generate face embedding for a single face image (like a selfie).
 
     Args:
-        image_path: Path to the image file or S3 URL
+        image_source: Image path/URL, encoded bytes or buffer, or a decoded RGB array
+        profile: Pipeline profile (defaults to the active profile)
 
     Returns:
         Face embedding as numpy array, or None if no face detected
     """
     try:
-        faces_data = detect_faces_in_image(image_path)
+        faces_data = detect_faces_in_image(image_source, profile)
 
         if not faces_data:
-            logger.warning(f"No faces detected for embedding generation in {image_path}")
+            logger.warning(f"No faces detected for embedding generation in {describe_image_source(image_source)}")
             return None
 
-        if len(faces_data) > 1:
-            # Sort by confidence and use the best face
-            faces_data.sort(key=lambda x: x.get('confidence', 0), reverse=True)
-            logger.info(f"Multiple faces detected in {image_path}, using the highest confidence face")
-
-        best_face = faces_data[0]
-        logger.info(f"Generated embedding for face with confidence {best_face.get('confidence', 0):.2f}")
-
+        # Use the highest confidence face
+        best_face = max(faces_data, key=lambda x: x.get('confidence', 0))
         return best_face["embedding"]
 
     except Exception as e:
-        logger.error(f"Error generating face embedding for {image_path}: {e}")
+        logger.error(f"Error generating face embedding for {describe_image_source(image_source)}: {e}")
         raise FaceRecognitionError(f"Failed to generate face embedding: {e}")
 
 
 def find_matching_users(face_embedding: np.ndarray, db: Session, threshold: float = FACE_RECOGNITION_TOLERANCE, event_id: Optional[int] = None) -> List[Tuple[int, float]]:
     """
-    Find users with similar face embeddings using improved matching algorithm.
+    Find users with similar face embeddings using the vectorized matching engine.
     Optionally limit search to users registered for a specific event.
 
     Args:
@@ -339,77 +542,8 @@ def find_matching_users(face_embedding: np.ndarray, db: Session, threshold: floa
         List of tuples (user_id, distance) sorted by similarity
     """
     try:
-        from models.user import User
-        from models.event_registration import EventRegistration
-
-        # Build query based on whether event filtering is requested
-        if event_id:
-            # Optimized: Only get users registered for this specific event
-            users_with_embeddings = db.query(User).join(
-                EventRegistration, User.id == EventRegistration.user_id
-            ).filter(
-                EventRegistration.event_id == event_id,
-                User.embedding.isnot(None)
-            ).all()
-
-            # Also get total users for comparison
-            total_users_with_embeddings = db.query(User).filter(User.embedding.isnot(None)).count()
-
-            logger.info(f"🎯 OPTIMIZED SEARCH: Checking {len(users_with_embeddings)} users registered for event {event_id}")
-            logger.info(f"📊 Performance gain: {total_users_with_embeddings - len(users_with_embeddings)} fewer comparisons ({((total_users_with_embeddings - len(users_with_embeddings)) / max(total_users_with_embeddings, 1) * 100):.1f}% reduction)")
-        else:
-            # Fallback: Get all users with embeddings (original behavior)
-            users_with_embeddings = db.query(User).filter(User.embedding.isnot(None)).all()
-            logger.info(f"🔍 FULL SEARCH: Checking {len(users_with_embeddings)} users with face embeddings")
-
-        all_matches = []  # Store all comparisons for analysis
-        confirmed_matches = []  # Store only confirmed matches
-
-        for user in users_with_embeddings:
-            if user.embedding:
-                try:
-                    # Convert JSON back to numpy array
-                    stored_embedding = np.array(user.embedding)
-
-                    # Validate embedding dimensions
-                    if stored_embedding.shape != face_embedding.shape:
-                        logger.warning(f"Embedding dimension mismatch for user {user.id}: {stored_embedding.shape} vs {face_embedding.shape}")
-                        continue
-
-                    # Calculate distance with detailed logging
-                    logger.info(f"Comparing with user {user.id} ({user.name})")
-                    is_match, distance = compare_faces(stored_embedding, face_embedding, threshold)
-
-                    # Store all comparisons for analysis
-                    all_matches.append((user.id, user.name, distance, is_match))
-
-                    if is_match:
-                        confirmed_matches.append((user.id, distance))
-                        logger.info(f"✅ MATCH FOUND: User {user.id} ({user.name}) - distance: {distance:.3f}")
-                    else:
-                        logger.info(f"❌ No match: User {user.id} ({user.name}) - distance: {distance:.3f}")
-
-                except Exception as e:
-                    logger.warning(f"Error comparing embedding for user {user.id}: {e}")
-                    continue
-
-        # Log analysis summary
-        logger.info(f"\n📊 Face Matching Analysis:")
-        logger.info(f"   Total users checked: {len(users_with_embeddings)}")
-        logger.info(f"   Confirmed matches: {len(confirmed_matches)}")
-
-        # Show top 5 closest matches for debugging
-        all_matches.sort(key=lambda x: x[2])  # Sort by distance
-        logger.info(f"   Top 5 closest distances:")
-        for i, (user_id, name, distance, is_match) in enumerate(all_matches[:5]):
-            status = "✅ MATCH" if is_match else "❌ No match"
-            logger.info(f"     {i+1}. User {user_id} ({name}): {distance:.3f} - {status}")
-
-        # Sort confirmed matches by distance (lower is better)
-        confirmed_matches.sort(key=lambda x: x[1])
-
-        logger.info(f"Found {len(confirmed_matches)} confirmed user matches")
-        return confirmed_matches[:10]  # Return top 10 matches
+        matches = match_face_embeddings([face_embedding], db, threshold, event_id)
+        return matches[0] if matches else []
 
     except Exception as e:
         logger.error(f"Error finding matching users: {e}")
@@ -430,15 +564,7 @@ def find_matching_users_for_event(face_embedding: np.ndarray, event_id: int, db:
     Returns:
         List of tuples (user_id, distance) sorted by similarity
     """
-    import time
-    start_time = time.time()
-
-    result = find_matching_users(face_embedding, db, threshold, event_id)
-
-    processing_time = time.time() - start_time
-    logger.info(f"⚡ Event-optimized face matching completed in {processing_time:.3f} seconds")
-
-    return result
+    return find_matching_users(face_embedding, db, threshold, event_id)
 
 
 def compare_faces(known_embedding: np.ndarray, unknown_embedding: np.ndarray, tolerance: float = FACE_RECOGNITION_TOLERANCE) -> Tuple[bool, float]:
@@ -461,8 +587,6 @@ def compare_faces(known_embedding: np.ndarray, unknown_embedding: np.ndarray, to
         # Simple comparison based on distance threshold
         is_match = face_distance <= tolerance
 
-        logger.info(f"Face comparison: distance={face_distance:.3f}, tolerance={tolerance:.3f}, match={is_match}")
-
         return is_match, face_distance
 
     except Exception as e:
@@ -470,49 +594,21 @@ def compare_faces(known_embedding: np.ndarray, unknown_embedding: np.ndarray, to
         return False, float('inf')
 
 
-def validate_face_image(image_path: str) -> bool:
+def validate_face_image(image_source: ImageSource) -> bool:
     """
     Validate that an image contains at least one detectable face suitable for selfies.
+    Prefer analyze_selfie when the embedding is needed as well.
 
     Args:
-        image_path: Path to the image file
+        image_source: Image path/URL, encoded bytes or buffer, or a decoded RGB array
 
     Returns:
         True if image contains at least one good quality face, False otherwise
     """
     try:
-        faces_data = detect_faces_in_image(image_path)
-
-        if not faces_data:
-            logger.warning(f"No faces detected in selfie: {image_path}")
-            return False
-
-        # For selfies, we prefer exactly one face, but allow multiple if one is dominant
-        if len(faces_data) == 1:
-            logger.info(f"Perfect selfie: exactly one face detected in {image_path}")
-            return True
-
-        # If multiple faces, check if one is significantly larger (dominant face)
-        if len(faces_data) > 1:
-            # Sort faces by confidence/size
-            faces_data.sort(key=lambda x: x.get('confidence', 0), reverse=True)
-
-            # Check if the largest face is significantly bigger than others
-            largest_face = faces_data[0]
-            largest_confidence = largest_face.get('confidence', 0)
-
-            # If the largest face has good confidence, accept it
-            if largest_confidence > 0.3:  # Reasonable confidence threshold
-                logger.info(f"Acceptable selfie: dominant face detected among {len(faces_data)} faces in {image_path}")
-                return True
-            else:
-                logger.warning(f"Multiple faces detected but no dominant face in selfie: {image_path}")
-                return False
-
-        return False
-
+        return analyze_selfie(image_source)["is_valid"]
     except Exception as e:
-        logger.error(f"Error validating face image {image_path}: {e}")
+        logger.error(f"Error validating face image {describe_image_source(image_source)}: {e}")
         return False
 
 
@@ -0,0 +1,212 @@
+"""
+Re-matching of stored face embeddings for SnapCircle.
+Re-scores the PhotoFace embeddings of an event (or of every event) against the
+current guest embeddings and tolerance with batched matrix math, so a tolerance
+or profile change takes effect without re-detecting a single image. Supports a
+dry run that only reports the difference.
+"""
+
+from typing import List, Dict, Any, Optional, Sequence
+import logging
+from collections import Counter
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .face_matcher import (
+    load_guest_embeddings,
+    stack_embeddings,
+    match_embedding_matrix,
+    assign_unique_matches,
+    MATCH_CHUNK_SIZE
+)
+from .pipeline_profile import profile_for_event
+from .embedding_codec import vector_bytes
+
+logger = logging.getLogger(__name__)
+
+# Distances are stored as float, smaller differences are not worth a write
+DISTANCE_EPSILON = 1e-4
+
+
+def _photo_chunks(rows: Sequence, chunk_size: int = MATCH_CHUNK_SIZE):
+    """Split face rows ordered by photo into chunks that never split a photo."""
+    start = 0
+    while start < len(rows):
+        end = min(start + chunk_size, len(rows))
+        while end < len(rows) and rows[end].photo_id == rows[end - 1].photo_id:
+            end += 1
+        yield rows[start:end]
+        start = end
+
+
+def _top_k_for(chunk: Sequence) -> int:
+    """One candidate more than the faces of the largest photo in the chunk (see assign_unique_matches)."""
+    return max(10, max(Counter(row.photo_id for row in chunk).values()) + 1)
+
+
+def _changed(old: Optional[float], new: Optional[float]) -> bool:
+    if old is None or new is None:
+        return old is not new
+    return abs(old - new) > DISTANCE_EPSILON
+
+
+def rematch_event_faces(
+    db: Session,
+    event_id: int,
+    threshold: Optional[float] = None,
+    dry_run: bool = False,
+    diff_limit: int = 100
+) -> Dict[str, Any]:
+    """
+    Re-score every stored face of an event against the event's current guests.
+    Faces are resolved per photo with assign_unique_matches, like new photos.
+    Faces confirmed by their guest are counted as unchanged and never rewritten.
+    Changes are written with bulk updates unless dry_run is set. The caller is
+    responsible for committing the session.
+
+    Args:
+        db: Database session
+        event_id: Event ID
+        threshold: Match tolerance (defaults to the event's pipeline profile)
+        dry_run: Compute the difference without writing it
+        diff_limit: Maximum number of changed faces listed in the result
+
+    Returns:
+        Dictionary with face counts per kind of change and the listed changes
+    """
+    from models.photo import Photo
+    from models.photo_face import PhotoFace
+
+    if threshold is None:
+        threshold = profile_for_event(db, event_id).tolerance
+
+    user_ids, guest_matrix = load_guest_embeddings(db, event_id)
+    rows = db.query(
+        PhotoFace.id, PhotoFace.photo_id, vector_bytes(PhotoFace.embedding).label("embedding"),
+        PhotoFace.matched_user_id, PhotoFace.match_distance, PhotoFace.match_confidence, PhotoFace.confirmed
+    ).join(Photo, Photo.id == PhotoFace.photo_id).filter(
+        Photo.event_id == event_id
+    ).order_by(PhotoFace.photo_id, PhotoFace.id).all()
+
+    result = {
+        "event_id": event_id,
+        "threshold": threshold,
+        "guests": len(np.unique(user_ids)),
+        "faces": len(rows),
+        "added": 0,
+        "removed": 0,
+        "reassigned": 0,
+        "unchanged": 0,
+        "updated": 0,
+        "changes": []
+    }
+
+    for chunk in _photo_chunks(rows):
+        matches_per_face = match_embedding_matrix(
+            stack_embeddings([row.embedding for row in chunk]),
+            user_ids,
+            guest_matrix,
+            threshold,
+            top_k=_top_k_for(chunk)
+        )
+        assignments = assign_unique_matches(
+            matches_per_face,
+            [row.photo_id for row in chunk],
+            threshold,
+            confirmed_users=[row.matched_user_id if row.confirmed else None for row in chunk]
+        )
+
+        updates = []
+        for row, assignment in zip(chunk, assignments):
+            if row.confirmed:
+                result["unchanged"] += 1
+                continue
+            new_user_id, new_distance, new_confidence = assignment if assignment else (None, None, None)
+
+            if row.matched_user_id == new_user_id:
+                result["unchanged"] += 1
+                if not (_changed(row.match_distance, new_distance) or _changed(row.match_confidence, new_confidence)):
+                    continue
+            else:
+                kind = "added" if row.matched_user_id is None else "removed" if new_user_id is None else "reassigned"
+                result[kind] += 1
+                if len(result["changes"]) < diff_limit:
+                    result["changes"].append({
+                        "face_id": row.id,
+                        "photo_id": row.photo_id,
+                        "previous_user_id": row.matched_user_id,
+                        "new_user_id": new_user_id,
+                        "previous_distance": row.match_distance,
+                        "new_distance": new_distance
+                    })
+
+            updates.append({
+                "id": row.id,
+                "matched_user_id": new_user_id,
+                "match_distance": new_distance,
+                "match_confidence": new_confidence
+            })
+
+        result["updated"] += len(updates)
+        if updates and not dry_run:
+            db.bulk_update_mappings(PhotoFace, updates)
+
+    logger.info(
+        f"{'Dry run re-match' if dry_run else 'Re-matched'} event {event_id}: {result['faces']} faces, "
+        f"{result['added']} added, {result['removed']} removed, {result['reassigned']} reassigned"
+    )
+    return result
+
+
+def rematch_faces(
+    db: Session,
+    event_ids: Optional[List[int]] = None,
+    threshold: Optional[float] = None,
+    dry_run: bool = False,
+    diff_limit: int = 100
+) -> Dict[str, Any]:
+    """
+    Re-match the faces of several events, or of every event with photos.
+    Each event is committed on its own unless dry_run is set.
+
+    Args:
+        db: Database session
+        event_ids: Events to re-match, None for all events
+        threshold: Match tolerance for every event (defaults to each event's profile)
+        dry_run: Compute the difference without writing it
+        diff_limit: Maximum number of changed faces listed in the result
+
+    Returns:
+        Totals over all events plus the per-event results
+    """
+    from models.photo import Photo
+
+    if event_ids is None:
+        event_ids = [event_id for (event_id,) in db.query(Photo.event_id).distinct().order_by(Photo.event_id)]
+
+    totals = {
+        "dry_run": dry_run,
+        "events": len(event_ids),
+        "faces": 0,
+        "added": 0,
+        "removed": 0,
+        "reassigned": 0,
+        "unchanged": 0,
+        "updated": 0,
+        "changes": [],
+        "per_event": []
+    }
+
+    for event_id in event_ids:
+        result = rematch_event_faces(db, event_id, threshold, dry_run, diff_limit - len(totals["changes"]))
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+
+        for key in ("faces", "added", "removed", "reassigned", "unchanged", "updated"):
+            totals[key] += result[key]
+        totals["changes"].extend(result.pop("changes"))
+        totals["per_event"].append(result)
+
+    return totals
@@ -0,0 +1,61 @@
+"""
+Search event photos by face for SnapCircle.
+Ranks an event's photos by the distance of their nearest stored face to a query
+embedding. The ranking is one exact scan of the event's PhotoFace embeddings in
+Postgres (pgvector <-> operator), so no original image is read and people who
+never registered can be found too.
+"""
+
+from typing import List, Tuple, Any
+import logging
+import numpy as np
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+def search_event_photos_by_face(
+    db: Session,
+    event_id: int,
+    query_embedding,
+    max_distance: float,
+    offset: int = 0,
+    limit: int = 50
+) -> List[Tuple[Any, int, str, float]]:
+    """
+    Rank the photos of an event by their face closest to the query embedding.
+    The nearest face per photo is picked with DISTINCT ON inside the scan; an
+    event-filtered exact scan beats the HNSW index here, which cannot apply the
+    event filter before its LIMIT.
+
+    Args:
+        db: Database session
+        event_id: Event whose photos are searched
+        query_embedding: 128-d embedding of the query face
+        max_distance: Photos whose nearest face is farther away are left out
+        offset: Ranked photos to skip
+        limit: Maximum number of photos to return
+
+    Returns:
+        List of (photo, face_id, bounding_box, distance) sorted by distance
+    """
+    from models.photo import Photo
+    from models.photo_face import PhotoFace
+
+    face_distance = PhotoFace.embedding.l2_distance(np.asarray(query_embedding, dtype=np.float32))
+    nearest = db.query(
+        PhotoFace.photo_id,
+        PhotoFace.id.label("face_id"),
+        PhotoFace.bounding_box,
+        face_distance.label("distance")
+    ).join(Photo, Photo.id == PhotoFace.photo_id).filter(
+        Photo.event_id == event_id
+    ).distinct(PhotoFace.photo_id).order_by(PhotoFace.photo_id, face_distance).subquery()
+
+    rows = db.query(Photo, nearest.c.face_id, nearest.c.bounding_box, nearest.c.distance).join(
+        nearest, nearest.c.photo_id == Photo.id
+    ).filter(
+        nearest.c.distance <= max_distance
+    ).order_by(nearest.c.distance, Photo.id).offset(offset).limit(limit).all()
+
+    return [(photo, face_id, bounding_box, float(distance)) for photo, face_id, bounding_box, distance in rows]
@@ -0,0 +1,135 @@
+"""
+Face templates (multiple enrollment embeddings per user) for SnapCircle.
+A user holds their profile selfie plus a few extra selfies and confirmed photo
+matches. User.embedding is kept as the centroid of the templates, so the pgvector
+search keeps working on one row per user, while the in-memory event index holds
+the centroid and every template (see load_guest_embeddings in face_matcher.py).
+"""
+
+from typing import Optional, Sequence
+import logging
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .face_matcher import stack_embeddings, compute_distance_matrix, EMBEDDING_DIMENSION
+
+try:
+    from face_recognition_config import MAX_FACE_TEMPLATES
+except ImportError:
+    MAX_FACE_TEMPLATES = 5
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_SOURCES = ("profile", "selfie", "photo")
+
+# Reasons confirm_face_rejection gives for refusing a face confirmation
+CONFIRM_OTHER_GUEST = "other_guest"
+CONFIRM_TOO_FAR = "too_far"
+
+
+def update_user_centroid(user) -> None:
+    """Set User.embedding to the mean of the user's templates (unchanged if there are none)."""
+    if not user.face_templates:
+        return
+    templates = stack_embeddings([template.embedding for template in user.face_templates])
+    user.embedding = templates.mean(axis=0).tolist()
+
+
+def set_profile_template(user, embedding: Sequence) -> None:
+    """
+    Replace the user's profile selfie template and refresh the centroid.
+    The caller is responsible for committing and invalidating the embedding index.
+
+    Args:
+        user: User (new or persistent)
+        embedding: Embedding of the new profile selfie
+    """
+    from models.user_face_template import UserFaceTemplate
+
+    user.face_templates = [template for template in user.face_templates if template.source != "profile"] + [
+        UserFaceTemplate(embedding=np.asarray(embedding, dtype=np.float32).tolist(), source="profile")
+    ]
+    update_user_centroid(user)
+
+
+def add_face_template(user, embedding: Sequence, source: str, photo_face_id: Optional[int] = None) -> None:
+    """
+    Add an enrollment embedding to a user, keeping the profile template and the
+    newest others up to MAX_FACE_TEMPLATES, and refresh the centroid.
+    The caller is responsible for committing and invalidating the embedding index.
+
+    Args:
+        user: User
+        embedding: Embedding of the extra selfie or confirmed face
+        source: "selfie" or "photo"
+        photo_face_id: PhotoFace the embedding comes from, for photo templates
+    """
+    from models.user_face_template import UserFaceTemplate
+
+    if source not in TEMPLATE_SOURCES:
+        raise ValueError(f"Unknown face template source: {source}")
+
+    templates = list(user.face_templates) + [
+        UserFaceTemplate(
+            embedding=np.asarray(embedding, dtype=np.float32).tolist(),
+            source=source,
+            photo_face_id=photo_face_id
+        )
+    ]
+    profile = [template for template in templates if template.source == "profile"]
+    others = [template for template in templates if template.source != "profile"]
+    keep = max(0, MAX_FACE_TEMPLATES - len(profile))
+    user.face_templates = profile + (others[-keep:] if keep else [])
+    update_user_centroid(user)
+
+
+def user_template_matrix(db: Session, user_id: int, embedding: Optional[Sequence] = None) -> np.ndarray:
+    """
+    Stack a user's centroid (or the given embedding) and templates for matching.
+
+    Args:
+        db: Database session
+        user_id: User ID
+        embedding: Embedding to use instead of the stored centroid
+
+    Returns:
+        Matrix of shape (rows, EMBEDDING_DIMENSION)
+    """
+    from models.user import User
+    from models.user_face_template import UserFaceTemplate
+
+    if embedding is None:
+        row = db.query(User.embedding).filter(User.id == user_id).first()
+        embedding = row[0] if row else None
+
+    rows = [] if embedding is None else [np.asarray(embedding, dtype=np.float32).reshape(EMBEDDING_DIMENSION)]
+    rows.extend(
+        template for (template,) in
+        db.query(UserFaceTemplate.embedding).filter(UserFaceTemplate.user_id == user_id).order_by(UserFaceTemplate.id)
+    )
+    return stack_embeddings(rows)
+
+
+def confirm_face_rejection(db: Session, user_id: int, face, threshold: float) -> Optional[str]:
+    """
+    Check whether a user may confirm a stored face as themselves. The face must not
+    be matched to another guest and must be within threshold of the user's centroid
+    or one of their templates, so a guest cannot take over someone else's face.
+
+    Args:
+        db: Database session
+        user_id: User confirming the face
+        face: PhotoFace to confirm
+        threshold: Maximum distance for a match, the event's tolerance
+
+    Returns:
+        CONFIRM_OTHER_GUEST or CONFIRM_TOO_FAR, None if the confirmation is allowed
+    """
+    if face.matched_user_id is not None and face.matched_user_id != user_id:
+        return CONFIRM_OTHER_GUEST
+
+    user_matrix = user_template_matrix(db, user_id)
+    if not len(user_matrix):
+        return CONFIRM_TOO_FAR
+    distance = float(compute_distance_matrix(stack_embeddings([face.embedding]), user_matrix).min())
+    return CONFIRM_TOO_FAR if distance > threshold else None
@@ -0,0 +1,110 @@
+"""
+Background face processing workers for SnapCircle.
+Runs face detection for newly uploaded photos in a bounded process pool so
+upload requests return immediately and the event loop is never blocked by dlib.
+"""
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+FACE_AUTO_PROCESSING = os.getenv("FACE_AUTO_PROCESSING", "true").lower() == "true"
+FACE_WORKER_PROCESSES = int(os.getenv("FACE_WORKER_PROCESSES", "2"))
+FACE_WORKER_MAX_TASKS = int(os.getenv("FACE_WORKER_MAX_TASKS", "200"))  # Recycle workers to contain memory growth
+FACE_WORKER_QUEUE_SIZE = int(os.getenv("FACE_WORKER_QUEUE_SIZE", "500"))  # Max queued + running photos
+
+
+def _init_worker():
+    """Load the dlib models once per worker process."""
+    import numpy as np
+    import face_recognition
+
+    # Run one tiny detection so the detector and encoder are fully initialised
+    face_recognition.face_locations(np.zeros((32, 32, 3), dtype=np.uint8))
+    logger.info(f"Face worker {os.getpid()} ready")
+
+
+def _run_photo_job(photo_id: int, image_source: Optional[Union[str, bytes]]):
+    """Worker-side entry point."""
+    from utils.face_processing import process_photo
+    return process_photo(photo_id, image_source)
+
+
+class FaceWorkerPool:
+    """Bounded process pool that processes uploaded photos in the background."""
+
+    def __init__(self, max_workers: int, max_tasks_per_child: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    max_tasks_per_child=self.max_tasks_per_child
+                )
+            return self._executor
+
+    def submit(self, photo_id: int, image_source: Optional[Union[str, bytes]] = None) -> bool:
+        """
+        Queue a photo for face processing.
+
+        Args:
+            photo_id: Photo to process
+            image_source: Optional path/URL or encoded image bytes (held until the job runs)
+
+        Returns:
+            True if queued, False if auto processing is disabled or the queue is full
+        """
+        if not FACE_AUTO_PROCESSING:
+            return False
+
+        if not self._slots.acquire(blocking=False):
+            logger.warning(f"Face worker queue full, photo {photo_id} left for manual processing")
+            return False
+
+        try:
+            future = self._get_executor().submit(_run_photo_job, photo_id, image_source)
+        except Exception as e:
+            self._slots.release()
+            logger.error(f"Failed to queue photo {photo_id} for face processing: {e}")
+            return False
+
+        future.add_done_callback(self._on_done)
+        return True
+
+    def _on_done(self, future: Future):
+        self._slots.release()
+        try:
+            result = future.result()
+            if result.get("status") != "done":
+                logger.warning(f"Background face processing did not complete: {result}")
+        except Exception as e:
+            logger.error(f"Background face processing crashed: {e}")
+
+    def shutdown(self):
+        """Stop the pool, waiting for running jobs to finish."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+# Global instance
+face_worker_pool = FaceWorkerPool(
+    max_workers=FACE_WORKER_PROCESSES,
+    max_tasks_per_child=FACE_WORKER_MAX_TASKS,
+    max_pending=FACE_WORKER_QUEUE_SIZE
+)
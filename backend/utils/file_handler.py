@@ -1,4 +1,6 @@
+import io
 import os
+import hashlib
 import uuid
 import shutil
 from typing import Optional, List
@@ -100,6 +102,7 @@ async def save_uploaded_file(
         Tuple of (file_path_or_url, metadata_dict)
         - If S3 is enabled: returns (s3_url, metadata)
         - If local storage: returns (relative_path, metadata)
+        metadata["content"] holds the stored image bytes, metadata["content_hash"] their SHA-256
     """
     validate_image_file(file)
 
@@ -121,6 +124,9 @@ async def save_uploaded_file(
     # Save file temporarily
     temp_path = f"{file_path}.tmp"
     
+    # Encoded bytes of the stored image, handed to face processing so it never re-reads the file
+    content = None
+
     try:
         # Save uploaded file
         with open(temp_path, "wb") as buffer:
@@ -147,10 +153,20 @@ async def save_uploaded_file(
                 if exif_data:
                     save_kwargs['exif'] = exif_data
                 
-                img.save(file_path, **save_kwargs)
+                # Encode in memory, the format follows the file extension like saving to disk would
+                image_format = Image.registered_extensions().get(os.path.splitext(file_path)[1], "JPEG")
+                output = io.BytesIO()
+                img.save(output, format=image_format, **save_kwargs)
+                content = output.getvalue()
+
+            with open(file_path, "wb") as buffer:
+                buffer.write(content)
+            os.remove(temp_path)
         else:
             # Just move the file
             shutil.move(temp_path, file_path)
+            with open(file_path, "rb") as buffer:
+                content = buffer.read()
         
         # Get file metadata and validate size
         file_size = os.path.getsize(file_path)
@@ -170,7 +186,9 @@ async def save_uploaded_file(
         metadata = {
             "original_filename": file.filename,
             "file_size": file_size,
-            "mime_type": mime_type
+            "mime_type": mime_type,
+            "content": content,
+            "content_hash": hashlib.sha256(content).hexdigest()
         }
         
         # Return relative path for database storage
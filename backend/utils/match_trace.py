@@ -0,0 +1,126 @@
+"""
+Opt-in match traces for SnapCircle.
+The matcher logs nothing per face. A caller that wants to know why a face
+did or did not match runs the work inside match_trace(); the matcher then
+records the threshold, the candidates of every face, the distribution of
+face-to-guest distances and the final assignments into a structured trace
+that can be returned with the response.
+Outside a trace the hot path pays one context variable lookup per batch.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Candidates kept per face and faces kept per trace, bounds the response size
+TRACE_TOP_K = 5
+TRACE_MAX_FACES = 500
+
+# Face-to-guest distances of dlib embeddings fall in [0, ~1.2], matches below ~0.6
+DISTANCE_BINS = np.round(np.arange(0.0, 1.25, 0.1), 1)
+
+_active_trace: ContextVar[Optional["MatchTrace"]] = ContextVar("match_trace", default=None)
+
+
+class MatchTrace:
+    """Match diagnostics collected while a trace is active."""
+
+    def __init__(self):
+        self.batches: List[Dict[str, Any]] = []
+        self.faces_traced = 0
+        self.faces_dropped = 0
+
+    def add_distances(self, distances: np.ndarray, threshold: float):
+        """Fold one chunk of the (faces, guests) distance matrix into the current batch."""
+        if not self.batches or distances.size == 0:
+            return
+        stats = self.batches[-1].setdefault("distances", {
+            "count": 0, "within_threshold": 0, "min": None, "max": None, "sum": 0.0,
+            "histogram": [0] * (len(DISTANCE_BINS) - 1)
+        })
+        stats["count"] += int(distances.size)
+        stats["within_threshold"] += int((distances <= threshold).sum())
+        stats["sum"] += float(distances.sum())
+        low, high = float(distances.min()), float(distances.max())
+        stats["min"] = low if stats["min"] is None else min(stats["min"], low)
+        stats["max"] = high if stats["max"] is None else max(stats["max"], high)
+        # Distances beyond the last bin are counted in it
+        counts, _ = np.histogram(np.clip(distances, 0.0, DISTANCE_BINS[-1]), bins=DISTANCE_BINS)
+        stats["histogram"] = [total + int(count) for total, count in zip(stats["histogram"], counts)]
+
+    def start_batch(self, event_id: Optional[int], threshold: float, top_k: int, searched: str, face_count: int):
+        self.batches.append({
+            "event_id": event_id,
+            "threshold": threshold,
+            "top_k": top_k,
+            "searched": searched,
+            "faces": face_count,
+            "candidates": []
+        })
+
+    def record_candidates(self, matches_per_face: Sequence[List[Tuple[int, float]]]):
+        """Nearest guests of every face in the current batch."""
+        batch = self.batches[-1]
+        for matches in matches_per_face:
+            if self.faces_traced >= TRACE_MAX_FACES:
+                self.faces_dropped += 1
+                continue
+            batch["candidates"].append([
+                {"user_id": user_id, "distance": round(distance, 4)} for user_id, distance in matches[:TRACE_TOP_K]
+            ])
+            self.faces_traced += 1
+
+    def record_assignments(self, photo_faces: Sequence[Tuple[int, int]], assignments: Sequence[Optional[Tuple[int, float, float]]]):
+        """Final guest per face after the one-face-per-guest-per-photo assignment."""
+        batch = self.batches[-1]
+        batch["assignments"] = [
+            {
+                "photo_id": photo_id,
+                "face_index": face_index,
+                "user_id": assignment[0] if assignment else None,
+                "distance": round(assignment[1], 4) if assignment else None,
+                "confidence": round(assignment[2], 4) if assignment else None
+            }
+            for (photo_id, face_index), assignment in zip(photo_faces, assignments)
+        ][:len(batch["candidates"])]
+
+    def to_dict(self) -> Dict[str, Any]:
+        batches = []
+        for batch in self.batches:
+            batch = dict(batch)
+            if "distances" in batch:
+                stats = dict(batch["distances"])
+                stats["mean"] = round(stats.pop("sum") / stats["count"], 4) if stats["count"] else None
+                stats["bins"] = DISTANCE_BINS.tolist()
+                batch["distances"] = stats
+            batches.append(batch)
+        return {"batches": batches, "faces_traced": self.faces_traced, "faces_dropped": self.faces_dropped}
+
+
+@contextmanager
+def match_trace(enabled: bool = True):
+    """
+    Collect match diagnostics for everything matched inside the block.
+
+    Args:
+        enabled: Convenience switch so callers can pass a request flag straight through
+
+    Yields:
+        MatchTrace, or None when disabled
+    """
+    if not enabled:
+        yield None
+        return
+    trace = MatchTrace()
+    token = _active_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _active_trace.reset(token)
+
+
+def active_trace() -> Optional[MatchTrace]:
+    """Trace of the enclosing match_trace block, None when tracing is off."""
+    return _active_trace.get()
@@ -0,0 +1,156 @@
+"""
+Face pipeline profiles for SnapCircle.
+A profile bundles every setting that trades speed for accuracy in the face
+pipeline. Profiles are read from face_recognition_config at call time, so
+apply_profile takes effect immediately, and can be chosen per event or per call.
+"""
+
+import json
+import hashlib
+from dataclasses import dataclass, asdict
+from typing import Optional, Dict, Any
+import logging
+from sqlalchemy.orm import Session
+
+try:
+    import face_recognition_config as config
+except ImportError:
+    config = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when a code change alters detection results for unchanged settings
+PIPELINE_VERSION = 1
+
+LANDMARK_MODELS = ("small", "large")
+DETECTION_MODELS = ("hog", "cnn")
+
+
+@dataclass(frozen=True)
+class PipelineProfile:
+    """Immutable face pipeline settings."""
+    name: str
+    max_dimension: int      # Longest side of the detection image
+    upsamples: int          # Base HOG/CNN upsampling (see utils/face_detection.py)
+    model: str              # Detector: "hog" or "cnn"
+    landmark_model: str     # "small" 5-point or "large" 68-point landmarks for encoding
+    num_jitters: int        # Re-sampled encodings averaged per face
+    tolerance: float        # Max embedding distance for a match
+
+    @classmethod
+    def from_settings(cls, name: str, settings: Dict[str, Any]) -> "PipelineProfile":
+        """Build a profile from an ACCURACY_PROFILES entry, filling gaps with the balanced defaults."""
+        profile = cls(
+            name=name,
+            max_dimension=int(settings.get("max_dimension", DEFAULT_PROFILE.max_dimension)),
+            upsamples=int(settings.get("upsamples", DEFAULT_PROFILE.upsamples)),
+            model=settings.get("model", DEFAULT_PROFILE.model),
+            landmark_model=settings.get("landmark_model", DEFAULT_PROFILE.landmark_model),
+            num_jitters=int(settings.get("num_jitters", DEFAULT_PROFILE.num_jitters)),
+            tolerance=float(settings.get("tolerance", DEFAULT_PROFILE.tolerance))
+        )
+        if profile.model not in DETECTION_MODELS:
+            raise ValueError(f"Profile {name}: unknown detection model {profile.model}")
+        if profile.landmark_model not in LANDMARK_MODELS:
+            raise ValueError(f"Profile {name}: unknown landmark model {profile.landmark_model}")
+        return profile
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# Used when face_recognition_config is missing, matches its balanced profile
+DEFAULT_PROFILE = PipelineProfile(
+    name="balanced",
+    max_dimension=1000,
+    upsamples=1,
+    model="hog",
+    landmark_model="small",
+    num_jitters=1,
+    tolerance=0.6
+)
+
+
+def available_profiles() -> Dict[str, Dict[str, Any]]:
+    """Profile settings by name, as currently configured."""
+    if config is None:
+        return {DEFAULT_PROFILE.name: DEFAULT_PROFILE.to_dict()}
+    return config.ACCURACY_PROFILES
+
+
+def get_pipeline_profile(name: Optional[str] = None) -> PipelineProfile:
+    """
+    Resolve a pipeline profile from the current configuration.
+
+    Args:
+        name: Profile name, None for the active profile (face_recognition_config.CURRENT_PROFILE)
+
+    Returns:
+        PipelineProfile
+
+    Raises:
+        ValueError: If the profile does not exist
+    """
+    if config is None:
+        if name not in (None, DEFAULT_PROFILE.name):
+            raise ValueError(f"Unknown face profile: {name}")
+        return DEFAULT_PROFILE
+
+    name = name or config.CURRENT_PROFILE
+    if name not in config.ACCURACY_PROFILES:
+        raise ValueError(f"Unknown face profile: {name}")
+    return PipelineProfile.from_settings(name, config.ACCURACY_PROFILES[name])
+
+
+def pipeline_fingerprint(profile: PipelineProfile) -> str:
+    """
+    Fingerprint of everything that shapes detection results: the profile (minus the
+    matching tolerance) and the deployment-wide decoding and scheduling switches.
+    Results stored under one fingerprint are valid for any run with the same one.
+
+    Args:
+        profile: Pipeline profile
+
+    Returns:
+        32 character hex digest
+    """
+    from . import face_recognition_utils, face_detection
+
+    settings = profile.to_dict()
+    settings.pop("name")
+    settings.pop("tolerance")
+    settings.update({
+        "version": PIPELINE_VERSION,
+        "jpeg_draft_decoding": face_recognition_utils.JPEG_DRAFT_DECODING,
+        "two_resolution_encoding": face_recognition_utils.TWO_RESOLUTION_ENCODING,
+        "encoding_max_dimension": face_recognition_utils.ENCODING_MAX_DIMENSION,
+        "adaptive_upsampling": face_detection.ADAPTIVE_UPSAMPLING,
+        "tiled_detection": face_detection.TILED_DETECTION,
+        "tile_size": face_detection.DETECTION_TILE_SIZE,
+        "tile_overlap": face_detection.DETECTION_TILE_OVERLAP
+    })
+    encoded = json.dumps(settings, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+def profile_for_event(db: Session, event_id: int) -> PipelineProfile:
+    """
+    Pipeline profile chosen for an event, the active profile if it has none.
+    A profile that was removed from the configuration falls back to the active one.
+
+    Args:
+        db: Database session
+        event_id: Event ID
+
+    Returns:
+        PipelineProfile
+    """
+    from models.event import Event
+
+    row = db.query(Event.face_profile).filter(Event.id == event_id).first()
+    name = row[0] if row else None
+    try:
+        return get_pipeline_profile(name)
+    except ValueError:
+        logger.warning(f"Event {event_id} uses unknown face profile {name}, using the active profile")
+        return get_pipeline_profile()
@@ -1,5 +1,6 @@
 import os
 import uuid
+import hashlib
 import mimetypes
 from typing import Optional, Tuple, Dict, Any
 from fastapi import UploadFile, HTTPException, status
@@ -49,7 +50,8 @@ class S3StorageManager:
             max_height: Maximum height for image resizing (optional)
         
         Returns:
-            Tuple of (s3_url, metadata_dict)
+            Tuple of (s3_url, metadata_dict), metadata["content"] holds the uploaded bytes
+            and metadata["content_hash"] their SHA-256
         """
         if not self.config.use_s3_storage:
             raise ValueError("S3 storage is disabled")
@@ -91,7 +93,9 @@ class S3StorageManager:
                 "original_filename": file.filename,
                 "file_size": file_size,
                 "mime_type": content_type,
-                "s3_key": s3_key
+                "s3_key": s3_key,
+                "content": file_content,  # Uploaded bytes, so face processing needs no S3 round trip
+                "content_hash": hashlib.sha256(file_content).hexdigest()
             }
             
             return s3_url, metadata
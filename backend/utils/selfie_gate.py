@@ -0,0 +1,168 @@
+"""
+Fast selfie pre-filter for SnapCircle.
+Screens selfies with cheap signals before the dlib pipeline: image size, a
+brightness check, a Laplacian blur metric and, with SELFIE_GATE_CASCADE, an
+OpenCV Haar cascade, all on a small greyscale thumbnail decoded at reduced JPEG
+scale. The cascade is off by default until its false rejections of valid
+selfies are measured with benchmarks/selfie_gate_benchmark.py. Hopeless images are
+rejected in a few milliseconds with a specific reason; only promising ones go
+on to detection and encoding in analyze_selfie.
+"""
+
+import io
+import threading
+import time
+from typing import Dict, Any, Optional
+import logging
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+try:
+    from face_recognition_config import (
+        SELFIE_GATE,
+        SELFIE_MIN_DIMENSION,
+        SELFIE_MIN_BRIGHTNESS,
+        SELFIE_MAX_BRIGHTNESS,
+        SELFIE_MIN_SHARPNESS,
+        SELFIE_GATE_CASCADE
+    )
+except ImportError:
+    SELFIE_GATE = True
+    SELFIE_MIN_DIMENSION = 160
+    SELFIE_MIN_BRIGHTNESS = 35
+    SELFIE_MAX_BRIGHTNESS = 235
+    SELFIE_MIN_SHARPNESS = 15.0
+    SELFIE_GATE_CASCADE = False
+
+logger = logging.getLogger(__name__)
+
+# Longest side of the greyscale thumbnail all checks run on
+GATE_DIMENSION = 320
+
+REJECTION_MESSAGES = {
+    "too_small": f"The image is too small, please upload a photo of at least {SELFIE_MIN_DIMENSION}px on each side.",
+    "too_dark": "The image is too dark, please take your selfie in better light.",
+    "too_bright": "The image is overexposed, please avoid direct light behind or on the camera.",
+    "too_blurry": "The image is too blurry, please hold the camera still.",
+    "no_face_candidate": "No face found, please make sure your face is clearly visible and facing the camera.",
+}
+
+# Haar cascades left the main OpenCV package in 5.x, the check is skipped without them
+CASCADE_AVAILABLE = hasattr(cv2, "CascadeClassifier") and hasattr(cv2, "data")
+
+_cascades = threading.local()  # CascadeClassifier is not safe to share between threads
+_stats_lock = threading.Lock()
+_stats = {"screened": 0, "passed": 0, "rejected": {reason: 0 for reason in REJECTION_MESSAGES}, "gate_ms": 0.0, "pipeline_runs": 0, "pipeline_ms": 0.0}
+
+
+def _face_cascade():
+    if not hasattr(_cascades, "frontal"):
+        _cascades.frontal = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    return _cascades.frontal
+
+
+def _thumbnail(image_bytes: bytes):
+    """Original size and an upright greyscale thumbnail of at most GATE_DIMENSION."""
+    image = Image.open(io.BytesIO(image_bytes))
+    original_size = image.size
+    if image.format == "JPEG":
+        # Scaled DCT decoding, a 12 MP JPEG decodes at 1/8 scale
+        image.draft("L", (GATE_DIMENSION, GATE_DIMENSION))
+    image = ImageOps.exif_transpose(image.convert("L"))
+    image.thumbnail((GATE_DIMENSION, GATE_DIMENSION))
+    return original_size, np.asarray(image, dtype=np.uint8)
+
+
+def rejection_message(reason: Optional[str]) -> Optional[str]:
+    """User-facing explanation of a gate rejection, None for other reasons."""
+    return REJECTION_MESSAGES.get(reason)
+
+
+def screen_selfie(image_bytes: bytes) -> Dict[str, Any]:
+    """
+    Screen a selfie before the expensive face pipeline.
+    Thresholds are deliberately loose: the gate only rejects images the full
+    pipeline would almost certainly reject too.
+
+    Args:
+        image_bytes: Encoded image bytes
+
+    Returns:
+        Dictionary with "passed", "reason" (None or a REJECTION_MESSAGES key),
+        "metrics" and "elapsed_ms"
+    """
+    start = time.perf_counter()
+    reason = None
+    metrics: Dict[str, Any] = {}
+
+    try:
+        (width, height), grey = _thumbnail(image_bytes)
+    except Exception as e:
+        # Unreadable images are left to the pipeline, which reports them properly
+        logger.debug(f"Selfie gate could not decode image: {e}")
+        return {"passed": True, "reason": None, "metrics": metrics, "elapsed_ms": (time.perf_counter() - start) * 1000}
+
+    metrics["width"], metrics["height"] = width, height
+    if min(width, height) < SELFIE_MIN_DIMENSION:
+        reason = "too_small"
+
+    if reason is None:
+        metrics["brightness"] = round(float(grey.mean()), 1)
+        if metrics["brightness"] < SELFIE_MIN_BRIGHTNESS:
+            reason = "too_dark"
+        elif metrics["brightness"] > SELFIE_MAX_BRIGHTNESS:
+            reason = "too_bright"
+
+    if reason is None:
+        metrics["sharpness"] = round(float(cv2.Laplacian(grey, cv2.CV_64F).var()), 1)
+        if metrics["sharpness"] < SELFIE_MIN_SHARPNESS:
+            reason = "too_blurry"
+
+    if reason is None and SELFIE_GATE_CASCADE and CASCADE_AVAILABLE:
+        min_face = max(24, min(grey.shape) // 8)
+        faces = _face_cascade().detectMultiScale(
+            cv2.equalizeHist(grey), scaleFactor=1.1, minNeighbors=3, minSize=(min_face, min_face)
+        )
+        metrics["cascade_faces"] = len(faces)
+        if len(faces) == 0:
+            reason = "no_face_candidate"
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    with _stats_lock:
+        _stats["screened"] += 1
+        _stats["gate_ms"] += elapsed_ms
+        if reason is None:
+            _stats["passed"] += 1
+        else:
+            _stats["rejected"][reason] += 1
+
+    if reason is not None:
+        logger.info(f"Selfie rejected by pre-filter ({reason}) in {elapsed_ms:.1f} ms: {metrics}")
+    return {"passed": reason is None, "reason": reason, "metrics": metrics, "elapsed_ms": elapsed_ms}
+
+
+def record_pipeline_time(elapsed_ms: float):
+    """Record the duration of a full selfie analysis, used to estimate the time the gate saves."""
+    with _stats_lock:
+        _stats["pipeline_runs"] += 1
+        _stats["pipeline_ms"] += elapsed_ms
+
+
+def selfie_gate_stats() -> Dict[str, Any]:
+    """
+    Counters of this process: screened, passed and rejected selfies per reason,
+    average gate and pipeline cost, and the CPU time saved by early rejections.
+    """
+    with _stats_lock:
+        stats = {**_stats, "rejected": dict(_stats["rejected"])}
+
+    rejected = sum(stats["rejected"].values())
+    average_pipeline_ms = stats["pipeline_ms"] / stats["pipeline_runs"] if stats["pipeline_runs"] else 0.0
+    stats["rejection_rate"] = round(rejected / stats["screened"], 4) if stats["screened"] else 0.0
+    stats["average_gate_ms"] = round(stats["gate_ms"] / stats["screened"], 2) if stats["screened"] else 0.0
+    stats["average_pipeline_ms"] = round(average_pipeline_ms, 2)
+    # Rejected selfies skip the pipeline, every selfie pays for the gate
+    stats["estimated_saved_ms"] = round(rejected * average_pipeline_ms - stats["gate_ms"], 1)
+    return stats
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Standalone face processing worker for SnapCircle.
+Drains the face_jobs queue; run any number of these on separate boxes from the API.
+Every FACE_CACHE_PRUNE_INTERVAL seconds a worker also prunes the face result cache.
+
+Usage:
+    python worker.py [--batch-size 4] [--poll-interval 2] [--once]
+"""
+
+import os, sys, time, signal, socket, argparse, logging
+
+_stopping = False
+
+FACE_CACHE_PRUNE_INTERVAL = int(os.getenv("FACE_CACHE_PRUNE_INTERVAL", "21600"))  # Seconds, 0 disables pruning
+
+
+def _request_stop(signum, frame):
+    global _stopping
+    print(f"🛑 Received signal {signum}, finishing current job...")
+    _stopping = True
+
+
+def run_worker(batch_size: int, poll_interval: float, once: bool):
+    from database.connection import SessionLocal
+    from utils.face_jobs import claim_face_jobs, run_face_job, release_face_jobs
+    from utils.face_cache import prune_face_cache
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"👷 Face worker {worker_id} started (batch size {batch_size})")
+
+    processed = 0
+    failed = 0
+    next_prune = time.monotonic()
+    while not _stopping:
+        db = SessionLocal()
+        try:
+            if FACE_CACHE_PRUNE_INTERVAL > 0 and time.monotonic() >= next_prune:
+                next_prune = time.monotonic() + FACE_CACHE_PRUNE_INTERVAL
+                pruned = prune_face_cache(db)
+                if any(pruned.values()):
+                    print(f"🧹 Pruned face cache: {pruned['stale_pipeline']} stale pipeline, {pruned['expired']} expired entries")
+
+            jobs = claim_face_jobs(db, worker_id, limit=batch_size)
+            if not jobs:
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            for position, job in enumerate(jobs):
+                if _stopping:
+                    # Hand claimed but unstarted jobs back to the queue
+                    release_face_jobs(db, [remaining.id for remaining in jobs[position:]], worker_id)
+                    break
+                if run_face_job(db, job, worker_id):
+                    processed += 1
+                else:
+                    failed += 1
+        except Exception as e:
+            print(f"❌ Worker loop error: {e}")
+            time.sleep(poll_interval)
+        finally:
+            db.close()
+
+    print(f"✅ Face worker {worker_id} stopped: {processed} jobs done, {failed} failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SnapCircle face processing worker")
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("FACE_WORKER_BATCH_SIZE", "4")),
+                        help="Jobs claimed per queue poll")
+    parser.add_argument("--poll-interval", type=float, default=2.0,
+                        help="Seconds to wait when the queue is empty")
+    parser.add_argument("--once", action="store_true",
+                        help="Exit when the queue is empty instead of polling")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+    run_worker(args.batch_size, args.poll_interval, args.once)
+
+
+if __name__ == "__main__":
+    main()